@@ -0,0 +1,195 @@
+import argparse
+import multiprocessing
+import os
+import random
+import sys
+import time
+
+# Games are simulated headless, so the dummy video driver must be set before pygame starts.
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+
+from core.game.analytics import (
+    TURNS_FILE_NAME,
+    GameStatsWriter,
+    aggregate_chunk,
+    get_chunk_tasks,
+    get_count_names,
+    get_report,
+    merge_aggregates,
+    record_match_log,
+    record_simulated,
+)
+from core.game.columnar import ColumnarReader
+
+
+def make_rules(main, seed: int, dims: tuple[int, int]):
+    # The rules for the board generated from seed, as Main generates it.
+    from core.game.board import Board
+    from core.game.rules import Rules
+
+    random.seed(seed)
+    board = Board(
+        dims=dims,
+        line_colour=main.colours["white"],
+        tile_colour=main.colours["grey"],
+        tile_base_size=main.tile_base_size,
+        tile_border_size=main.tile_border_size,
+        window_size=main.window_size,
+        sprite_sheet=main.sprite_sheet_tiles,
+        icon_sprite_sheet=main.sprite_sheet_resources,
+        tiles=main.tiles,
+        trade=main.trade,
+    )
+
+    return Rules(board, main.shop)
+
+
+def simulate(args) -> None:
+    from core.game.batch import BatchSimulator
+    from core.main import Main
+
+    main = Main()
+    writer = GameStatsWriter(
+        args.out, main.scene_manager.rules.resource_names, args.chunk_rows
+    )
+    start = time.perf_counter()
+    num_turns = 0
+
+    # Each batch is played on a new board, with seeds following on from --seed.
+    for batch_idx, batch_start in enumerate(range(0, args.games, args.batch_size)):
+        seed = args.seed + batch_idx
+        sim = BatchSimulator(
+            make_rules(main, seed, main.board_dims),
+            min(args.batch_size, args.games - batch_start),
+            args.players,
+            seed=seed,
+        )
+        num_turns += record_simulated(sim, writer, args.max_turns, seed)
+
+    writer.close()
+
+    elapsed = time.perf_counter() - start
+    print(
+        f"Simulated {args.games:,} games ({num_turns:,} turns) in {elapsed:.1f} s, "
+        f"{num_turns / elapsed:,.0f} turns/s, into {args.out}"
+    )
+
+
+def ingest(args) -> None:
+    from core.game.match_log import MatchLog
+    from core.main import Main
+
+    main = Main()
+    writer = GameStatsWriter(
+        args.out, main.scene_manager.rules.resource_names, args.chunk_rows
+    )
+    rules_by_board = {}
+    num_games = num_turns = 0
+
+    for file_path in args.files:
+        try:
+            match_log = MatchLog(file_path)
+        except (OSError, ValueError) as e:
+            print(f"{file_path}: couldn't load: {e}", file=sys.stderr)
+            continue
+
+        board_key = (match_log.get_seed(), match_log.get_dims())
+        if board_key not in rules_by_board:
+            rules_by_board[board_key] = make_rules(main, *board_key)
+
+        num_turns += record_match_log(match_log, rules_by_board[board_key], writer)
+        num_games += 1
+
+    writer.close()
+    print(f"Ingested {num_games:,} matches ({num_turns:,} turns) into {args.out}")
+
+
+def aggregate(args) -> None:
+    tasks = get_chunk_tasks(args.stats_dir)
+    if not tasks:
+        sys.exit(f"No game statistics in {args.stats_dir}.")
+
+    start = time.perf_counter()
+    aggregates = {}
+
+    # Workers each map the files and read only the chunks they're given.
+    # Pools are closed and joined, as in render_boards.py.
+    pool = multiprocessing.get_context("spawn").Pool(args.workers)
+    try:
+        for part in pool.imap_unordered(aggregate_chunk, tasks):
+            merge_aggregates(aggregates, part)
+    finally:
+        pool.close()
+        pool.join()
+
+    turns_file_path = os.path.join(args.stats_dir, TURNS_FILE_NAME)
+    count_names = []
+    if os.path.exists(turns_file_path):
+        reader = ColumnarReader(turns_file_path)
+        count_names = get_count_names(reader.get_columns())
+        reader.close()
+
+    for line in get_report(aggregates, count_names):
+        print(line)
+    print(
+        f"Aggregated {len(tasks)} chunks with {args.workers} workers "
+        f"in {time.perf_counter() - start:.2f} s"
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Collect and aggregate per-game and per-turn statistics, for balancing."
+    )
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    simulate_parser = subparsers.add_parser(
+        "simulate", help="play random games with BatchSimulator and record them"
+    )
+    simulate_parser.add_argument("--games", type=int, default=100000)
+    simulate_parser.add_argument("--players", type=int, default=2)
+    simulate_parser.add_argument(
+        "--max-turns",
+        type=int,
+        default=500,
+        help="stop unfinished games after this many turns (default 500)",
+    )
+    simulate_parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=10000,
+        help="games simulated at once, on each board (default 10000)",
+    )
+    simulate_parser.add_argument("--seed", type=int, default=0)
+
+    ingest_parser = subparsers.add_parser(
+        "ingest", help="record matches saved with empyreus.py --record"
+    )
+    ingest_parser.add_argument("files", nargs="+", metavar="FILE")
+
+    for subparser in (simulate_parser, ingest_parser):
+        subparser.add_argument(
+            "--out",
+            default="./stats",
+            help="folder of the statistics files, appended to (default ./stats)",
+        )
+        subparser.add_argument(
+            "--chunk-rows",
+            type=int,
+            default=65536,
+            help="rows written at a time (default 65536)",
+        )
+
+    aggregate_parser = subparsers.add_parser(
+        "aggregate", help="summarise statistics files, in parallel"
+    )
+    aggregate_parser.add_argument("stats_dir", nargs="?", default="./stats")
+    aggregate_parser.add_argument(
+        "--workers", type=int, default=os.cpu_count() or 1
+    )
+
+    args = parser.parse_args()
+
+    {"simulate": simulate, "ingest": ingest, "aggregate": aggregate}[args.command](
+        args
+    )
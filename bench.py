@@ -0,0 +1,80 @@
+import argparse
+import os
+import sys
+
+# Benchmarks run headless, so the dummy video driver must be set before pygame starts.
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+
+from core.benchmarks import (
+    Benchmarks,
+    compare,
+    load_results,
+    print_comparison,
+    print_results,
+    save_results,
+)
+from core.main import Main
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Benchmark board generation, graph queries, rendering, board events, fog of war, rollback and restarting."
+    )
+    parser.add_argument("--save", metavar="FILE", help="write the results as JSON")
+    parser.add_argument(
+        "--compare",
+        metavar="FILE",
+        help="compare with saved results, exiting with 1 on any regression",
+    )
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.15,
+        help="how much slower a median must be to count as a regression (default 0.15)",
+    )
+    parser.add_argument(
+        "--filter", default="", help="only run benchmarks whose names contain this"
+    )
+    parser.add_argument(
+        "--min-time",
+        type=float,
+        default=0.5,
+        help="seconds to repeat each benchmark for (default 0.5)",
+    )
+    parser.add_argument(
+        "--max-dims",
+        type=int,
+        default=500,
+        help="largest board width to generate (default 500)",
+    )
+    parser.add_argument(
+        "--max-run-time",
+        type=float,
+        default=10.0,
+        help="skip larger boards once one takes longer than this, in seconds (default 10)",
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    benchmarks = Benchmarks(
+        Main(),
+        min_time=args.min_time,
+        max_run_time=args.max_run_time,
+        max_dims=args.max_dims,
+        name_filter=args.filter,
+        seed=args.seed,
+    )
+    results = benchmarks.run()
+
+    print_results(results)
+
+    if args.save:
+        save_results(results, args.save)
+
+    if args.compare:
+        rows = compare(results, load_results(args.compare), args.threshold)
+
+        print()
+        print_comparison(rows)
+
+        if any(is_regression for *_, is_regression in rows):
+            sys.exit(1)
@@ -0,0 +1,492 @@
+from __future__ import annotations
+
+# avoiding circular imports in type hints
+from typing import TYPE_CHECKING, Callable
+
+if TYPE_CHECKING:
+    from .main import Main
+
+import json
+import platform
+import pygame
+import random
+import statistics
+import sys
+import time
+
+from .game.board import Board
+from .game.board_events import BoardEvents
+from .game.fog import FogOfWar
+from .game.helper import gen_colour, get_adjs, get_min_conns_dist
+from .game.player import PlayerList
+from .net.lockstep import LockstepSession
+from .tracing import tracer
+from .ui.text import UIText
+
+
+# Board sizes, in tiles. Sizes after one that's too slow are skipped.
+BOARD_DIMS = (
+    (6, 6),
+    (12, 12),
+    (25, 25),
+    (50, 50),
+    (100, 100),
+    (250, 250),
+    (500, 500),
+)
+PLAYER_COUNTS = (1, 5, 25, 100)
+
+# Tile counts in the game data are for a 6x6 board, so are scaled up with the area.
+BASE_BOARD_AREA = 36
+
+
+def get_stats(run_times: list[float]) -> dict[str, float | int]:
+    # Run times are in seconds, stats in milliseconds.
+    return {
+        "runs": len(run_times),
+        "min_ms": min(run_times) * 1000,
+        "median_ms": statistics.median(run_times) * 1000,
+        "mean_ms": statistics.fmean(run_times) * 1000,
+        "max_ms": max(run_times) * 1000,
+    }
+
+
+class Benchmarks:
+    """
+    Times board generation, graph queries, rendering, rollback and restarting, headless.
+
+    Every benchmark runs until it has taken min_time seconds in total
+    (or has run max_runs times), and results are in milliseconds per run.
+    Boards are generated from fixed seeds, so runs are reproducible.
+    """
+
+    def __init__(
+        self,
+        main: Main,
+        min_time: float = 0.5,
+        max_runs: int = 100,
+        max_run_time: float = 10.0,
+        max_dims: int = 500,
+        name_filter: str = "",
+        seed: int = 0,
+    ):
+        self.main = main
+        self.min_time = min_time
+        self.max_runs = max_runs
+        # Larger boards are skipped once one run takes longer than this, in seconds.
+        self.max_run_time = max_run_time
+        self.max_dims = max_dims
+        self.name_filter = name_filter
+        self.seed = seed
+
+        self.results: dict[str, dict] = {}
+
+    def get_wanted(self, name: str) -> bool:
+        return self.name_filter in name
+
+    def time_func(self, name: str, func: Callable[[], None]) -> list[float]:
+        # Records and returns the time of each run of func.
+        run_times: list[float] = []
+        total = 0.0
+
+        while total < self.min_time and len(run_times) < self.max_runs:
+            start = time.perf_counter()
+            func()
+            run_time = time.perf_counter() - start
+
+            run_times.append(run_time)
+            total += run_time
+
+            if run_time > self.max_run_time:
+                break
+
+        self.results[name] = get_stats(run_times)
+
+        return run_times
+
+    # ---- Boards ----
+
+    def get_tiles(self, dims: tuple[int, int]) -> dict[str, int | float]:
+        scale = dims[0] * dims[1] / BASE_BOARD_AREA
+
+        return {
+            tile_type: (
+                tile_amount
+                if tile_amount == float("inf")
+                else round(tile_amount * scale)
+            )
+            for tile_type, tile_amount in self.main.tiles.items()
+        }
+
+    def make_board(self, dims: tuple[int, int]) -> Board:
+        random.seed(self.seed)
+
+        return Board(
+            dims=dims,
+            line_colour=self.main.colours["white"],
+            tile_colour=self.main.colours["grey"],
+            tile_base_size=self.main.tile_base_size,
+            tile_border_size=self.main.tile_border_size,
+            window_size=self.main.window_size,
+            sprite_sheet=self.main.sprite_sheet_tiles,
+            icon_sprite_sheet=self.main.sprite_sheet_resources,
+            tiles=self.get_tiles(dims),
+            trade=self.main.trade,
+        )
+
+    def bench_boards(self) -> None:
+        """
+        Times Board.__init__ for each size, and each of its phases
+        (order_tiles, creating tiles and the create_graph phases) from their trace spans.
+        Then times get_min_conns_dist between neighbouring tiles on each board.
+        """
+        # create_graph's depth-first search recurses once per tile of an island.
+        sys.setrecursionlimit(
+            max(sys.getrecursionlimit(), 2 * self.max_dims**2 + 1000)
+        )
+
+        for dims in BOARD_DIMS:
+            size = f"{dims[0]}x{dims[1]}"
+
+            if dims[0] > self.max_dims or not (
+                self.get_wanted(f"board.init[{size}]")
+                or self.get_wanted(f"graph.get_min_conns_dist_x100[{size}]")
+            ):
+                continue
+
+            # Only the last board generated is kept, for the graph queries.
+            board = None
+
+            def make_board() -> None:
+                nonlocal board
+                board = self.make_board(dims)
+
+            tracer.clear()
+            tracer.start()
+
+            try:
+                run_times = self.time_func(f"board.init[{size}]", make_board)
+            finally:
+                tracer.stop()
+
+            # The phases' spans, grouped by name.
+            phase_times: dict[str, list[float]] = {}
+            for _, name, category, _, duration, _, _ in tracer.get_events():
+                if category == "board":
+                    phase_times.setdefault(name, []).append(duration / 1e6)
+            tracer.clear()
+
+            for name, times in phase_times.items():
+                phase_name = name.replace(" ", "_")
+                self.results[f"board.{phase_name}[{size}]"] = get_stats(times)
+
+            self.bench_min_conns_dist(board, size)
+
+            if max(run_times) > self.max_run_time:
+                for larger_dims in BOARD_DIMS[BOARD_DIMS.index(dims) + 1 :]:
+                    if larger_dims[0] <= self.max_dims:
+                        self.results[
+                            f"board.init[{larger_dims[0]}x{larger_dims[1]}]"
+                        ] = {"skipped": f"{size} took over {self.max_run_time} s"}
+                break
+
+    def bench_min_conns_dist(self, board: Board, size: str) -> None:
+        # Shortest paths between 100 random pairs of neighbouring tiles, as in create_graph.
+        graph = board.get_graph()
+        rng = random.Random(self.seed)
+        nodes = sorted(graph)
+        pairs = [
+            (node, rng.choice(get_adjs(board.get_matrix(), node)))
+            for node in rng.choices(nodes, k=100)
+        ]
+
+        def query_pairs() -> None:
+            for node, adj in pairs:
+                get_min_conns_dist(graph, node, adj)
+
+        name = f"graph.get_min_conns_dist_x100[{size}]"
+        if self.get_wanted(name):
+            self.time_func(name, query_pairs)
+
+    # ---- Rendering ----
+
+    def bench_rendering(self) -> None:
+        """Times Board.render_to, UIText.render_to for each player count, and a whole frame."""
+        main = self.main
+        scene_manager = main.scene_manager
+        window = main.window
+
+        random.seed(self.seed)
+        scene_manager.new_game(2)
+        curr_player = main.players.get_curr()
+
+        if self.get_wanted("render.board"):
+            self.time_func(
+                "render.board",
+                lambda: main.board.render_to(window, (0, 0), curr_player),
+            )
+
+        for num_players in PLAYER_COUNTS:
+            name = f"render.text[{num_players}_players]"
+            if not self.get_wanted(name):
+                continue
+
+            players = PlayerList(
+                main.board,
+                main.sprite_sheet_resources,
+                "./assets/images/tiny-spaceships",
+            )
+            for player_num in range(num_players):
+                players.add(f"Player {player_num + 1}", gen_colour())
+
+            ui_text = UIText(
+                board=main.board,
+                players=players,
+                font=main.font,
+                font_bold=main.font_bold,
+                font_size=main.font_size,
+                font_bold_size=main.font_size * 2,
+                text_colour=main.text_colour,
+            )
+            self.time_func(
+                name,
+                lambda: ui_text.render_to(window, (0, 0), players.get_curr()),
+            )
+
+        if self.get_wanted("render.frame"):
+            # Everything in one pass of handle_actions(), without waiting for the next frame.
+            scene_manager.input_router.install()
+            self.time_func("render.frame", lambda: scene_manager.run_frame(fps=0))
+
+    # ---- Board events ----
+
+    def bench_board_events(self) -> None:
+        """
+        Times a round's board events on each board size: asteroids drifting and
+        trading stations moving, re-linking the graph around them, then redrawing
+        only their part of the board layer.
+        """
+        for dims in BOARD_DIMS:
+            size = f"{dims[0]}x{dims[1]}"
+            name = f"board_events.end_round[{size}]"
+
+            if dims[0] > self.max_dims or not self.get_wanted(name):
+                continue
+
+            board = self.make_board(dims)
+            board_events = BoardEvents(
+                board, random.Random(self.seed), relocate_rounds=1
+            )
+            board.update_layer()
+
+            def end_round() -> None:
+                board_events.end_round(set())
+                board.update_layer()
+
+            run_times = self.time_func(name, end_round)
+
+            if max(run_times) > self.max_run_time:
+                break
+
+    # ---- Fog of war ----
+
+    def bench_fog(self) -> None:
+        """
+        Times fog of war on each board size: making every tile's mask,
+        then a move by each of the most players, which only ORs in the masks.
+        """
+        num_players = PLAYER_COUNTS[-1]
+
+        for dims in BOARD_DIMS:
+            size = f"{dims[0]}x{dims[1]}"
+            masks_name = f"fog.masks[{size}]"
+            visit_name = f"fog.visit[{size},{num_players}_players]"
+
+            if dims[0] > self.max_dims or not (
+                self.get_wanted(masks_name) or self.get_wanted(visit_name)
+            ):
+                continue
+
+            board = self.make_board(dims)
+            fog = None
+
+            def make_fog() -> None:
+                nonlocal fog
+                fog = FogOfWar(board)
+
+            if self.get_wanted(masks_name):
+                run_times = self.time_func(masks_name, make_fog)
+            else:
+                run_times = []
+                make_fog()
+
+            rng = random.Random(self.seed)
+            nodes = list(board.get_graph())
+            for num in range(num_players):
+                fog.add_player(num, rng.choice(nodes))
+
+            def visit() -> None:
+                for num in range(num_players):
+                    fog.visit(num, rng.choice(nodes))
+
+            if self.get_wanted(visit_name):
+                run_times += self.time_func(visit_name, visit)
+
+            if max(run_times) > self.max_run_time:
+                break
+
+    # ---- Netplay ----
+
+    def bench_lockstep(self) -> None:
+        # A late input from the first tick of the stall window, after actions every few ticks.
+        name = "lockstep.rollback[120_ticks]"
+        if not self.get_wanted(name):
+            return
+
+        random.seed(self.seed)
+        self.main.scene_manager.new_game(2)
+
+        rules = self.main.scene_manager.rules
+        state = self.main.players.get_state().copy()
+        session = LockstepSession(rules, state, random.Random(self.seed), 2, 0)
+        rng = random.Random(self.seed)
+
+        for tick in range(session.max_rollback):
+            actions = []
+            if tick % 4 == 0:
+                actions.append(rng.choice(rules.get_legal_actions(state)))
+
+            if state.curr == 0:
+                session.advance(actions)
+            else:
+                session.add_inputs(1, tick, actions)
+                session.advance([])
+
+        self.time_func(name, lambda: session.rollback(0))
+
+    # ---- Restarting ----
+
+    def bench_restart(self) -> None:
+        """
+        Times starting another game after the first, for each board size:
+        generating a new board in place, from its pooled tiles, and adding pooled players.
+        """
+        main = self.main
+        scene_manager = main.scene_manager
+        sys.setrecursionlimit(
+            max(sys.getrecursionlimit(), 2 * self.max_dims**2 + 1000)
+        )
+
+        random.seed(self.seed)
+        # Later games are the ones played on a new board.
+        scene_manager.new_game(2)
+
+        try:
+            for dims in BOARD_DIMS:
+                size = f"{dims[0]}x{dims[1]}"
+                name = f"restart.new_game[{size}]"
+
+                if dims[0] > self.max_dims or not self.get_wanted(name):
+                    continue
+
+                main.board.set_dims(dims)
+                main.board.set_tiles(self.get_tiles(dims))
+
+                run_times = self.time_func(name, lambda: scene_manager.new_game(2))
+
+                if max(run_times) > self.max_run_time:
+                    break
+        finally:
+            main.board.set_dims(main.board_dims)
+            main.board.set_tiles(main.tiles)
+            scene_manager.new_game(2)
+
+    def run(self) -> dict:
+        self.bench_boards()
+        self.bench_rendering()
+        self.bench_board_events()
+        self.bench_fog()
+        self.bench_lockstep()
+        self.bench_restart()
+
+        return {
+            "meta": {
+                "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                "python": platform.python_version(),
+                "pygame": pygame.version.ver,
+                "platform": platform.platform(),
+                "seed": self.seed,
+            },
+            "results": self.results,
+        }
+
+
+def compare(
+    results: dict,
+    baseline: dict,
+    threshold: float = 0.15,
+    min_diff_ms: float = 0.02,
+) -> list[tuple[str, float, float, float, bool]]:
+    """
+    Compares median times with a baseline's.
+
+    Returns (name, baseline ms, new ms, ratio, is regression) for each benchmark in both.
+    A regression is a median more than threshold slower, by at least min_diff_ms,
+    so noise in the fastest benchmarks isn't flagged.
+    """
+    rows = []
+
+    for name, result in results["results"].items():
+        base_result = baseline["results"].get(name)
+
+        if (
+            base_result is None
+            or "median_ms" not in result
+            or "median_ms" not in base_result
+        ):
+            continue
+
+        base_ms = base_result["median_ms"]
+        new_ms = result["median_ms"]
+        ratio = new_ms / base_ms if base_ms else float("inf")
+
+        rows.append(
+            (
+                name,
+                base_ms,
+                new_ms,
+                ratio,
+                ratio > 1 + threshold and new_ms - base_ms > min_diff_ms,
+            )
+        )
+
+    return rows
+
+
+def print_results(results: dict) -> None:
+    for name, result in results["results"].items():
+        if "skipped" in result:
+            print(f"{name:<48} skipped ({result['skipped']})")
+        else:
+            print(
+                f"{name:<48} {result['median_ms']:>10.3f} ms median"
+                f"  ({result['min_ms']:.3f} min, {result['runs']} runs)"
+            )
+
+
+def print_comparison(rows: list[tuple[str, float, float, float, bool]]) -> None:
+    for name, base_ms, new_ms, ratio, is_regression in rows:
+        print(
+            f"{name:<48} {base_ms:>10.3f} -> {new_ms:>10.3f} ms"
+            f"  {ratio:>6.2f}x{'  REGRESSION' if is_regression else ''}"
+        )
+
+
+def save_results(results: dict, file_path: str) -> None:
+    with open(file_path, "w") as f:
+        json.dump(results, f, indent=2)
+
+
+def load_results(file_path: str) -> dict:
+    with open(file_path) as f:
+        return json.load(f)
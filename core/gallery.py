@@ -0,0 +1,233 @@
+from __future__ import annotations
+
+# avoiding circular imports in type hints
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from .main import Main
+
+import numpy as np
+import os
+import pygame
+import random
+
+from .game.board import Board
+from .game.helper import gen_colour
+from .game.player import PlayerList
+from .ui.text import UIText
+
+
+# The board size the game's window is laid out around.
+BASE_BOARD_DIMS = (6, 6)
+
+# Off the window, so no tile or resource is drawn as hovered.
+NO_MOUSE_POS = (-1, -1)
+NO_MOUSE_BOARD_COORD = (None, None)
+
+
+def get_file_name(seed: int, dims: tuple[int, int], num_players: int) -> str:
+    return f"board_{dims[0]}x{dims[1]}_p{num_players}_s{seed}.png"
+
+
+class BoardRenderer:
+    """
+    Renders generated boards to offscreen surfaces, through the same
+    Board.render_to, Player.render_to and UIText.render_to calls as the game.
+
+    Each board is generated from its seed, so the same seed, size
+    and player count always give the same image.
+    Boards bigger than the game's are drawn on a bigger surface,
+    with the same margins around them for the text.
+    """
+
+    def __init__(self, main: Main):
+        self.main = main
+
+        self.margin_size = (
+            main.window_size[0] - BASE_BOARD_DIMS[0] * main.tile_size[0],
+            main.window_size[1] - BASE_BOARD_DIMS[1] * main.tile_size[1],
+        )
+
+    def get_surface_size(self, dims: tuple[int, int]) -> tuple[int, int]:
+        return (
+            max(
+                self.main.window_size[0],
+                dims[0] * self.main.tile_size[0] + self.margin_size[0],
+            ),
+            max(
+                self.main.window_size[1],
+                dims[1] * self.main.tile_size[1] + self.margin_size[1],
+            ),
+        )
+
+    def get_tiles(self, dims: tuple[int, int]) -> dict[str, int | float]:
+        # Tile counts in the game data are for the game's board, so are scaled up with the area.
+        scale = dims[0] * dims[1] / (BASE_BOARD_DIMS[0] * BASE_BOARD_DIMS[1])
+
+        return {
+            tile_type: (
+                tile_amount
+                if tile_amount == float("inf")
+                else round(tile_amount * scale)
+            )
+            for tile_type, tile_amount in self.main.tiles.items()
+        }
+
+    def render(
+        self, seed: int, dims: tuple[int, int], num_players: int
+    ) -> pygame.Surface:
+        main = self.main
+        surface_size = self.get_surface_size(dims)
+
+        random.seed(seed)
+
+        board = Board(
+            dims=dims,
+            line_colour=main.colours["white"],
+            tile_colour=main.colours["grey"],
+            tile_base_size=main.tile_base_size,
+            tile_border_size=main.tile_border_size,
+            window_size=surface_size,
+            sprite_sheet=main.sprite_sheet_tiles,
+            icon_sprite_sheet=main.sprite_sheet_resources,
+            tiles=self.get_tiles(dims),
+            trade=main.trade,
+        )
+
+        players = PlayerList(
+            board,
+            main.sprite_sheet_resources,
+            "./assets/images/tiny-spaceships",
+        )
+        names = main.scene_manager.names
+        for player_num in range(num_players):
+            players.add(
+                (
+                    names[player_num]
+                    if player_num < len(names)
+                    else f"Player {player_num + 1}"
+                ),
+                gen_colour(),
+            )
+
+        ui_text = UIText(
+            board=board,
+            players=players,
+            font=main.font,
+            font_bold=main.font_bold,
+            font_size=main.font_size,
+            font_bold_size=main.font_bold_size,
+            text_colour=main.text_colour,
+        )
+
+        # In the window's format, as in SceneManager.new_frame(),
+        # as the background image is paletted.
+        surface = pygame.Surface(surface_size).convert(main.window)
+        surface.fill(main.colours["dark_purple"])
+        surface.blit(main.background.image, main.background.rect)
+
+        curr_player = players.get_curr()
+
+        ui_text.render_to(surface, NO_MOUSE_POS, curr_player)
+        board.render_to(surface, NO_MOUSE_BOARD_COORD, curr_player)
+        for player in players.get_list():
+            player.render_to(surface)
+
+        return surface
+
+
+def scale_to_width(surface: pygame.Surface, width: int) -> pygame.Surface:
+    return pygame.transform.smoothscale(
+        surface,
+        (width, round(surface.get_height() * width / surface.get_width())),
+    )
+
+
+def diff_images(
+    surface: pygame.Surface,
+    golden: pygame.Surface,
+    tolerance: int = 0,
+) -> tuple[int, None | pygame.Surface]:
+    """
+    Returns how many pixels differ from the golden image by more than tolerance
+    in any channel, and an image of the golden one with those pixels in red
+    (or None if none differ).
+    Images of different sizes differ in every pixel.
+    """
+    if surface.get_size() != golden.get_size():
+        return surface.get_width() * surface.get_height(), None
+
+    pixels = pygame.surfarray.array3d(surface).astype(np.int16)
+    golden_pixels = pygame.surfarray.array3d(golden).astype(np.int16)
+
+    differs = (np.abs(pixels - golden_pixels) > tolerance).any(axis=2)
+    num_diffs = int(differs.sum())
+
+    if not num_diffs:
+        return 0, None
+
+    # The golden image, dimmed, so the differing pixels stand out.
+    diff_pixels = (golden_pixels // 3).astype(np.uint8)
+    diff_pixels[differs] = (255, 0, 0)
+
+    return num_diffs, pygame.surfarray.make_surface(diff_pixels)
+
+
+# Set in each worker process by init_worker(), as surfaces and fonts can't be sent between processes.
+renderer: None | BoardRenderer = None
+
+
+def init_worker() -> None:
+    # Imported here, so the parent process never starts pygame.
+    from .main import Main
+
+    global renderer
+    renderer = BoardRenderer(Main())
+
+
+def render_job(
+    job: tuple[int, tuple[int, int], int],
+    output_dir: None | str,
+    golden_dir: None | str,
+    update_golden: bool,
+    width: None | int,
+    tolerance: int,
+) -> dict:
+    """
+    Renders one (seed, dims, player count) job in a worker process,
+    then saves it and compares it with its golden image, as asked.
+    Returns the job's result, as sent back to the parent process.
+    """
+    seed, dims, num_players = job
+    file_name = get_file_name(seed, dims, num_players)
+    result = {"file_name": file_name, "status": "rendered"}
+
+    surface = renderer.render(seed, dims, num_players)
+    if width:
+        surface = scale_to_width(surface, width)
+
+    if output_dir:
+        pygame.image.save(surface, os.path.join(output_dir, file_name))
+
+    if golden_dir:
+        golden_file_path = os.path.join(golden_dir, file_name)
+
+        if update_golden:
+            pygame.image.save(surface, golden_file_path)
+            result["status"] = "updated"
+        elif not os.path.exists(golden_file_path):
+            result["status"] = "missing"
+        else:
+            num_diffs, diff_image = diff_images(
+                surface, pygame.image.load(golden_file_path), tolerance
+            )
+            result["num_diffs"] = num_diffs
+            result["status"] = "differs" if num_diffs else "matches"
+
+            if diff_image is not None and output_dir:
+                pygame.image.save(
+                    diff_image,
+                    os.path.join(output_dir, file_name.replace(".png", "_diff.png")),
+                )
+
+    return result
@@ -0,0 +1,315 @@
+from __future__ import annotations
+
+# avoiding circular imports in type hints
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from .state import GameState
+
+import queue
+import threading
+import time
+
+from math import log, sqrt
+from random import Random
+
+from .rules import END_ACTION, Rules
+from .zobrist import TranspositionTable, ZobristHasher
+from ..tracing import tracer
+
+
+class MCTSNode:
+    __slots__ = ("parent", "action", "player", "children", "visits", "value")
+
+    def __init__(self, parent: None | MCTSNode, action: None | tuple, player: int):
+        self.parent = parent
+        self.action = action  # The action that led from the parent to this node.
+        self.player = player  # The player who took that action.
+        self.children: dict[tuple, MCTSNode] = {}
+        self.visits = 0
+        self.value = 0.0  # Total reward for self.player over all visits.
+
+
+class MCTSBot:
+    """
+    Chooses actions with Monte-Carlo Tree Search.
+
+    The tree is open-loop: nodes store action sequences rather than states,
+    and every iteration re-simulates from a copy of the root state.
+    This handles the random resources given by trading stations.
+    """
+
+    def __init__(
+        self,
+        rules: Rules,
+        exploration: float = 1.4,
+        max_playout_turns: int = 12,
+        playouts_per_position: int = 4,
+        seed: None | int = None,
+    ):
+        self.rules = rules
+        self.exploration = exploration
+        self.max_playout_turns = max_playout_turns
+        # Once a leaf position has had this many playouts,
+        # their mean reward is reused from the transposition table instead.
+        self.playouts_per_position = playouts_per_position
+        self.rng = Random(seed)
+
+        self.hasher = ZobristHasher(rules)
+        self.table = TranspositionTable()
+
+        self.stats: dict[str, float] = {}
+
+    def get_stats(self) -> dict[str, float]:
+        # Statistics of the last search, for tuning against the frame budget.
+        return self.stats
+
+    def set_rules(self, rules: Rules) -> None:
+        # Cached rewards and hash keys were made under the old rules.
+        self.rules = rules
+        self.hasher = ZobristHasher(rules)
+        self.table.clear()
+
+    def evaluate(self, state: GameState) -> list[float]:
+        # Returns a reward between 0 and 1 for every player.
+        winner = self.rules.get_winner(state)
+
+        if winner != -1:
+            return [float(num == winner) for num in range(len(state.scores))]
+
+        # Otherwise, reward progress towards the winning score,
+        # with a little for resources held (which can be spent on products).
+        num_resources = self.rules.num_resources
+
+        return [
+            0.8 * min(score / self.rules.winning_score, 1)
+            + 0.2
+            * min(
+                sum(
+                    state.resources[
+                        num * num_resources : (num + 1) * num_resources
+                    ]
+                )
+                / 20,
+                1,
+            )
+            for num, score in enumerate(state.scores)
+        ]
+
+    def playout(self, state: GameState) -> None:
+        # Plays random actions until someone wins or the turn limit is reached.
+        # Buying is always preferred, and turns aren't ended early.
+        rules = self.rules
+        rng = self.rng
+        last_turn = state.turns_taken + self.max_playout_turns
+
+        while state.turns_taken < last_turn and rules.get_winner(state) == -1:
+            actions = rules.get_legal_actions(state)
+
+            for action in actions:
+                if action[0] == "buy":
+                    break
+            else:
+                if len(actions) > 1:
+                    # END_ACTION is always last.
+                    action = actions[rng.randrange(len(actions) - 1)]
+                else:
+                    action = END_ACTION
+
+            rules.apply(state, action, rng)
+
+    def search(self, root_state: GameState, time_budget: float) -> tuple:
+        """Searches from root_state for time_budget seconds, and returns the best action."""
+        rules = self.rules
+        rng = self.rng
+        start_time = time.perf_counter()
+        deadline = start_time + time_budget
+
+        root = MCTSNode(None, None, -1)
+        num_nodes = 1
+        max_depth = 0
+        playouts = 0
+        cached_playouts = 0
+
+        hasher = self.hasher
+        table = self.table
+        table.clear()
+        root_hash = hasher.hash_state(root_state)
+
+        root_actions = rules.get_legal_actions(root_state)
+
+        # With only one choice, there is nothing to search.
+        while len(root_actions) > 1 and time.perf_counter() < deadline:
+            # Batches iterations between clock reads.
+            for _ in range(16):
+                state = root_state.copy()
+                state_hash = root_hash
+                node = root
+                depth = 0
+
+                # Selection: descends while every legal action has been tried.
+                while rules.get_winner(state) == -1:
+                    actions = rules.get_legal_actions(state)
+                    untried = [
+                        action for action in actions if action not in node.children
+                    ]
+
+                    if untried:
+                        # Expansion: adds one new child.
+                        action = untried[rng.randrange(len(untried))]
+                        child = MCTSNode(node, action, state.curr)
+                        node.children[action] = child
+                        num_nodes += 1
+
+                        state_hash = hasher.apply(state, action, rng, state_hash)
+                        node = child
+                        depth += 1
+                        break
+
+                    log_visits = log(node.visits)
+                    node = max(
+                        (node.children[action] for action in actions),
+                        key=lambda child: child.value / child.visits
+                        + self.exploration * sqrt(log_visits / child.visits),
+                    )
+
+                    state_hash = hasher.apply(state, node.action, rng, state_hash)
+                    depth += 1
+
+                max_depth = max(max_depth, depth)
+
+                # Simulation, unless the same position (reached by any order of actions)
+                # has already been played out enough times.
+                # Entries are [number of playouts, total reward per player].
+                entry = table.get(state_hash)
+
+                if entry is not None and entry[0] >= self.playouts_per_position:
+                    rewards = [total / entry[0] for total in entry[1]]
+                    cached_playouts += 1
+                else:
+                    self.playout(state)
+                    rewards = self.evaluate(state)
+                    playouts += 1
+
+                    if entry is None:
+                        entry = [0, [0.0] * len(rewards)]
+                    entry[0] += 1
+                    for num, reward in enumerate(rewards):
+                        entry[1][num] += reward
+                    # More playouts make an entry more worth keeping.
+                    table.put(state_hash, entry, depth=entry[0])
+
+                # Backpropagation.
+                while node is not None:
+                    node.visits += 1
+                    if node.player != -1:
+                        node.value += rewards[node.player]
+                    node = node.parent
+
+            # Lets other threads (such as the pygame loop) take the GIL.
+            time.sleep(0)
+
+        elapsed = time.perf_counter() - start_time
+
+        if root.children:
+            best = max(root.children.values(), key=lambda child: child.visits)
+            best_action = best.action
+            best_share = best.visits / root.visits
+        else:
+            best_action = root_actions[0]
+            best_share = 1.0
+
+        table_stats = table.get_stats()
+
+        self.stats = {
+            "playouts": playouts,
+            "playouts_per_sec": playouts / elapsed if elapsed else 0.0,
+            "cached_playouts": cached_playouts,
+            "table_hit_rate": table_stats["hit_rate"],
+            "table_fill": table_stats["fill"],
+            "elapsed": elapsed,
+            "nodes": num_nodes,
+            "max_depth": max_depth,
+            "root_children": len(root.children),
+            "best_share": best_share,
+        }
+
+        return best_action
+
+
+class MCTSWorker:
+    """
+    Runs MCTSBot searches on a background thread,
+    so the pygame loop only ever polls for a finished result.
+    """
+
+    def __init__(self, bot: MCTSBot, time_budget: float = 0.5):
+        self.bot = bot
+        self.time_budget = time_budget  # Seconds of search per action.
+
+        self.requests: queue.Queue = queue.Queue()
+        self.results: queue.Queue = queue.Queue()
+        self.searching = False
+        # Incremented to discard the results of searches that are no longer wanted.
+        self.generation = 0
+
+        self.thread = threading.Thread(
+            target=self.run, name="MCTSWorker", daemon=True
+        )
+        self.thread.start()
+
+    def get_is_searching(self) -> bool:
+        return self.searching
+
+    def get_stats(self) -> dict[str, float]:
+        return self.bot.get_stats()
+
+    def set_time_budget(self, time_budget: float) -> None:
+        # Used from the next search started.
+        self.time_budget = time_budget
+
+    def start_search(self, state: GameState) -> None:
+        # The state must be a copy, as the worker reads it while the game continues.
+        self.searching = True
+        self.requests.put((self.generation, state))
+
+    def get_result(self, timeout: float = 0.0) -> None | tuple:
+        # Returns the chosen action once the search has finished.
+        # Waits up to timeout seconds for it, so never blocks by default.
+        deadline = time.perf_counter() + timeout
+
+        while True:
+            try:
+                generation, action = self.results.get(
+                    timeout=max(deadline - time.perf_counter(), 0)
+                )
+            except queue.Empty:
+                return None
+
+            if generation == self.generation:
+                self.searching = False
+                return action
+
+    def cancel(self) -> None:
+        self.generation += 1
+        self.searching = False
+
+    def set_rules(self, rules: Rules) -> None:
+        # Sent through the request queue, so the bot's rules never change mid-search.
+        self.cancel()
+        self.requests.put((self.generation, rules))
+
+    def run(self) -> None:
+        while True:
+            generation, request = self.requests.get()
+
+            if isinstance(request, Rules):
+                self.bot.set_rules(request)
+                continue
+            elif generation != self.generation:
+                continue
+
+            with tracer.span("search", "ai", turns_taken=request.turns_taken):
+                action = self.bot.search(request, self.time_budget)
+
+            self.results.put((generation, action))
@@ -0,0 +1,500 @@
+from __future__ import annotations
+
+# avoiding circular imports in type hints
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from .batch import BatchSimulator
+    from .match_log import MatchLog
+    from .rules import Rules
+
+import os
+import struct
+
+import numpy as np
+
+from .batch import BUY, END, MOVE, TRADE
+from .columnar import ColumnarReader, ColumnarWriter
+from .match_log import EVENT, MOVE_EVENT
+from .rules import RANDOM_RESOURCE
+from .state import GameState
+
+
+# Where each game's records came from.
+SOURCE_RECORDED = 0
+SOURCE_SIMULATED = 1
+
+GAMES_FILE_NAME = "games.col"
+TURNS_FILE_NAME = "turns.col"
+
+GAME_COLUMNS = [
+    ("game", "<u4"),
+    ("source", "u1"),
+    ("seed", "<u4"),
+    ("players", "u1"),
+    ("turns", "<u4"),
+    ("winner", "i1"),  # -1 for games stopped before anyone won.
+    ("top_score", "<i2"),
+    ("first_buy_turn", "<i4"),  # -1 for games without purchases.
+    ("moves", "<u4"),
+    ("trades", "<u4"),
+    ("buys", "<u4"),
+]
+
+# Counted over each turn, in the order of the columns after the turn's player.
+TURN_COUNTS = ["moves", "trades", "buys", "station_income"]
+TRADE_COUNTS = ["trade_taken", "trade_given"]
+
+# Turn histograms go up to this turn, with later turns counted in the last bin.
+MAX_TURN_BIN = 255
+
+
+def get_turn_columns(resource_names: tuple[str, ...]) -> list[tuple[str, str]]:
+    # Planets give their own resource, so their income is split by resource.
+    return (
+        [("game", "<u4"), ("turn", "<u4"), ("player", "u1")]
+        + [(name, "<u2") for name in TURN_COUNTS]
+        + [(f"planet_income_{name}", "<u2") for name in resource_names]
+        + [(name, "<u2") for name in TRADE_COUNTS]
+        + [("score", "<i2")]
+    )
+
+
+def get_count_names(turn_columns: list[tuple]) -> list[str]:
+    # The turn columns counted over each turn: those between the player and the score.
+    return [name for name, _ in turn_columns[3:-1]]
+
+
+class GameStatsWriter:
+    """
+    Streams a row for each turn of each game, and then a row for the game,
+    to a pair of columnar files in out_dir (appending to any already there).
+
+    Turns are counted from the outcomes of Player.move(), Player.trade()
+    and Shop.buy_product(), as recorded in match logs or stepped by BatchSimulator.
+    """
+
+    def __init__(
+        self, out_dir: str, resource_names: tuple[str, ...], chunk_rows: int = 65536
+    ):
+        os.makedirs(out_dir, exist_ok=True)
+
+        self.resource_names = resource_names
+        self.games = ColumnarWriter(
+            os.path.join(out_dir, GAMES_FILE_NAME), GAME_COLUMNS, chunk_rows
+        )
+        self.turns = ColumnarWriter(
+            os.path.join(out_dir, TURNS_FILE_NAME),
+            get_turn_columns(resource_names),
+            chunk_rows,
+        )
+        self.count_names = get_count_names(get_turn_columns(resource_names))
+
+        self.next_game = self.games.get_num_rows()
+
+    def reserve_games(self, num_games: int) -> np.ndarray:
+        # Returns the ids for the next num_games games.
+        game_ids = np.arange(self.next_game, self.next_game + num_games, dtype=np.uint32)
+        self.next_game += num_games
+
+        return game_ids
+
+    def write_turns(
+        self,
+        game_ids: np.ndarray,
+        turns: np.ndarray,
+        players: np.ndarray,
+        counts: np.ndarray,
+        scores: np.ndarray,
+    ) -> None:
+        # counts is [row, count], in the order of count_names.
+        rows = {"game": game_ids, "turn": turns, "player": players, "score": scores}
+        for count_idx, name in enumerate(self.count_names):
+            rows[name] = counts[:, count_idx]
+
+        self.turns.append(rows)
+
+    def write_games(self, rows: dict[str, np.ndarray]) -> None:
+        self.games.append(rows)
+
+    def close(self) -> None:
+        self.games.close()
+        self.turns.close()
+
+
+# ---- Simulated games ----
+
+
+def record_simulated(
+    sim: BatchSimulator, writer: GameStatsWriter, max_turns: int, seed: int
+) -> int:
+    """
+    Plays every game of sim randomly, as BatchSimulator.run() does,
+    writing each turn as it ends and each game as it finishes.
+    Returns the number of turns written.
+
+    The outcome of each step is found from its legal mask and the positions
+    before and after, so the simulator itself is unchanged.
+    """
+    num_games = sim.num_games
+    num_resources = sim.num_resources
+    game_ids = writer.reserve_games(num_games)
+
+    # The counts so far in each game's current turn, as in writer.count_names.
+    counts = np.zeros((num_games, len(writer.count_names)), dtype=np.int32)
+    moves_idx, trades_idx, buys_idx, station_idx = range(len(TURN_COUNTS))
+    planet_start = len(TURN_COUNTS)
+    taken_idx = planet_start + num_resources
+    given_idx = taken_idx + 1
+
+    totals = np.zeros((num_games, 3), dtype=np.int64)  # moves, trades, buys
+    first_buy_turns = np.full(num_games, -1, dtype=np.int32)
+    num_turns_written = 0
+
+    while (
+        rows := np.flatnonzero((sim.winners == -1) & (sim.turns_taken < max_turns))
+    ).size:
+        masks = sim.get_legal_masks(rows)
+        action_type, action_arg = sim.random_actions(masks)
+
+        curr = sim.curr[rows]
+        turns_before = sim.turns_taken[rows]
+        players = rows * sim.num_players + curr
+        positions_before = sim.positions_flat[players]
+
+        legal = sim.step(action_type, action_arg, rows=rows, masks=masks)
+
+        # Moves, and what the tile moved onto gave.
+        is_move = legal & (action_type == MOVE)
+        if is_move.any():
+            movers = rows[is_move]
+            resource_idxs = sim.node_resources[sim.positions_flat[players[is_move]]]
+            counts[movers, moves_idx] += 1
+
+            station = resource_idxs == RANDOM_RESOURCE
+            counts[movers[station], station_idx] += 1
+
+            planet = resource_idxs >= 0
+            counts[movers[planet], planet_start + resource_idxs[planet]] += 1
+
+        # Trades, which take and give the same amounts each time at a station.
+        is_trade = legal & (action_type == TRADE)
+        if is_trade.any():
+            traders = rows[is_trade]
+            stations = positions_before[is_trade]
+            counts[traders, trades_idx] += 1
+            counts[traders, taken_idx] += sim.trade_amounts_taken[stations]
+            counts[traders, given_idx] += sim.trade_amounts_given[stations]
+
+        is_buy = legal & (action_type == BUY)
+        if is_buy.any():
+            buyers = rows[is_buy]
+            counts[buyers, buys_idx] += 1
+            first_buy = buyers[first_buy_turns[buyers] == -1]
+            first_buy_turns[first_buy] = sim.turns_taken[first_buy]
+
+        # Turns that ended, including those ended by a win.
+        ended = (sim.turns_taken[rows] > turns_before) | (sim.winners[rows] != -1)
+        if ended.any():
+            ended_games = rows[ended]
+            writer.write_turns(
+                game_ids[ended_games],
+                turns_before[ended],
+                curr[ended],
+                counts[ended_games],
+                sim.scores_flat[players[ended]],
+            )
+            totals[ended_games] += counts[ended_games, :3]
+            counts[ended_games] = 0
+            num_turns_written += ended_games.size
+
+        finished = rows[
+            (sim.winners[rows] != -1) | (sim.turns_taken[rows] >= max_turns)
+        ]
+        if finished.size:
+            writer.write_games(
+                {
+                    "game": game_ids[finished],
+                    "source": np.full(finished.size, SOURCE_SIMULATED),
+                    "seed": np.full(finished.size, seed),
+                    "players": np.full(finished.size, sim.num_players),
+                    "turns": sim.turns_taken[finished],
+                    "winner": sim.winners[finished],
+                    "top_score": sim.scores[finished].max(axis=1),
+                    "first_buy_turn": first_buy_turns[finished],
+                    "moves": totals[finished, 0],
+                    "trades": totals[finished, 1],
+                    "buys": totals[finished, 2],
+                }
+            )
+
+    return num_turns_written
+
+
+# ---- Recorded games ----
+
+
+def record_match_log(
+    match_log: MatchLog, rules: Rules, writer: GameStatsWriter
+) -> int:
+    """
+    Replays a recorded match, writing each of its turns and then the game.
+    rules must be for the match's board, to tell trading stations from planets.
+    Returns the number of turns written.
+    """
+    num_resources = len(writer.resource_names)
+    moves_idx, trades_idx, buys_idx, station_idx = range(len(TURN_COUNTS))
+    planet_start = len(TURN_COUNTS)
+    taken_idx = planet_start + num_resources
+    given_idx = taken_idx + 1
+    trade_changes = struct.Struct(f"<{num_resources}h")
+
+    state = GameState(rules.resource_names)
+    turn_rows: list[tuple[int, int, list[int], int]] = []
+    counts = [0] * len(writer.count_names)
+    totals = [0, 0, 0]
+    first_buy_turn = -1
+    turn_player = -1
+
+    def end_turn(turn: int) -> None:
+        nonlocal counts
+        turn_rows.append((turn, turn_player, counts, state.scores[turn_player]))
+        for total_idx in range(3):
+            totals[total_idx] += counts[total_idx]
+        counts = [0] * len(writer.count_names)
+
+    for event_type, num, offset in match_log.iter_replay(state):
+        payload_offset = offset + EVENT.size
+
+        if event_type == MOVE:
+            x, y, resource_idx = MOVE_EVENT.unpack_from(match_log.data, payload_offset)
+            counts[moves_idx] += 1
+
+            if rules.node_resources[(x, y)] == RANDOM_RESOURCE:
+                counts[station_idx] += 1
+            elif resource_idx >= 0:
+                counts[planet_start + resource_idx] += 1
+        elif event_type == TRADE:
+            counts[trades_idx] += 1
+
+            # A trade that couldn't be afforded changes nothing.
+            if any(trade_changes.unpack_from(match_log.data, payload_offset)):
+                _, amount_taken, amount_given = rules.trades[state.get_pos(num)]
+                counts[taken_idx] += amount_taken
+                counts[given_idx] += amount_given
+        elif event_type == BUY:
+            counts[buys_idx] += 1
+            if first_buy_turn == -1:
+                first_buy_turn = state.turns_taken
+        elif event_type == END:
+            end_turn(state.turns_taken - 1)
+
+        turn_player = state.curr
+
+    # A match ends partway through the winner's turn.
+    if any(counts) and turn_player >= 0:
+        end_turn(state.turns_taken)
+
+    (game_id,) = writer.reserve_games(1)
+
+    if turn_rows:
+        turns, players, turn_counts, scores = zip(*turn_rows)
+        writer.write_turns(
+            np.full(len(turn_rows), game_id),
+            np.array(turns),
+            np.array(players),
+            np.array(turn_counts, dtype=np.int32),
+            np.array(scores),
+        )
+
+    writer.write_games(
+        {
+            "game": [game_id],
+            "source": [SOURCE_RECORDED],
+            "seed": [match_log.get_seed()],
+            "players": [len(state.scores)],
+            "turns": [state.turns_taken],
+            "winner": [rules.get_winner(state)],
+            "top_score": [max(state.scores, default=0)],
+            "first_buy_turn": [first_buy_turn],
+            "moves": [totals[0]],
+            "trades": [totals[1]],
+            "buys": [totals[2]],
+        }
+    )
+
+    return len(turn_rows)
+
+
+# ---- Aggregation ----
+
+
+def get_chunk_tasks(stats_dir: str) -> list[tuple[str, str, int, int]]:
+    # (file path, table, offset, number of rows) for every chunk of both tables.
+    tasks = []
+
+    for table, file_name in (("games", GAMES_FILE_NAME), ("turns", TURNS_FILE_NAME)):
+        file_path = os.path.join(stats_dir, file_name)
+        if not os.path.exists(file_path):
+            continue
+
+        reader = ColumnarReader(file_path)
+        tasks.extend(
+            (file_path, table, offset, num_rows)
+            for offset, num_rows in reader.get_chunks()
+        )
+        reader.close()
+
+    return tasks
+
+
+# Readers opened by this process, by file path, as each worker reads many chunks.
+readers: dict[str, ColumnarReader] = {}
+
+
+def aggregate_chunk(task: tuple[str, str, int, int]) -> dict[str, np.ndarray]:
+    """
+    Sums and histograms over one chunk, read from its memory map.
+    Results from every chunk are merged by adding them.
+    """
+    file_path, table, offset, num_rows = task
+
+    if file_path not in readers:
+        readers[file_path] = ColumnarReader(file_path)
+    columns = readers[file_path].read_chunk(offset, num_rows)
+
+    if table == "games":
+        winners = columns["winner"]
+        won = winners >= 0
+        first_buy_turns = columns["first_buy_turn"]
+        bought = first_buy_turns >= 0
+
+        return {
+            "games": np.array(num_rows),
+            "games_won": np.array(int(won.sum())),
+            "games_by_source": np.bincount(columns["source"], minlength=2),
+            "wins_by_seat": np.bincount(winners[won], minlength=8)[:8],
+            "games_by_players": np.bincount(columns["players"], minlength=9)[:9],
+            "turns_to_win": np.bincount(
+                np.minimum(columns["turns"][won], MAX_TURN_BIN),
+                minlength=MAX_TURN_BIN + 1,
+            ),
+            "first_buy_turn": np.bincount(
+                np.minimum(first_buy_turns[bought], MAX_TURN_BIN),
+                minlength=MAX_TURN_BIN + 1,
+            ),
+        }
+
+    turns = np.minimum(columns["turn"], MAX_TURN_BIN)
+    count_names = get_count_names(readers[file_path].get_columns())
+
+    return {
+        "turns": np.array(num_rows),
+        "turn_sums": np.array(
+            [int(columns[name].sum(dtype=np.int64)) for name in count_names]
+        ),
+        "turns_with_trade": np.array(int((columns["trades"] > 0).sum())),
+        "buys_by_turn": np.bincount(
+            turns, weights=columns["buys"], minlength=MAX_TURN_BIN + 1
+        ),
+        "turns_by_turn": np.bincount(turns, minlength=MAX_TURN_BIN + 1),
+    }
+
+
+def merge_aggregates(
+    total: dict[str, np.ndarray], part: dict[str, np.ndarray]
+) -> dict[str, np.ndarray]:
+    for name, values in part.items():
+        total[name] = total[name] + values if name in total else values
+
+    return total
+
+
+def get_histogram_percentile(histogram: np.ndarray, fraction: float) -> int:
+    # The bin at which the histogram's cumulative count reaches fraction of its total.
+    cumulative = np.cumsum(histogram)
+    return int(np.searchsorted(cumulative, fraction * cumulative[-1]))
+
+
+def get_report(aggregates: dict[str, np.ndarray], count_names: list[str]) -> list[str]:
+    # Readable lines summarising the merged aggregates.
+    lines = []
+
+    if "games" in aggregates:
+        num_games = int(aggregates["games"])
+        num_won = int(aggregates["games_won"])
+        recorded, simulated = aggregates["games_by_source"][:2]
+        lines.append(
+            f"Games: {num_games:,} ({recorded:,} recorded, {simulated:,} simulated), "
+            f"{num_won:,} won"
+        )
+
+        if num_won:
+            turns_to_win = aggregates["turns_to_win"]
+            mean = (turns_to_win * np.arange(turns_to_win.size)).sum() / num_won
+            lines.append(
+                f"Turns to win: mean {mean:.1f}, "
+                f"median {get_histogram_percentile(turns_to_win, 0.5)}, "
+                f"p90 {get_histogram_percentile(turns_to_win, 0.9)}"
+            )
+
+            wins_by_seat = aggregates["wins_by_seat"]
+            lines.append(
+                "Wins by seat: "
+                + ", ".join(
+                    f"P{seat + 1} {wins / num_won:.1%}"
+                    for seat, wins in enumerate(wins_by_seat)
+                    if wins
+                )
+            )
+
+        first_buy_turn = aggregates["first_buy_turn"]
+        if num_bought := int(first_buy_turn.sum()):
+            lines.append(
+                f"First purchase: in {num_bought / num_games:.1%} of games, "
+                f"median turn {get_histogram_percentile(first_buy_turn, 0.5)}"
+            )
+
+    if "turns" in aggregates and (num_turns := int(aggregates["turns"])):
+        sums = dict(zip(count_names, aggregates["turn_sums"]))
+        lines.append(f"Turns: {num_turns:,}")
+        lines.append(
+            f"Per turn: {sums['moves'] / num_turns:.2f} moves, "
+            f"{sums['trades'] / num_turns:.3f} trades, "
+            f"{sums['buys'] / num_turns:.3f} purchases "
+            f"(trades in {int(aggregates['turns_with_trade']) / num_turns:.1%} of turns)"
+        )
+
+        income = {
+            name.removeprefix("planet_income_"): total
+            for name, total in sums.items()
+            if name.startswith("planet_income_")
+        }
+        income["trading stations"] = sums["station_income"]
+        income["trades (net)"] = sums["trade_given"] - sums["trade_taken"]
+        lines.append(
+            "Income per turn by tile type: "
+            + ", ".join(
+                f"{name} {total / num_turns:.3f}" for name, total in income.items()
+            )
+        )
+
+        buys_by_turn = aggregates["buys_by_turn"]
+        turns_by_turn = aggregates["turns_by_turn"]
+        if buys_by_turn.sum():
+            lines.append(
+                f"Purchases: median at turn {get_histogram_percentile(buys_by_turn, 0.5)}, "
+                f"p90 at turn {get_histogram_percentile(buys_by_turn, 0.9)}"
+            )
+
+            # Purchase rate per turn in the first turns, in blocks of 10.
+            rates = []
+            for start in range(0, 50, 10):
+                block_turns = turns_by_turn[start : start + 10].sum()
+                if block_turns:
+                    rates.append(
+                        f"{start}-{start + 9}: {buys_by_turn[start : start + 10].sum() / block_turns:.3f}"
+                    )
+            lines.append("Purchases per turn by turn: " + ", ".join(rates))
+
+    return lines
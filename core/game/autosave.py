@@ -0,0 +1,143 @@
+from __future__ import annotations
+
+import json
+import os
+import queue
+import struct
+import sys
+import threading
+
+from .state import GameState
+
+
+SAVE_MAGIC = b"EMPG"
+SAVE_VERSION = 1
+
+# magic, version, length of the JSON metadata
+# Then the metadata (board layout, players and scenes), then the GameState's bytes.
+SAVE_HEADER = struct.Struct("<4sBI")
+
+
+class Autosaver:
+    """
+    Saves in-progress games to one file, on a background thread.
+
+    The pygame loop only hands over a snapshot: the state is copied
+    and everything else is plain lists that don't change after they're made.
+    Encoding, writing and fsyncing happen on the thread, and the file is
+    written next to the old one then renamed over it, so a crash mid-save
+    leaves the last complete save. If saves arrive faster than they're
+    written, only the newest is written.
+    """
+
+    def __init__(self, file_path: str, interval: float = 5.0):
+        self.file_path = file_path
+        self.interval = interval  # Seconds between saves of a changing game.
+
+        # Kept up to date by the pygame loop, so the title scene never checks the disk.
+        self.exists = os.path.exists(file_path)
+
+        self.requests: queue.Queue = queue.Queue()
+
+        self.thread = threading.Thread(target=self.run, name="Autosaver", daemon=True)
+        self.thread.start()
+
+    def get_exists(self) -> bool:
+        # Whether there's a saved game to resume.
+        return self.exists
+
+    def get_file_path(self) -> str:
+        return self.file_path
+
+    def get_interval(self) -> float:
+        return self.interval
+
+    def save(self, metadata: dict, state: GameState) -> None:
+        # state must be a copy, and metadata never changed afterwards. Never blocks.
+        self.exists = True
+        self.requests.put((metadata, state))
+
+    def remove(self) -> None:
+        # Deletes the save, once any still queued have been written.
+        self.exists = False
+        self.requests.put(())
+
+    def close(self) -> None:
+        # Writes anything still queued, then stops the thread.
+        self.requests.put(None)
+        self.thread.join()
+
+    def run(self) -> None:
+        while True:
+            request = self.requests.get()
+            closing = request is None
+
+            # Skips to the newest request, as each replaces the one before,
+            # but still carries out the last one queued before closing.
+            while not closing:
+                try:
+                    next_request = self.requests.get_nowait()
+                except queue.Empty:
+                    break
+
+                if next_request is None:
+                    closing = True
+                else:
+                    request = next_request
+
+            try:
+                if request:
+                    self.write(*request)
+                elif request is not None and os.path.exists(self.file_path):
+                    os.remove(self.file_path)
+            except OSError as e:
+                print(f"Autosave to {self.file_path} failed: {e!r}", file=sys.stderr)
+
+            if closing:
+                return
+
+    def write(self, metadata: dict, state: GameState) -> None:
+        metadata_bytes = json.dumps(metadata, separators=(",", ":")).encode()
+        temp_file_path = f"{self.file_path}.tmp"
+
+        with open(temp_file_path, "wb") as f:
+            f.write(SAVE_HEADER.pack(SAVE_MAGIC, SAVE_VERSION, len(metadata_bytes)))
+            f.write(metadata_bytes)
+            f.write(state.to_bytes())
+            f.flush()
+            os.fsync(f.fileno())
+
+        os.replace(temp_file_path, self.file_path)
+
+        # The rename itself is only durable once the folder is synced (where folders can be opened).
+        if hasattr(os, "O_DIRECTORY"):
+            dir_fd = os.open(
+                os.path.dirname(os.path.abspath(self.file_path)), os.O_DIRECTORY
+            )
+            try:
+                os.fsync(dir_fd)
+            finally:
+                os.close(dir_fd)
+
+
+def load_save(file_path: str) -> tuple[dict, GameState]:
+    # Reads a file written by Autosaver, as (metadata, state).
+    with open(file_path, "rb") as f:
+        data = f.read()
+
+    if len(data) < SAVE_HEADER.size:
+        raise ValueError(f"{file_path} is too short to be a saved game.")
+
+    magic, version, metadata_len = SAVE_HEADER.unpack_from(data)
+
+    if magic != SAVE_MAGIC:
+        raise ValueError(f"{file_path} is not a saved game.")
+    if version != SAVE_VERSION:
+        raise ValueError(
+            f"Unsupported saved game version {version} (expected {SAVE_VERSION})."
+        )
+
+    metadata_end = SAVE_HEADER.size + metadata_len
+    metadata = json.loads(data[SAVE_HEADER.size : metadata_end])
+
+    return metadata, GameState.from_bytes(data[metadata_end:])
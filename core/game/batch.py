@@ -0,0 +1,437 @@
+from __future__ import annotations
+
+# avoiding circular imports in type hints
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from .rules import Rules
+
+import numpy as np
+
+from array import array
+
+from .effects import (
+    COMPARISON_FUNCS,
+    KIND_ACTIONS_LEFT,
+    KIND_ACTIONS_PER_TURN,
+    KIND_NONE,
+    KIND_SCORE,
+    NOW,
+    Effect,
+)
+from .rules import NO_RESOURCE, RANDOM_RESOURCE
+from .state import GameState
+
+
+# Action types, as stored in the action_type arrays passed to BatchSimulator.step().
+MOVE = 0  # action_arg is the slot of the destination in the adjacency array.
+TRADE = 1
+BUY = 2  # action_arg is the product index, starting from 0.
+END = 3
+
+
+def get_product_ops(rules: Rules) -> list[tuple[tuple[int, ...], ...]]:
+    """
+    Returns every product's purchase as effect opcodes (see effects.py),
+    ending with the product's own score.
+
+    Compiled effects are used as they are. Other effects are arbitrary functions,
+    so they're applied to a probe state and only the change they make
+    to actions per turn and score is simulated.
+    """
+    products_ops = []
+
+    for _, score, effect in rules.products:
+        if isinstance(effect, Effect):
+            ops = effect.ops
+        else:
+            probe = GameState(rules.resource_names)
+            probe.add_player((0, 0))
+
+            effect(probe, 0)
+
+            ops = (
+                (
+                    NOW,
+                    KIND_ACTIONS_PER_TURN,
+                    0,
+                    probe.actions_per_turn[0] - 2,
+                    KIND_NONE,
+                    0,
+                    0,
+                    0,
+                ),
+                (NOW, KIND_SCORE, 0, probe.scores[0], KIND_NONE, 0, 0, 0),
+            )
+
+        products_ops.append(
+            ops + ((NOW, KIND_SCORE, 0, score, KIND_NONE, 0, 0, 0),)
+        )
+
+    return products_ops
+
+
+class BatchSimulator:
+    """
+    Steps many games at once, in lockstep, with NumPy arrays.
+
+    Every game has the same board and number of players.
+    Arrays are indexed [game], [game, player] or [game, player, resource].
+    Tiles are referred to by node id: their index in self.nodes.
+    """
+
+    def __init__(
+        self,
+        rules: Rules,
+        num_games: int,
+        num_players: int,
+        seed: None | int = None,
+    ):
+        self.rules = rules
+        self.num_games = num_games
+        self.num_players = num_players
+        self.num_resources = rules.num_resources
+        self.rng = np.random.default_rng(seed)
+
+        # ---- Board, as arrays ----
+        self.nodes = sorted(rules.graph)
+        self.node_ids = {node: node_id for node_id, node in enumerate(self.nodes)}
+        num_nodes = len(self.nodes)
+
+        # Adjacency padded to the highest degree with -1.
+        self.degrees = np.array(
+            [len(rules.graph[node]) for node in self.nodes], dtype=np.int32
+        )
+        self.adjs = np.full(
+            (num_nodes, max(self.degrees, default=0)), -1, dtype=np.int32
+        )
+        for node_id, node in enumerate(self.nodes):
+            for slot, conn in enumerate(rules.graph[node]):
+                self.adjs[node_id, slot] = self.node_ids[conn]
+
+        self.node_resources = np.array(
+            [rules.node_resources[node] for node in self.nodes], dtype=np.int32
+        )
+
+        # -1 where a tile can't trade.
+        self.trade_types = np.full(num_nodes, -1, dtype=np.int32)
+        self.trade_amounts_taken = np.zeros(num_nodes, dtype=np.int32)
+        self.trade_amounts_given = np.zeros(num_nodes, dtype=np.int32)
+        for node, (type_taken, amount_taken, amount_given) in rules.trades.items():
+            node_id = self.node_ids[node]
+            self.trade_types[node_id] = type_taken
+            self.trade_amounts_taken[node_id] = amount_taken
+            self.trade_amounts_given[node_id] = amount_given
+
+        # ---- Products, as arrays ----
+        self.costs = np.array(
+            [cost for cost, _, _ in rules.products], dtype=np.int32
+        ).reshape(len(rules.products), self.num_resources)
+        self.products_ops = get_product_ops(rules)
+
+        self.game_idxs = np.arange(num_games)
+
+        self.reset()
+
+    def reset(self) -> None:
+        # Starts every game again, with players on random non-empty tiles.
+        shape = (self.num_games, self.num_players)
+
+        self.positions = self.rng.integers(
+            len(self.nodes), size=shape, dtype=np.int32
+        )
+        self.resources = np.zeros(
+            (*shape, self.num_resources), dtype=np.int32
+        )
+        self.scores = np.zeros(shape, dtype=np.int32)
+        self.actions_per_turn = np.full(shape, 2, dtype=np.int32)
+        self.actions_left = np.full(shape, 2, dtype=np.int32)
+        # Score, then each resource, paid at the start of each of the player's turns.
+        self.income = np.zeros((*shape, 1 + self.num_resources), dtype=np.int32)
+        self.curr = np.zeros(self.num_games, dtype=np.int32)
+        self.turns_taken = np.zeros(self.num_games, dtype=np.int32)
+        self.winners = np.full(self.num_games, -1, dtype=np.int32)
+
+        self.make_flat_views()
+
+    def make_flat_views(self) -> None:
+        # Views indexed by game * num_players + player, as one flat index
+        # is much faster for NumPy to gather and scatter than a pair.
+        self.positions_flat = self.positions.reshape(-1)
+        self.resources_flat = self.resources.reshape(-1, self.num_resources)
+        self.scores_flat = self.scores.reshape(-1)
+        self.actions_per_turn_flat = self.actions_per_turn.reshape(-1)
+        self.actions_left_flat = self.actions_left.reshape(-1)
+        self.income_flat = self.income.reshape(-1, 1 + self.num_resources)
+
+    def load_state(self, state: GameState) -> None:
+        # Sets every game to a copy of one GameState.
+        for num in range(self.num_players):
+            self.positions[:, num] = self.node_ids[state.get_pos(num)]
+            self.resources[:, num] = state.get_resource_row(num)
+
+        self.scores[:] = state.scores
+        self.actions_per_turn[:] = state.actions_per_turn
+        self.actions_left[:] = state.actions_left
+        self.income[:] = np.array(state.income, dtype=np.int32).reshape(
+            self.num_players, 1 + self.num_resources
+        )
+        self.curr[:] = state.curr
+        self.turns_taken[:] = state.turns_taken
+        self.winners[:] = self.rules.get_winner(state)
+
+    def get_state(self, game_idx: int) -> GameState:
+        # Copies one game out into a GameState, for the scalar rules or the UI.
+        state = GameState(self.rules.resource_names)
+
+        for num in range(self.num_players):
+            state.add_player(
+                self.nodes[self.positions[game_idx, num]],
+                int(self.actions_per_turn[game_idx, num]),
+            )
+
+        state.resources[:] = array("i", self.resources[game_idx].ravel().tolist())
+        state.scores[:] = array("i", self.scores[game_idx].tolist())
+        state.actions_left[:] = array("i", self.actions_left[game_idx].tolist())
+        state.income[:] = array("i", self.income[game_idx].ravel().tolist())
+        state.curr = int(self.curr[game_idx])
+        state.turns_taken = int(self.turns_taken[game_idx])
+
+        return state
+
+    # ---- Legality ----
+
+    def get_affordable(self) -> np.ndarray:
+        """Returns a [game, product] mask of what each game's current player can afford."""
+        resources = self.resources[self.game_idxs, self.curr]
+
+        return (resources[:, None, :] >= self.costs[None, :, :]).all(axis=2)
+
+    def get_legal_masks(
+        self, rows: np.ndarray
+    ) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Returns ([row, slot] moves, [row] trade, [row, product] buy) masks
+        for the current player of each game in rows.
+        Finished games have no legal actions other than END.
+        """
+        players = rows * self.num_players + self.curr[rows]
+        positions = self.positions_flat[players]
+        playing = self.winners[rows] == -1
+        has_actions = playing & (self.actions_left_flat[players] > 0)
+
+        moves = (self.adjs[positions] >= 0) & has_actions[:, None]
+        trades = np.zeros(len(rows), dtype=bool)
+        buys = np.zeros((len(rows), len(self.costs)), dtype=bool)
+
+        # Only a few players are on a trading station at once,
+        # so their resources are only compared against costs there.
+        traders = np.flatnonzero((self.trade_types[positions] >= 0) & playing)
+
+        if traders.size:
+            trader_positions = positions[traders]
+            resources = self.resources_flat[players[traders]]
+
+            trades[traders] = has_actions[traders] & (
+                resources[
+                    np.arange(traders.size), self.trade_types[trader_positions]
+                ]
+                >= self.trade_amounts_taken[trader_positions]
+            )
+            buys[traders] = (
+                resources[:, None, :] >= self.costs[None, :, :]
+            ).all(axis=2)
+
+        return moves, trades, buys
+
+    # ---- Stepping ----
+
+    def get_values(self, kind: int, idx: int) -> np.ndarray:
+        # The flat array (or resource column view) an effect opcode refers to.
+        if kind == KIND_SCORE:
+            return self.scores_flat
+        elif kind == KIND_ACTIONS_PER_TURN:
+            return self.actions_per_turn_flat
+        elif kind == KIND_ACTIONS_LEFT:
+            return self.actions_left_flat
+
+        return self.resources_flat[:, idx]
+
+    def apply_product(self, buyers: np.ndarray, product_idx: int) -> None:
+        # Applies one product's opcodes to every player in buyers at once.
+        for trigger, kind, idx, delta, cond_kind, cond_idx, cmp, value in (
+            self.products_ops[product_idx]
+        ):
+            targets = buyers
+
+            if cond_kind != KIND_NONE:
+                targets = buyers[
+                    COMPARISON_FUNCS[cmp](
+                        self.get_values(cond_kind, cond_idx)[buyers], value
+                    )
+                ]
+
+            if trigger == NOW:
+                self.get_values(kind, idx)[targets] += delta
+            else:
+                self.income_flat[
+                    targets, 0 if kind == KIND_SCORE else idx + 1
+                ] += delta
+
+    def update_winners(self, games: np.ndarray) -> None:
+        # Ties go to the later player, as in Rules.get_winner().
+        best = self.num_players - 1 - np.argmax(self.scores[games, ::-1], axis=1)
+        won = self.scores[games, best] >= self.rules.winning_score
+        self.winners[games[won]] = best[won]
+
+    def step(
+        self,
+        action_type: np.ndarray,
+        action_arg: np.ndarray,
+        rows: None | np.ndarray = None,
+        masks: None | tuple[np.ndarray, np.ndarray, np.ndarray] = None,
+    ) -> np.ndarray:
+        """
+        Applies one action to each game in rows (all games by default),
+        and returns a mask of which actions were legal.
+        Illegal actions end the turn instead.
+
+        The action arrays line up with rows.
+        masks can be passed in if get_legal_masks(rows) was already called.
+        """
+        if rows is None:
+            rows = self.game_idxs
+        moves, trades, buys = masks or self.get_legal_masks(rows)
+        players = rows * self.num_players + self.curr[rows]
+        row_idxs = np.arange(len(rows))
+
+        # Out-of-range arguments are clipped, then found illegal by the masks.
+        # The extra False column handles boards or shops with nothing in them.
+        moves = np.pad(moves, ((0, 0), (0, 1)))
+        buys = np.pad(buys, ((0, 0), (0, 1)))
+        is_move = (action_type == MOVE) & moves[
+            row_idxs, np.clip(action_arg, 0, moves.shape[1] - 1)
+        ]
+        is_trade = (action_type == TRADE) & trades
+        is_buy = (action_type == BUY) & buys[
+            row_idxs, np.clip(action_arg, 0, buys.shape[1] - 1)
+        ]
+        legal = is_move | is_trade | is_buy | (action_type == END)
+        is_end = ~(is_move | is_trade | is_buy)
+
+        # Moves.
+        if is_move.any():
+            movers = players[is_move]
+            new_positions = self.adjs[
+                self.positions_flat[movers], action_arg[is_move]
+            ]
+            self.positions_flat[movers] = new_positions
+            self.actions_left_flat[movers] -= 1
+
+            resource_idxs = self.node_resources[new_positions]
+            random_resources = resource_idxs == RANDOM_RESOURCE
+            resource_idxs[random_resources] = self.rng.integers(
+                self.num_resources, size=int(random_resources.sum())
+            )
+            gives = resource_idxs != NO_RESOURCE
+            self.resources_flat[movers[gives], resource_idxs[gives]] += 1
+
+            # As in SceneManager.game_scene(), running out of moves ends the turn.
+            is_end[is_move] = self.actions_left_flat[movers] <= 0
+
+        # Trades, with the given resources drawn from one multinomial per game.
+        if is_trade.any():
+            traders = players[is_trade]
+            positions = self.positions_flat[traders]
+
+            self.resources_flat[
+                traders, self.trade_types[positions]
+            ] -= self.trade_amounts_taken[positions]
+            self.resources_flat[traders] += self.rng.multinomial(
+                self.trade_amounts_given[positions],
+                np.full(self.num_resources, 1 / self.num_resources),
+            ).astype(np.int32)
+            self.actions_left_flat[traders] = 0
+
+        # Purchases.
+        if is_buy.any():
+            games = rows[is_buy]
+            buyers = players[is_buy]
+            product_idxs = action_arg[is_buy]
+
+            self.resources_flat[buyers] -= self.costs[product_idxs]
+
+            # Products are few, so each one's effect is applied to all its buyers together.
+            for product_idx in np.unique(product_idxs):
+                self.apply_product(
+                    buyers[product_idxs == product_idx], int(product_idx)
+                )
+
+            self.update_winners(games)
+
+        # Ending turns (finished games stay as they are).
+        games = rows[is_end]
+        games = games[self.winners[games] == -1]
+        if games.size:
+            self.turns_taken[games] += 1
+            self.curr[games] = (self.curr[games] + 1) % self.num_players
+            next_players = games * self.num_players + self.curr[games]
+            self.actions_left_flat[next_players] = self.actions_per_turn_flat[
+                next_players
+            ]
+
+            # Income, as in GameState.cycle_curr().
+            incomes = self.income_flat[next_players]
+            if incomes.any():
+                self.scores_flat[next_players] += incomes[:, 0]
+                self.resources_flat[next_players] += incomes[:, 1:]
+                self.update_winners(games)
+
+        return legal
+
+    def random_actions(
+        self, masks: tuple[np.ndarray, np.ndarray, np.ndarray]
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Chooses an action for each row of masks with the same policy as MCTSBot.playout():
+        buy if possible, otherwise a random move or trade, otherwise end the turn.
+        """
+        moves, trades, buys = masks
+        num_rows = len(trades)
+
+        # Gives every legal choice a random weight, then takes the highest.
+        options = np.concatenate([moves, trades[:, None]], axis=1)
+        weights = np.where(options, self.rng.random(options.shape), -1.0)
+        choice = np.argmax(weights, axis=1)
+        has_option = options.any(axis=1)
+
+        action_type = np.full(num_rows, END, dtype=np.int32)
+        action_arg = np.zeros(num_rows, dtype=np.int32)
+
+        num_slots = moves.shape[1]
+        is_move = has_option & (choice < num_slots)
+        action_type[is_move] = MOVE
+        action_arg[is_move] = choice[is_move]
+        action_type[has_option & (choice == num_slots)] = TRADE
+
+        can_buy = buys.any(axis=1)
+        action_type[can_buy] = BUY
+        action_arg[can_buy] = np.argmax(buys, axis=1)[can_buy]
+
+        return action_type, action_arg
+
+    def run(self, max_turns: int) -> np.ndarray:
+        """
+        Plays every game randomly until it has a winner or has taken max_turns turns.
+        Returns the winners (-1 for unfinished games).
+        """
+        # Only games still being played are stepped.
+        while (
+            rows := np.flatnonzero(
+                (self.winners == -1) & (self.turns_taken < max_turns)
+            )
+        ).size:
+            masks = self.get_legal_masks(rows)
+            self.step(*self.random_actions(masks), rows=rows, masks=masks)
+
+        return self.winners
@@ -11,16 +11,17 @@ import pygame
 
 from collections import defaultdict
 from random import choice, randint, sample
-from typing import Iterator, TypedDict
+from typing import Callable, Iterable, Iterator, TypedDict
 
 from .helper import (
     find_dist,
     get_adjs,
     get_conns,
-    get_min_conns_dist,
+    get_is_within_conns_dist,
     merge_sort,
 )
 from .tile import Tile, TraderTile
+from ..tracing import tracer
 
 
 class Board:
@@ -36,6 +37,7 @@ class Board:
         sprite_sheet: SpriteSheet,
         icon_sprite_sheet: SpriteSheet,
         tiles: dict[str, int],
+        trade: None | dict[str, int] = None,
     ):
         self.dims = dims
         self.line_colour = line_colour
@@ -45,13 +47,65 @@ class Board:
         self.window_size = window_size
         self.sprite_sheet = sprite_sheet
         self.icon_sprite_sheet = icon_sprite_sheet
+        # The amounts taken and given by every trading station.
+        self.trade = trade or {"amount_taken": 5, "amount_given": 4}
 
-        self.tile_order = self.order_tiles(tiles)
+        # The amount of each tile type, kept for generating boards later.
+        self.tiles = tiles
         self.tile_size: tuple[int, int] = (
             tile_base_size[0] + tile_border_size[0],
             tile_base_size[1] + tile_border_size[1],
         )
 
+        # Tiles of the last board, by class, reused by the next board instead of made again.
+        self.tile_pools: dict[type, list[Tile]] = {Tile: [], TraderTile: []}
+        self.matrix: list[list[Tile]] = []
+
+        # The lines and tiles are drawn into this layer once, then only redrawn
+        # inside the rects in dirty_rects, when board events change the board.
+        # Icons are partly transparent, so they're drawn over it every frame instead.
+        self.layer: None | pygame.Surface = None
+        self.layer_rect = pygame.Rect(0, 0, 0, 0)
+        self.dirty_rects: list[pygame.Rect] = []
+        # Only what's inside the layer, so boards bigger than the window cost no more to draw.
+        self.layer_edges: set[tuple[tuple[int, int], tuple[int, int]]] = set()
+        self.icons: dict[tuple[int, int], tuple[pygame.Surface, pygame.Rect]] = {}
+
+        self.set_dims(dims)
+        self.generate()
+
+    def generate(self) -> None:
+        # Generates a new board from the global random state, reusing the last board's tiles.
+        with tracer.span("order_tiles", "board"):
+            self.tile_order = self.order_tiles(self.tiles)
+
+        tiles_start = tracer.get_ts()
+        self.release_tiles()
+
+        # Generated by a 2D list comprehension using the iterable in self.tile_order.
+        self.matrix = [
+            [
+                self.create_tile(i, j, next(self.tile_order))
+                # Generates 1 tile object per column in the row.
+                for i in range(self.dims[0])
+            ]
+            # Generates 1 array of tile objects per row.
+            for j in range(self.dims[1])
+        ]
+
+        tracer.complete("create tiles", "board", tiles_start, dims=self.dims)
+
+        with tracer.span("create_graph", "board", dims=self.dims):
+            self.graph = self.create_graph(self.matrix)
+        self.order_nodes()
+
+        # Made the first time they're needed, by get_layout() and render_to().
+        self.layout: None | dict = None
+        self.layer = None
+
+    def set_dims(self, dims: tuple[int, int]) -> None:
+        # Centres the board in the window.
+        self.dims = dims
         self.pos = (
             int(
                 (
@@ -75,45 +129,109 @@ class Board:
             self.pos[1] + self.tile_size[1] * self.dims[1],
         )
 
-        # Generated by a 2D list comprehension using the iterable in self.tile_order.s
+    def release_tiles(self) -> None:
+        # Returns every tile of the board to the pools, for the next board.
+        for row in self.matrix:
+            for tile in row:
+                self.tile_pools[type(tile)].append(tile)
+
+        self.matrix = []
+
+    def create_tile(self, i: int, j: int, tile_attrs: dict) -> Tile | TraderTile:
+        # Trading stations have their own class, for their trading behaviour.
+        tile_class = (
+            TraderTile
+            if self.get_tile_behaviour_type_from_tile_type(tile_attrs["type"])
+            == "trader"
+            else Tile
+        )
+        centre_pos = (
+            int((i + 0.5) * self.tile_size[0] + self.pos[0]),
+            int((j + 0.5) * self.tile_size[1] + self.pos[1]),
+        )
+
+        if pool := self.tile_pools[tile_class]:
+            tile = pool.pop()
+            tile.set_tile(centre_pos, tile_attrs)
+
+            return tile
+
+        return tile_class(
+            centre_pos=centre_pos,
+            colour=self.tile_colour,
+            tile=tile_attrs,
+            base_size=self.tile_base_size,
+            border_size=self.tile_border_size,
+        )
+
+    def get_tile_attrs(self, tile_type: str, trade_type: None | str) -> dict:
+        # The dictionary of attributes used to create each tile object.
+        tile_attrs = {
+            "sprite": self.sprite_sheet.get_sprite_from_name(tile_type),
+            "type": tile_type,
+            "icon_sprite": self.get_icon_sprite_from_tile_type(tile_type),
+        }
+
+        if tile_type.startswith("trader"):
+            tile_attrs["trade_type"] = trade_type
+            tile_attrs["trade_amounts"] = self.trade
+
+        return tile_attrs
+
+    def get_layout(self) -> dict:
+        """
+        Returns everything generated for this board, as JSON-compatible lists:
+        its size, each tile's type, each trading station's resource and the graph.
+        Generating a board again from the same seed needs the same game data, so
+        saved games keep the layout itself.
+        The layout is only made again after board events change the board.
+        """
+        if self.layout is not None:
+            return self.layout
+
+        self.layout = {
+            "dims": list(self.dims),
+            "types": [[tile.get_type() for tile in row] for row in self.matrix],
+            "trade_types": [
+                [i, j, tile.get_trade()["type_taken"]]
+                for j, row in enumerate(self.matrix)
+                for i, tile in enumerate(row)
+                if tile.get_can_trade()
+            ],
+            "graph": [
+                [*node, [list(conn) for conn in sorted(conns)]]
+                for node, conns in sorted(self.graph.items())
+            ],
+        }
+
+        return self.layout
+
+    def set_layout(self, layout: dict) -> None:
+        # Replaces the board with one from get_layout(), without generating anything.
+        self.set_dims(tuple(layout["dims"]))
+
+        trade_types = {(i, j): trade_type for i, j, trade_type in layout["trade_types"]}
+        self.release_tiles()
         self.matrix = [
             [
-                (
-                    TraderTile(  # (2) A new TraderTile object is created.
-                        centre_pos=(
-                            int((i + 0.5) * self.tile_size[0] + self.pos[0]),
-                            int((j + 0.5) * self.tile_size[1] + self.pos[1]),
-                        ),
-                        colour=tile_colour,
-                        # In TraderTile, curr_tile is parsed differently in the initialisation
-                        # as it has the separate "trade attribute, so it must be handled like this.
-                        tile=curr_tile,
-                        base_size=tile_base_size,
-                        border_size=tile_border_size,
-                    )
-                    if self.get_tile_behaviour_type_from_tile_type(  # (1) If the tile is a trader type...
-                        (curr_tile := next(self.tile_order))["type"]
-                    )  # The := (walrus) operator acts to save
-                    == "trader"
-                    else Tile(  # (3) Otherwise, a new Tile object is created.
-                        centre_pos=(
-                            int((i + 0.5) * self.tile_size[0] + self.pos[0]),
-                            int((j + 0.5) * self.tile_size[1] + self.pos[1]),
-                        ),
-                        colour=tile_colour,
-                        tile=curr_tile,
-                        base_size=tile_base_size,
-                        border_size=tile_border_size,
-                    )
+                self.create_tile(
+                    i, j, self.get_tile_attrs(tile_type, trade_types.get((i, j)))
                 )
-                # Generates 1 tile object per column in the row.
-                for i in range(self.dims[0])
+                for i, tile_type in enumerate(row)
             ]
-            # Generates 1 array of tile objects per row.
-            for j in range(self.dims[1])
+            for j, row in enumerate(layout["types"])
         ]
 
-        self.graph = self.create_graph(self.matrix)
+        self.graph = defaultdict(set)
+        for i, j, conns in layout["graph"]:
+            self.graph[(i, j)] = {tuple(conn) for conn in conns}
+        self.order_nodes()
+
+        self.layout = layout
+        self.layer = None
+
+    def get_dims(self) -> tuple[int, int]:
+        return self.dims
 
     def get_icon_sprite_sheet(self) -> SpriteSheet:
         return self.icon_sprite_sheet
@@ -230,18 +348,20 @@ class Board:
         # If every node is adjacent/diagonal to each other, there will only be one island.
         # If there are groups of nodes not adjacent to any other groups of nodes, there will be multiple islands.
         islands: list[list[tuple[int, int]]] = []
-        for i in range(self.dims[1]):
-            for j in range(self.dims[0]):
-                if not visited[i][j]:
-                    island: list[tuple[int, int]] = []
-                    dfs(i, j, -1, -1, island)
-                    islands.append(island)
+        with tracer.span("find islands", "board"):
+            for i in range(self.dims[1]):
+                for j in range(self.dims[0]):
+                    if not visited[i][j]:
+                        island: list[tuple[int, int]] = []
+                        dfs(i, j, -1, -1, island)
+                        islands.append(island)
 
         # Creates a one island - a connected graph.
         # Links the mainland to all the isles.
         # - mainland: the largest connected group of planets.
         # - isles: any smaller connected groups not adjacent to the mainland.
         if len(islands) > 1:
+            link_start = tracer.get_ts()
             islands = merge_sort(islands, lambda a, b: len(a) > len(b))
 
             mainland, *isles = islands
@@ -258,17 +378,186 @@ class Board:
                     graph[planet].add(min_dist_planet)
                     graph[min_dist_planet].add(planet)
 
+            tracer.complete("link isles", "board", link_start, num_isles=len(isles))
+
         # Creates a graph (with potential for multiple edges per node).
         # Ensures that all neighbours are closer than 3 moves away.
         # This is purely for a less frustrating game.
-        for node in graph:
-            for adj in get_adjs(self.matrix, node):
-                if get_min_conns_dist(graph, node, adj) > 3:
-                    graph[adj].add(node)
-                    graph[node].add(adj)
+        # The graph is connected by now, so every planet is reachable, and only
+        # paths of up to 3 moves need searching (empty tiles aren't in the graph).
+        with tracer.span("add shortcuts", "board"):
+            self.add_shortcuts(graph, graph)
 
         return graph
 
+    def add_shortcuts(
+        self,
+        graph: dict[tuple[int, int], set[tuple[int, int]]],
+        nodes: Iterable[tuple[int, int]],
+        link: None | Callable[[tuple[int, int], tuple[int, int]], None] = None,
+    ) -> list[tuple[tuple[int, int], tuple[int, int]]]:
+        # Links each of the nodes to any adjacent node more than 3 moves away,
+        # with link() if given. Returns the edges added.
+        edges = []
+
+        for node in nodes:
+            for adj in get_adjs(self.matrix, node):
+                if adj in graph and not get_is_within_conns_dist(graph, node, adj, 3):
+                    if link is None:
+                        graph[adj].add(node)
+                        graph[node].add(adj)
+                    else:
+                        link(node, adj)
+                    edges.append((node, adj))
+
+        return edges
+
+    def order_nodes(self) -> None:
+        # The order nodes were added to the graph in, which lines are drawn by (see get_edge()).
+        self.node_order = {node: order for order, node in enumerate(self.graph)}
+        self.next_node_order = len(self.node_order)
+
+    def get_edge(
+        self, node: tuple[int, int], conn: tuple[int, int]
+    ) -> tuple[tuple[int, int], tuple[int, int]]:
+        # An edge from whichever node was added to the graph first.
+        # Which pixels a line covers depends on where it starts, so it's always drawn this way.
+        if self.node_order[node] < self.node_order[conn]:
+            return node, conn
+
+        return conn, node
+
+    def get_edges(self) -> Iterator[tuple[tuple[int, int], tuple[int, int]]]:
+        # Every edge of the graph, once each.
+        for node, conns in self.graph.items():
+            for conn in conns:
+                if self.node_order[node] < self.node_order[conn]:
+                    yield node, conn
+
+    # ---- Changes during a game (see BoardEvents) ----
+    # Each only re-links the graph around the tiles changed, marks what it changed
+    # to be redrawn, and returns the nodes whose tile or connections changed,
+    # so that anything made from the board only needs updating for those.
+
+    def link(self, node: tuple[int, int], conn: tuple[int, int]) -> None:
+        self.graph[node].add(conn)
+        self.graph[conn].add(node)
+        self.mark_edge_dirty(node, conn)
+
+        edge = self.get_edge(node, conn)
+        if self.layer is not None and self.layer_rect.colliderect(
+            self.get_edge_rect(*edge)
+        ):
+            self.layer_edges.add(edge)
+
+    def remove_node(self, node: tuple[int, int]) -> set[tuple[int, int]]:
+        # Takes a tile out of the graph, keeping the graph connected.
+        conns = sorted(self.graph.pop(node))
+
+        for conn in conns:
+            self.graph[conn].discard(node)
+            self.mark_edge_dirty(node, conn)
+            self.layer_edges.discard(self.get_edge(node, conn))
+
+        del self.node_order[node]
+
+        # Neighbours were at most 2 moves apart through the node,
+        # so they're linked if there's no longer another short path between them.
+        changed = set(conns)
+
+        for conn_idx, conn in enumerate(conns):
+            for other_conn in conns[conn_idx + 1 :]:
+                if not get_is_within_conns_dist(self.graph, conn, other_conn, 3):
+                    self.link(conn, other_conn)
+
+        # Adjacent tiles may also have had their only short path through the node.
+        changed.update(
+            *self.add_shortcuts(
+                self.graph,
+                [adj for adj in get_adjs(self.matrix, node) if adj in self.graph],
+                self.link,
+            )
+        )
+
+        return changed | {node}
+
+    def add_node(self, node: tuple[int, int]) -> set[tuple[int, int]]:
+        # Puts a tile into the graph, linked to the adjacent tiles as create_graph() would.
+        # The tile must be adjacent to at least one tile already in the graph.
+        adjs = [
+            adj
+            for adj in get_adjs(self.matrix, node)
+            if adj != node and adj in self.graph
+        ]
+
+        self.node_order[node] = self.next_node_order
+        self.next_node_order += 1
+
+        self.link(node, adjs[0])
+        changed = {node, adjs[0]}
+
+        changed.update(*self.add_shortcuts(self.graph, [node, *adjs], self.link))
+
+        return changed
+
+    def set_tile_type(self, node: tuple[int, int], tile_type: str) -> None:
+        # Replaces a tile with a new one of another type. The graph is unchanged.
+        i, j = node
+        self.tile_pools[type(self.matrix[j][i])].append(self.matrix[j][i])
+        self.matrix[j][i] = self.create_tile(i, j, self.get_tile_attrs(tile_type, None))
+
+        self.mark_dirty(self.matrix[j][i].get_rect_in_board())
+
+    def swap_tiles(self, node: tuple[int, int], other_node: tuple[int, int]) -> None:
+        # Swaps two tiles' spaces, each keeping its type and trade. The graph is unchanged.
+        tile = self.matrix[node[1]][node[0]]
+        other_tile = self.matrix[other_node[1]][other_node[0]]
+        centre_pos = tile.get_centre_pos()
+
+        tile.set_centre_pos(other_tile.get_centre_pos())
+        other_tile.set_centre_pos(centre_pos)
+        self.matrix[node[1]][node[0]] = other_tile
+        self.matrix[other_node[1]][other_node[0]] = tile
+
+        self.mark_dirty(tile.get_rect_in_board())
+        self.mark_dirty(other_tile.get_rect_in_board())
+
+    def mark_edge_dirty(self, node: tuple[int, int], conn: tuple[int, int]) -> None:
+        self.mark_dirty(self.get_edge_rect(node, conn))
+
+    def mark_dirty(self, rect: pygame.Rect) -> None:
+        # Redraws the rect of the board layer before it's next drawn.
+        # The saved layout is also made again.
+        self.dirty_rects.append(rect)
+        self.layout = None
+
+    def get_edge_rect(
+        self, node: tuple[int, int], conn: tuple[int, int]
+    ) -> pygame.Rect:
+        # The rect covering every pixel of the line drawn for an edge.
+        start = self.get_tile_centre_pos(node)
+        end = self.get_tile_centre_pos(conn)
+
+        return pygame.Rect(
+            min(start[0], end[0]),
+            min(start[1], end[1]),
+            abs(end[0] - start[0]) + 1,
+            abs(end[1] - start[1]) + 1,
+        )
+
+    def set_tiles(self, tiles: dict[str, int]) -> None:
+        # Only used by boards generated after this, as tiles can't change mid-game.
+        self.tiles = tiles
+
+    def set_trade(self, trade: dict[str, int]) -> None:
+        # Changes the amounts of every existing trading station.
+        self.trade = trade
+
+        for row in self.matrix:
+            for tile in row:
+                if tile.get_can_trade():
+                    tile.set_trade_amounts(trade)
+
     def get_rand_non_empty_pos(self) -> tuple[int, int]:
         return choice(list(self.graph))
 
@@ -285,18 +574,7 @@ class Board:
 
             for _ in range(tile_amount):
                 resource_type = self.get_resource_type_from_tile_type(tile_type)
-
-                # The dictionary of attributes used to create each tile object in __init__().
-                tile_attrs = {
-                    "sprite": self.sprite_sheet.get_sprite_from_name(tile_type),
-                    "type": tile_type,
-                    "icon_sprite": self.get_icon_sprite_from_tile_type(
-                        tile_type
-                    ),
-                }
-
-                if tile_type.startswith("trader"):
-                    tile_attrs["trade_type"] = resource_type
+                tile_attrs = self.get_tile_attrs(tile_type, resource_type)
 
                 tile_order.insert(
                     randint(0, len(tile_order)),
@@ -305,45 +583,141 @@ class Board:
 
         return iter(tile_order)
 
-    def render_to(
+    def draw_lines_to(
         self,
-        window: pygame.Surface,
-        mouse_board_coord: tuple[int, int],
-        player: Player,
+        surface: pygame.Surface,
+        origin: tuple[int, int],
+        edges: Iterable[tuple[tuple[int, int], tuple[int, int]]],
     ) -> None:
-        drawn = set()
-
-        for node, conns in self.graph.items():
-            for conn in conns:
-                # A frozen set is an unmodifiable set.
-                edge = frozenset([node, conn])
-                if edge not in drawn:
-                    pygame.draw.line(
-                        window,
-                        self.line_colour,
-                        self.matrix[node[1]][node[0]].get_centre_pos(),
-                        self.matrix[conn[1]][conn[0]].get_centre_pos(),
-                    )
+        # Draws the edges onto a surface whose top left is at origin on the window.
+        for node, conn in edges:
+            start = self.get_tile_centre_pos(node)
+            end = self.get_tile_centre_pos(conn)
+
+            pygame.draw.line(
+                surface,
+                self.line_colour,
+                (start[0] - origin[0], start[1] - origin[1]),
+                (end[0] - origin[0], end[1] - origin[1]),
+            )
+
+    def get_nodes_in_rect(self, rect: pygame.Rect) -> Iterator[tuple[int, int]]:
+        # The positions of every tile whose space overlaps the rect.
+        for j in range(
+            max((rect.top - self.pos[1]) // self.tile_size[1], 0),
+            min((rect.bottom - 1 - self.pos[1]) // self.tile_size[1] + 1, self.dims[1]),
+        ):
+            for i in range(
+                max((rect.left - self.pos[0]) // self.tile_size[0], 0),
+                min(
+                    (rect.right - 1 - self.pos[0]) // self.tile_size[0] + 1,
+                    self.dims[0],
+                ),
+            ):
+                yield i, j
+
+    def draw_tiles_to_layer(self, rect: pygame.Rect) -> None:
+        # Draws the tiles overlapping the rect, and keeps their icons to draw every frame.
+        for i, j in self.get_nodes_in_rect(rect):
+            tile = self.matrix[j][i]
+            tile_rect = tile.get_rect_in_board()
+
+            self.layer.blit(
+                tile.get_image(), tile_rect.move(-self.layer_rect.x, -self.layer_rect.y)
+            )
+
+            if tile_icon_image := tile.get_icon_image():
+                self.icons[(i, j)] = (tile_icon_image, tile_rect)
+            else:
+                self.icons.pop((i, j), None)
+
+    def update_layer(self) -> None:
+        """
+        Draws the lines and tiles into the board layer: all of them for a new board,
+        otherwise only inside the rects changed since it was last drawn.
+        Pixels outside a rect are left alone, so the lines through it are drawn
+        whole onto a scratch surface first, as clipping a line moves some of its
+        pixels. They're only clipped where they leave the layer, as when it was made.
+        """
+        if self.layer is None:
+            # Only the part of the board inside the window, so lines are clipped the same.
+            self.layer_rect = pygame.Rect(self.pos, self.get_size()).clip(
+                pygame.Rect((0, 0), self.window_size)
+            )
+            self.layer = pygame.Surface(self.layer_rect.size, pygame.SRCALPHA)
+            self.dirty_rects = []
+            self.icons = {}
+
+            self.layer_edges = {
+                edge
+                for edge in self.get_edges()
+                if self.layer_rect.colliderect(self.get_edge_rect(*edge))
+            }
+            self.draw_lines_to(self.layer, self.layer_rect.topleft, self.layer_edges)
+            self.draw_tiles_to_layer(self.layer_rect)
+
+            return
+
+        for rect in self.dirty_rects:
+            rect = rect.clip(self.layer_rect)
+            if not rect:
+                continue
+
+            layer_rect = rect.move(-self.layer_rect.x, -self.layer_rect.y)
+            self.layer.fill((0, 0, 0, 0), layer_rect)
+
+            # Lines can pass a pixel either side of the rect, so it's widened to find them.
+            near_rect = rect.inflate(2, 2)
+            edges = [
+                edge
+                for edge in self.layer_edges
+                if near_rect.clipline(
+                    self.get_tile_centre_pos(edge[0]),
+                    self.get_tile_centre_pos(edge[1]),
+                )
+            ]
 
-                    drawn.add(edge)
+            if edges:
+                bounds = rect.unionall(
+                    [self.get_edge_rect(*edge) for edge in edges]
+                ).clip(self.layer_rect)
+                scratch = pygame.Surface(bounds.size, pygame.SRCALPHA)
+                self.draw_lines_to(scratch, bounds.topleft, edges)
+                self.layer.blit(scratch, layer_rect, rect.move(-bounds.x, -bounds.y))
 
-        for j, row in enumerate(self.matrix):
-            for i, tile in enumerate(row):
-                tile_rect = tile.get_rect_in_board()
+            self.layer.set_clip(layer_rect)
+            self.draw_tiles_to_layer(rect)
+            self.layer.set_clip(None)
 
-                # Shows a grey tile highlight whenever your cursor is over a tile.
-                if (i, j) == mouse_board_coord:
-                    pygame.draw.rect(
-                        window, tile.get_colour(), tile_rect.scale_by(1)
-                    )
+        self.dirty_rects = []
 
-                # Shows the player's colour as a highlight on the tile it's on.
-                if (i, j) == player.get_pos():
-                    pygame.draw.rect(
-                        window, player.get_colour(), tile_rect.scale_by(1)
-                    )
+    def render_to(
+        self,
+        window: pygame.Surface,
+        mouse_board_coord: tuple[int, int],
+        player: Player,
+    ) -> None:
+        # The lines and tiles come from the board layer, redrawn only where the board's changed.
+        self.update_layer()
+        window.blit(self.layer, self.layer_rect)
+
+        # Highlights are drawn under their tile, so the tile is drawn again over them.
+        # Shows a grey tile highlight whenever your cursor is over a tile,
+        # and the player's colour as a highlight on the tile it's on.
+        highlighted = []
+
+        for pos, colour in (
+            (mouse_board_coord, None),
+            (player.get_pos(), player.get_colour()),
+        ):
+            if pos[0] is not None and pos[1] is not None:
+                tile = self.matrix[pos[1]][pos[0]]
+                pygame.draw.rect(
+                    window, colour or tile.get_colour(), tile.get_rect_in_board()
+                )
+                highlighted.append(tile)
 
-                window.blit(tile.get_image(), tile_rect)
+        for tile in highlighted:
+            window.blit(tile.get_image(), tile.get_rect_in_board())
 
-                if tile_icon_image := tile.get_icon_image():
-                    window.blit(tile_icon_image, tile_rect)
+        window.blits(iter(self.icons.values()), doreturn=False)
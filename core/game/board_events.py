@@ -0,0 +1,168 @@
+from __future__ import annotations
+
+# avoiding circular imports in type hints
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from random import Random
+
+    from .board import Board
+
+from .helper import get_adjs
+
+
+class BoardEvents:
+    """
+    Changes the board as a game goes on:
+    - planets run out once they've been harvested harvests_per_planet times,
+      and become asteroids,
+    - at the end of each round, each asteroid may drift to an empty space next to it,
+    - every relocate_rounds rounds, each trading station swaps places with a planet.
+
+    The board only re-links the graph around the tiles that changed, and each
+    event returns the nodes it changed, so Rules and the drawn board layer
+    are only updated for those. Tiles with a player on them never move.
+    """
+
+    def __init__(
+        self,
+        board: Board,
+        rng: Random,
+        harvests_per_planet: int = 6,
+        drift_chance: float = 0.25,
+        relocate_rounds: int = 4,
+        depleted_type: str = "asteroid",
+    ):
+        self.board = board
+        self.rng = rng
+        self.harvests_per_planet = harvests_per_planet
+        self.drift_chance = drift_chance
+        self.relocate_rounds = relocate_rounds
+        self.depleted_type = depleted_type  # The tile type planets become once run out.
+
+        self.harvests: dict[tuple[int, int], int] = {}  # Times each planet's been moved onto.
+        self.rounds = 0
+
+        # Where each kind of tile is, kept up to date so rounds don't search the board.
+        self.asteroids: set[tuple[int, int]] = set()
+        self.traders: set[tuple[int, int]] = set()
+        # A list, to pick from at random, and each planet's index in it.
+        self.planets: list[tuple[int, int]] = []
+        self.planet_idxs: dict[tuple[int, int], int] = {}
+
+        for node in board.get_graph():
+            behaviour_type = self.get_behaviour_type(node)
+
+            if behaviour_type == "asteroid":
+                self.asteroids.add(node)
+            elif behaviour_type == "trader":
+                self.traders.add(node)
+            elif behaviour_type == "planet":
+                self.add_planet(node)
+
+    def get_progress(self) -> list:
+        # The rounds played and every planet's harvests, as JSON-compatible lists for saved games.
+        return [
+            self.rounds,
+            [[*node, count] for node, count in sorted(self.harvests.items())],
+        ]
+
+    def set_progress(self, progress: list) -> None:
+        # Carries on from get_progress(), on the board it was saved with.
+        self.rounds, harvests = progress
+        self.harvests = {(i, j): count for i, j, count in harvests}
+
+    def get_behaviour_type(self, node: tuple[int, int]) -> str:
+        return self.board.get_tile_behaviour_type_from_tile_type(
+            self.board.get_type_from_board_pos(node)
+        )
+
+    def add_planet(self, node: tuple[int, int]) -> None:
+        self.planet_idxs[node] = len(self.planets)
+        self.planets.append(node)
+
+    def remove_planet(self, node: tuple[int, int]) -> None:
+        # Moves the last planet into its place, so nothing after it needs moving.
+        idx = self.planet_idxs.pop(node)
+        last_node = self.planets.pop()
+
+        if last_node != node:
+            self.planets[idx] = last_node
+            self.planet_idxs[last_node] = idx
+
+    def harvest(self, node: tuple[int, int]) -> set[tuple[int, int]]:
+        # Counts a player moving onto the node. Returns the nodes changed.
+        if node not in self.planet_idxs:
+            return set()
+
+        self.harvests[node] = self.harvests.get(node, 0) + 1
+        if self.harvests[node] < self.harvests_per_planet:
+            return set()
+
+        del self.harvests[node]
+        self.board.set_tile_type(node, self.depleted_type)
+        self.remove_planet(node)
+        self.asteroids.add(node)
+
+        return {node}
+
+    def end_round(self, occupied: set[tuple[int, int]]) -> set[tuple[int, int]]:
+        # Moves the asteroids and trading stations, except those under the ships at occupied.
+        # Returns the nodes changed.
+        self.rounds += 1
+        changed: set[tuple[int, int]] = set()
+
+        # Sorted, so the same random numbers make the same changes.
+        for node in sorted(self.asteroids):
+            if (
+                node not in occupied
+                and self.rng.random() < self.drift_chance
+                and (target := self.get_drift_target(node))
+            ):
+                self.board.swap_tiles(node, target)
+                changed |= self.board.remove_node(node)
+                changed |= self.board.add_node(target)
+
+                self.asteroids.remove(node)
+                self.asteroids.add(target)
+
+        if self.rounds % self.relocate_rounds == 0:
+            for node in sorted(self.traders):
+                if node in occupied or not self.planets:
+                    continue
+
+                # Occupied planets are skipped rather than picked again, so this never loops.
+                planet = self.planets[self.rng.randrange(len(self.planets))]
+                if planet in occupied:
+                    continue
+
+                self.board.swap_tiles(node, planet)
+                changed |= {node, planet}
+
+                self.traders.remove(node)
+                self.traders.add(planet)
+                self.remove_planet(planet)
+                self.add_planet(node)
+
+                # A planet's harvests go with it.
+                if (count := self.harvests.pop(planet, None)) is not None:
+                    self.harvests[node] = count
+
+        return changed
+
+    def get_drift_target(self, node: tuple[int, int]) -> None | tuple[int, int]:
+        # A random empty space next to the asteroid, next to another tile,
+        # so that the asteroid can be linked to the graph there.
+        graph = self.board.get_graph()
+        targets = [
+            adj
+            for adj in get_adjs(self.board.get_matrix(), node)
+            if adj not in graph
+            and self.board.get_type_from_board_pos(adj) == "empty"
+            and any(
+                adj_adj != node and adj_adj != adj and adj_adj in graph
+                for adj_adj in get_adjs(self.board.get_matrix(), adj)
+            )
+        ]
+
+        return self.rng.choice(targets) if targets else None
@@ -0,0 +1,103 @@
+from __future__ import annotations
+
+# avoiding circular imports in type hints
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from .shop import Product
+
+from bisect import bisect_right
+
+
+# Orders that Catalog.query() can sort by.
+SORT_ORDERS = ("affordable", "cost", "name")
+
+
+class Catalog:
+    """
+    Indexes the shop's products by id, category and total cost,
+    so that lookups and filters don't scan every product.
+
+    Products are referred to by their position in the shop's product list.
+    """
+
+    def __init__(self, products: list[Product]):
+        self.products = products
+
+        self.by_id: dict[str, int] = {}
+        self.by_category: dict[str, list[int]] = {}
+
+        for product_pos, product in enumerate(products):
+            if product.get_idx() in self.by_id:
+                raise ValueError(f"Duplicate product id {product.get_idx()!r}.")
+
+            self.by_id[product.get_idx()] = product_pos
+            self.by_category.setdefault(product.get_category(), []).append(
+                product_pos
+            )
+
+        # Product positions sorted by total cost, with the totals for bisecting.
+        self.by_cost = sorted(
+            range(len(products)),
+            key=lambda product_pos: sum(products[product_pos].get_cost().values()),
+        )
+        self.total_costs = [
+            sum(products[product_pos].get_cost().values())
+            for product_pos in self.by_cost
+        ]
+
+        self.by_name = sorted(
+            range(len(products)),
+            key=lambda product_pos: products[product_pos].get_name(),
+        )
+
+    def get_categories(self) -> list[str]:
+        return list(self.by_category)
+
+    def get_pos_from_id(self, product_id: str) -> None | int:
+        return self.by_id.get(product_id)
+
+    def get_up_to_total_cost(self, max_total_cost: int) -> list[int]:
+        # Products costing at most max_total_cost resources in total, cheapest first.
+        return self.by_cost[: bisect_right(self.total_costs, max_total_cost)]
+
+    def query(
+        self,
+        category: None | str = None,
+        affordable: None | list[bool] = None,
+        affordable_only: bool = False,
+        sort: str = "cost",
+    ) -> list[int]:
+        """
+        Returns the positions of matching products, in the given sort order.
+
+        affordable is one player's row from Shop.get_affordable().
+        Sorting by "affordable" puts affordable products first, then sorts by cost.
+        """
+        order = self.by_name if sort == "name" else self.by_cost
+
+        if category is not None:
+            in_category = set(self.by_category.get(category, ()))
+            order = [
+                product_pos for product_pos in order if product_pos in in_category
+            ]
+
+        if affordable is not None:
+            if affordable_only:
+                order = [
+                    product_pos for product_pos in order if affordable[product_pos]
+                ]
+            elif sort == "affordable":
+                # A stable sort keeps the cost order within each group.
+                order = sorted(
+                    order, key=lambda product_pos: not affordable[product_pos]
+                )
+
+        return list(order)
+
+    @staticmethod
+    def get_page(
+        results: list[int], first_row: int, page_size: int
+    ) -> list[int]:
+        # Only the visible rows are ever rendered.
+        return results[first_row : first_row + page_size]
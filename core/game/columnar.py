@@ -0,0 +1,224 @@
+from __future__ import annotations
+
+import mmap
+import os
+import struct
+
+from typing import Iterator
+
+import numpy as np
+
+
+COLUMNAR_MAGIC = b"EMPC"
+COLUMNAR_VERSION = 1
+CHUNK_MAGIC = b"CHNK"
+
+# magic, version, number of columns
+FILE_HEADER = struct.Struct("<4sBH")
+# Then each column, as the length of its name, its name and its NumPy dtype string.
+COLUMN_HEADER = struct.Struct("<BB")
+# Then the chunks, each a header, then each column's values in turn,
+# padded to COLUMN_ALIGNMENT bytes so every column can be viewed in place.
+# magic, number of rows
+CHUNK_HEADER = struct.Struct("<4sI")
+COLUMN_ALIGNMENT = 8
+
+
+def get_padded_size(size: int) -> int:
+    return -(-size // COLUMN_ALIGNMENT) * COLUMN_ALIGNMENT
+
+
+class ColumnarWriter:
+    """
+    Appends rows to a file of fixed-type columns, in chunks.
+
+    Rows are buffered in NumPy arrays, column by column, and written as one chunk
+    every chunk_rows rows, so a file is only ever appended to.
+    Reopening a file carries on after its last complete chunk,
+    dropping any half-written one from a run that didn't close it.
+    """
+
+    def __init__(
+        self, file_path: str, columns: list[tuple[str, str]], chunk_rows: int = 65536
+    ):
+        self.file_path = file_path
+        self.columns = [(name, np.dtype(dtype)) for name, dtype in columns]
+        self.chunk_rows = chunk_rows
+
+        self.buffers = {
+            name: np.zeros(chunk_rows, dtype=dtype) for name, dtype in self.columns
+        }
+        self.num_buffered = 0
+
+        if os.path.exists(file_path) and os.path.getsize(file_path):
+            reader = ColumnarReader(file_path)
+            if reader.get_columns() != self.columns:
+                raise ValueError(f"{file_path} has different columns.")
+
+            self.num_rows = reader.get_num_rows()
+            end = reader.get_end()
+            reader.close()
+
+            self.file = open(file_path, "r+b")
+            self.file.truncate(end)
+            self.file.seek(end)
+        else:
+            self.num_rows = 0
+            self.file = open(file_path, "wb")
+            self.write_header()
+
+    def get_num_rows(self) -> int:
+        # Every row appended, including those not yet written.
+        return self.num_rows + self.num_buffered
+
+    def write_header(self) -> None:
+        header = [FILE_HEADER.pack(COLUMNAR_MAGIC, COLUMNAR_VERSION, len(self.columns))]
+
+        for name, dtype in self.columns:
+            name_bytes = name.encode()
+            dtype_bytes = dtype.str.encode()
+            header.append(
+                COLUMN_HEADER.pack(len(name_bytes), len(dtype_bytes))
+                + name_bytes
+                + dtype_bytes
+            )
+
+        header = b"".join(header)
+        self.file.write(header + bytes(get_padded_size(len(header)) - len(header)))
+
+    def append(self, rows: dict[str, np.ndarray]) -> None:
+        # Appends a batch of rows, given as an equal-length array for each column.
+        num_rows = len(next(iter(rows.values())))
+        start = 0
+
+        while start < num_rows:
+            count = min(num_rows - start, self.chunk_rows - self.num_buffered)
+
+            for name, buffer in self.buffers.items():
+                buffer[self.num_buffered : self.num_buffered + count] = rows[name][
+                    start : start + count
+                ]
+
+            self.num_buffered += count
+            start += count
+
+            if self.num_buffered == self.chunk_rows:
+                self.flush()
+
+    def flush(self) -> None:
+        # Writes the buffered rows as one chunk.
+        if not self.num_buffered:
+            return
+
+        chunk = [CHUNK_HEADER.pack(CHUNK_MAGIC, self.num_buffered)]
+        for name, dtype in self.columns:
+            column_bytes = self.buffers[name][: self.num_buffered].tobytes()
+            chunk.append(column_bytes)
+            chunk.append(bytes(get_padded_size(len(column_bytes)) - len(column_bytes)))
+
+        self.file.write(b"".join(chunk))
+        self.file.flush()
+
+        self.num_rows += self.num_buffered
+        self.num_buffered = 0
+
+    def close(self) -> None:
+        self.flush()
+        self.file.close()
+
+
+class ColumnarReader:
+    """
+    Reads a file written by ColumnarWriter through a memory map,
+    so each chunk's columns are views of the file, and nothing is read
+    into memory until it's used. Only chunk headers are read on opening.
+    """
+
+    def __init__(self, file_path: str):
+        self.file = open(file_path, "rb")
+        self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, version, num_columns = FILE_HEADER.unpack_from(self.map)
+
+        if magic != COLUMNAR_MAGIC:
+            raise ValueError(f"{file_path} is not a columnar file.")
+        if version != COLUMNAR_VERSION:
+            raise ValueError(
+                f"Unsupported columnar file version {version} (expected {COLUMNAR_VERSION})."
+            )
+
+        self.columns: list[tuple[str, np.dtype]] = []
+        offset = FILE_HEADER.size
+
+        for _ in range(num_columns):
+            name_len, dtype_len = COLUMN_HEADER.unpack_from(self.map, offset)
+            offset += COLUMN_HEADER.size
+            name = self.map[offset : offset + name_len].decode()
+            offset += name_len
+            dtype = np.dtype(self.map[offset : offset + dtype_len].decode())
+            offset += dtype_len
+
+            self.columns.append((name, dtype))
+
+        self.chunks = self.find_chunks(get_padded_size(offset))
+
+    def get_columns(self) -> list[tuple[str, np.dtype]]:
+        return self.columns
+
+    def get_chunks(self) -> list[tuple[int, int]]:
+        # (offset, number of rows) of each complete chunk.
+        return self.chunks
+
+    def get_num_rows(self) -> int:
+        return sum(num_rows for _, num_rows in self.chunks)
+
+    def get_end(self) -> int:
+        # Offset just after the last complete chunk.
+        if not self.chunks:
+            return self.header_end
+
+        offset, num_rows = self.chunks[-1]
+        return offset + self.get_chunk_size(num_rows)
+
+    def get_chunk_size(self, num_rows: int) -> int:
+        return CHUNK_HEADER.size + sum(
+            get_padded_size(num_rows * dtype.itemsize) for _, dtype in self.columns
+        )
+
+    def find_chunks(self, offset: int) -> list[tuple[int, int]]:
+        # Stops at the end of the file, or at a half-written chunk.
+        self.header_end = offset
+        chunks = []
+
+        while offset + CHUNK_HEADER.size <= len(self.map):
+            magic, num_rows = CHUNK_HEADER.unpack_from(self.map, offset)
+            size = self.get_chunk_size(num_rows)
+
+            if magic != CHUNK_MAGIC or offset + size > len(self.map):
+                break
+
+            chunks.append((offset, num_rows))
+            offset += size
+
+        return chunks
+
+    def read_chunk(self, offset: int, num_rows: int) -> dict[str, np.ndarray]:
+        # Each column of one chunk, as read-only views of the memory map.
+        columns = {}
+        offset += CHUNK_HEADER.size
+
+        for name, dtype in self.columns:
+            columns[name] = np.frombuffer(
+                self.map, dtype=dtype, count=num_rows, offset=offset
+            )
+            offset += get_padded_size(num_rows * dtype.itemsize)
+
+        return columns
+
+    def iter_chunks(self) -> Iterator[dict[str, np.ndarray]]:
+        for offset, num_rows in self.chunks:
+            yield self.read_chunk(offset, num_rows)
+
+    def close(self) -> None:
+        self.map.close()
+        self.file.close()
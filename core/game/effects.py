@@ -0,0 +1,187 @@
+from __future__ import annotations
+
+# avoiding circular imports in type hints
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from .state import GameState
+
+import re
+
+from operator import eq, ge, gt, le, lt, ne
+
+
+# ---- Opcodes ----
+# Every statement compiles to one tuple:
+# (trigger, target kind, target index, delta, condition kind, condition index, comparison, condition value)
+
+# Triggers.
+NOW = 0  # Applied once, when the product is bought.
+TURN_START = 1  # Applied at the start of each of the buyer's turns, from then on.
+
+# Kinds of value an opcode can change or test. The index is only used by KIND_RESOURCE.
+KIND_NONE = -1  # For opcodes without a condition.
+KIND_SCORE = 0
+KIND_ACTIONS_PER_TURN = 1
+KIND_ACTIONS_LEFT = 2
+KIND_RESOURCE = 3
+
+STAT_KINDS = {
+    "score": KIND_SCORE,
+    "actions_per_turn": KIND_ACTIONS_PER_TURN,
+    "actions_left": KIND_ACTIONS_LEFT,
+}
+
+COMPARISONS = {">=": 0, "<=": 1, ">": 2, "<": 3, "==": 4, "!=": 5}
+COMPARISON_FUNCS = (ge, le, gt, lt, eq, ne)
+
+# A statement is: [on turn_start:] <stat> <+n|-n> [if <stat> <comparison> <n>]
+# For example "ore +1", "score +1 if helium >= 3" or "on turn_start: ice +1".
+# Resources can only be added, as effects change the state directly, without
+# the ledger's check that counts never go negative.
+STATEMENT_PATTERN = re.compile(
+    r"^\s*(?:on\s+(?P<trigger>\w+)\s*:\s*)?"
+    r"(?P<target>\w+)\s*(?P<delta>[+-]\s*\d+)"
+    r"(?:\s+if\s+(?P<cond>\w+)\s*(?P<cmp>>=|<=|==|!=|>|<)\s*(?P<value>-?\d+))?\s*$"
+)
+
+
+class EffectError(ValueError):
+    pass
+
+
+def get_value(state: GameState, num: int, kind: int, idx: int) -> int:
+    if kind == KIND_SCORE:
+        return state.scores[num]
+    elif kind == KIND_ACTIONS_PER_TURN:
+        return state.actions_per_turn[num]
+    elif kind == KIND_ACTIONS_LEFT:
+        return state.actions_left[num]
+
+    return state.resources[num * len(state.resource_names) + idx]
+
+
+def change_value_by(
+    state: GameState, num: int, kind: int, idx: int, delta: int
+) -> None:
+    if kind == KIND_SCORE:
+        state.scores[num] += delta
+    elif kind == KIND_ACTIONS_PER_TURN:
+        state.actions_per_turn[num] += delta
+    elif kind == KIND_ACTIONS_LEFT:
+        state.actions_left[num] += delta
+    else:
+        state.resources[num * len(state.resource_names) + idx] += delta
+
+
+class Effect:
+    """
+    A product's compiled effect: called with (state, player number) to apply it.
+
+    Only holds tuples of ints, so it can be pickled and sent to other processes.
+    """
+
+    __slots__ = ("ops", "source")
+
+    def __init__(self, ops: tuple[tuple[int, ...], ...], source: tuple[str, ...]):
+        self.ops = ops
+        self.source = source  # The statements it was compiled from.
+
+    def __call__(self, state: GameState, num: int) -> None:
+        for trigger, kind, idx, delta, cond_kind, cond_idx, cmp, value in self.ops:
+            if cond_kind != KIND_NONE and not COMPARISON_FUNCS[cmp](
+                get_value(state, num, cond_kind, cond_idx), value
+            ):
+                continue
+
+            if trigger == NOW:
+                change_value_by(state, num, kind, idx, delta)
+            else:
+                # Income index 0 is score, then one per resource.
+                state.change_income_by(
+                    num, 0 if kind == KIND_SCORE else idx + 1, delta
+                )
+
+    def __repr__(self) -> str:
+        return f"Effect({'; '.join(self.source)!r})"
+
+
+def compile_operand(
+    name: str, resource_names: tuple[str, ...], statement: str
+) -> tuple[int, int]:
+    # Returns the (kind, index) of a stat or resource name.
+    if name in STAT_KINDS:
+        return STAT_KINDS[name], 0
+    elif name in resource_names:
+        return KIND_RESOURCE, resource_names.index(name)
+
+    raise EffectError(f"Unknown stat {name!r} in effect {statement!r}.")
+
+
+def compile_statement(
+    statement: str, resource_names: tuple[str, ...]
+) -> tuple[int, ...]:
+    if not (match := STATEMENT_PATTERN.match(statement)):
+        raise EffectError(f"Invalid effect {statement!r}.")
+
+    if match["trigger"] is None:
+        trigger = NOW
+    elif match["trigger"] == "turn_start":
+        trigger = TURN_START
+    else:
+        raise EffectError(
+            f"Unknown trigger {match['trigger']!r} in effect {statement!r}."
+        )
+
+    kind, idx = compile_operand(match["target"], resource_names, statement)
+
+    if match["cond"] is None:
+        cond_kind, cond_idx, cmp, value = KIND_NONE, 0, 0, 0
+    else:
+        cond_kind, cond_idx = compile_operand(
+            match["cond"], resource_names, statement
+        )
+        cmp = COMPARISONS[match["cmp"]]
+        value = int(match["value"])
+
+    delta = int(match["delta"].replace(" ", ""))
+
+    if kind == KIND_RESOURCE and delta < 0:
+        raise EffectError(
+            f"Effects can only add resources, not take them: {statement!r}."
+        )
+
+    if trigger == TURN_START and (
+        kind not in (KIND_SCORE, KIND_RESOURCE) or cond_kind != KIND_NONE
+    ):
+        # Per-turn triggers are stored as a fixed income in the game state.
+        raise EffectError(
+            f"Per-turn effects must add to score or a resource, without a condition: {statement!r}."
+        )
+
+    return (
+        trigger,
+        kind,
+        idx,
+        delta,
+        cond_kind,
+        cond_idx,
+        cmp,
+        value,
+    )
+
+
+def compile_effect(
+    statements: list[str] | str, resource_names: tuple[str, ...]
+) -> Effect:
+    """Compiles effect statements (one string, or a list of them) once, ahead of play."""
+    if isinstance(statements, str):
+        statements = [statements]
+
+    return Effect(
+        tuple(
+            compile_statement(statement, resource_names)
+            for statement in statements
+        ),
+        tuple(statements),
+    )
@@ -0,0 +1,197 @@
+from __future__ import annotations
+
+# avoiding circular imports in type hints
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from .board import Board
+
+import pygame
+
+from typing import Iterable, Iterator
+
+from .helper import get_adjs
+from ..tracing import tracer
+
+
+def get_set_bits(bits: int) -> Iterator[int]:
+    # The index of every set bit, lowest first, found in one pass over its binary digits.
+    digits = bin(bits)[:1:-1]
+    idx = digits.find("1")
+
+    while idx != -1:
+        yield idx
+        idx = digits.find("1", idx + 1)
+
+
+class FogOfWar:
+    """
+    Hides the board from each player, except within radius moves of anywhere
+    they've been (and the empty space around that).
+
+    What each player has seen is a bitset, an int with a bit per space on the board,
+    numbered row by row. Each tile's mask of the spaces within radius moves of it
+    is made once, so a move only ORs it in, however big the board is or however
+    many players there are. Masks are stored as the bits from the lowest space in
+    them, and that space's id, as most of the spaces in a mask are near each other.
+
+    The fog is drawn from one cached surface, for the player whose view is shown.
+    Spaces are only cleared from it as that player sees them, and it's only drawn
+    again in full when the view changes to another player.
+    """
+
+    def __init__(
+        self,
+        board: Board,
+        radius: int = 2,
+        colour: tuple[int, int, int, int] = (16, 1, 41, 235),
+    ):
+        self.board = board
+        self.radius = radius
+        self.colour = colour
+
+        self.masks: dict[tuple[int, int], tuple[int, int]] = {}  # (id of the lowest space, bits)
+        self.visible: list[int] = []  # By player number.
+
+        self.surface: None | pygame.Surface = None
+        self.surface_rect = pygame.Rect(0, 0, 0, 0)
+        self.surface_num = -1  # The player whose view the surface shows.
+
+        with tracer.span("fog masks", "board", dims=board.get_dims()):
+            self.update_masks(board.get_graph())
+
+    def get_id(self, node: tuple[int, int]) -> int:
+        return node[1] * self.board.get_dims()[0] + node[0]
+
+    def get_near_nodes(
+        self, nodes: Iterable[tuple[int, int]], radius: int
+    ) -> set[tuple[int, int]]:
+        # Every node within radius moves of any of the nodes, by breadth-first search.
+        graph = self.board.get_graph()
+        near = {node for node in nodes if node in graph}
+        frontier = list(near)
+
+        for _ in range(radius):
+            frontier = [
+                conn for node in frontier for conn in graph[node] if conn not in near
+            ]
+            near.update(frontier)
+
+        return near
+
+    def update_masks(self, nodes: Iterable[tuple[int, int]]) -> None:
+        # Makes the masks of the nodes again, from the board's graph as it is now.
+        graph = self.board.get_graph()
+        matrix = self.board.get_matrix()
+
+        for node in nodes:
+            if node not in graph:
+                self.masks.pop(node, None)
+                continue
+
+            near = self.get_near_nodes((node,), self.radius)
+            # Empty spaces hold nothing to hide, so those next to what's seen are shown too.
+            spaces = near.union(
+                *(
+                    (adj for adj in get_adjs(matrix, near_node) if adj not in graph)
+                    for near_node in near
+                )
+            )
+
+            ids = [self.get_id(space) for space in spaces]
+            lowest = min(ids)
+            bits = 0
+            for space_id in ids:
+                bits |= 1 << (space_id - lowest)
+
+            self.masks[node] = (lowest, bits)
+
+    def update_nodes(self, changed: Iterable[tuple[int, int]]) -> None:
+        """
+        Makes the masks that may have changed after the graph was linked again
+        around the changed nodes. A mask can only change if a path to or through
+        a changed node was added or removed (the old neighbours of a removed node
+        are changed too), or an empty space next to what it shows was filled or
+        emptied, so every such mask is of a node within radius moves of a changed
+        node or one next to it. What's already been seen stays seen.
+        """
+        matrix = self.board.get_matrix()
+        changed = set(changed)
+        around = changed.union(
+            *(get_adjs(matrix, changed_node) for changed_node in changed)
+        )
+        self.update_masks(changed | self.get_near_nodes(around, self.radius))
+
+    def add_player(self, num: int, node: tuple[int, int]) -> None:
+        # Players are added in number order, each starting with the spaces around it seen.
+        self.visible.append(0)
+        self.visit(num, node)
+
+    def visit(self, num: int, node: tuple[int, int]) -> None:
+        # Shows the player everything within radius moves of the node.
+        lowest, bits = self.masks[node]
+        seen = self.visible[num]
+
+        # Compared only over the mask's bits, so nothing the size of the board is made if nothing's new.
+        new_bits = bits & ~(seen >> lowest)
+        if not new_bits:
+            return
+
+        self.visible[num] = seen | (new_bits << lowest)
+
+        if num == self.surface_num:
+            self.clear_fog(get_set_bits(new_bits), lowest)
+
+    def get_is_visible(self, num: int, node: tuple[int, int]) -> bool:
+        return bool(self.visible[num] >> self.get_id(node) & 1)
+
+    def get_visible(self) -> list[str]:
+        # Every player's bitset, in hexadecimal, for saved games.
+        return [f"{seen:x}" for seen in self.visible]
+
+    def set_visible(self, visible: list[str]) -> None:
+        # Carries on from get_visible(), on the board it was saved with.
+        self.visible = [int(seen, 16) for seen in visible]
+        self.surface_num = -1
+
+    def clear_fog(self, ids: Iterable[int], offset: int = 0) -> None:
+        # Clears the spaces with the ids (each plus offset) from the fog surface.
+        dims = self.board.get_dims()
+        tile_size = self.board.get_tile_size()
+        origin = (
+            self.board.get_pos()[0] - self.surface_rect.x,
+            self.board.get_pos()[1] - self.surface_rect.y,
+        )
+
+        for space_id in ids:
+            j, i = divmod(space_id + offset, dims[0])
+            self.surface.fill(
+                (0, 0, 0, 0),
+                (
+                    origin[0] + i * tile_size[0],
+                    origin[1] + j * tile_size[1],
+                    tile_size[0],
+                    tile_size[1],
+                ),
+            )
+
+    def draw_fog(self, num: int) -> None:
+        # Draws the whole fog surface for the player's view.
+        window_rect = pygame.Rect((0, 0), self.board.get_window_size())
+        # Only the part of the board inside the window, as with the board's layer.
+        self.surface_rect = pygame.Rect(
+            self.board.get_pos(), self.board.get_size()
+        ).clip(window_rect)
+        if self.surface is None or self.surface.get_size() != self.surface_rect.size:
+            self.surface = pygame.Surface(self.surface_rect.size, pygame.SRCALPHA)
+
+        self.surface.fill(self.colour)
+        self.clear_fog(get_set_bits(self.visible[num]))
+        self.surface_num = num
+
+    def render_to(self, window: pygame.Surface, num: int) -> None:
+        # Covers everything the player hasn't seen.
+        if num != self.surface_num:
+            self.draw_fog(num)
+
+        window.blit(self.surface, self.surface_rect)
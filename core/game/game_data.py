@@ -0,0 +1,112 @@
+from __future__ import annotations
+
+# avoiding circular imports in type hints
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from ..ui.sprite_sheet import SpriteSheet
+
+import json
+import os
+import time
+
+from .effects import compile_effect
+from .shop import Product
+
+
+def check_cost(
+    cost: dict, resource_names: tuple[str, ...], product_name: str
+) -> dict[str, int]:
+    # Costs are read only by resource name, so any other key would be ignored, not charged.
+    for resource_name, resource_amount in cost.items():
+        if resource_name not in resource_names:
+            raise ValueError(
+                f"Unknown resource {resource_name!r} in the cost of {product_name!r}."
+            )
+        if (
+            not isinstance(resource_amount, int)
+            or isinstance(resource_amount, bool)
+            or resource_amount < 0
+        ):
+            raise ValueError(
+                f"Invalid amount {resource_amount!r} of {resource_name!r} in the cost of {product_name!r}."
+            )
+
+    return cost
+
+
+def load_game_data(
+    file_path: str,
+    icon_sprite_sheet: SpriteSheet,
+    resource_names: tuple[str, ...],
+) -> tuple[dict[str, int | float], dict[str, int], list[Product]]:
+    """
+    Loads the tile amounts, trade amounts and products from a JSON file.
+
+    Product costs are checked and effects compiled here, once, so a mistake
+    in any of them raises an error before any of the data is used.
+    """
+    with open(file_path) as f:
+        data = json.load(f)
+
+    # "rest" means every tile not used by the other types, as in Board.order_tiles().
+    tiles = {
+        tile_type: float("inf") if tile_amount == "rest" else int(tile_amount)
+        for tile_type, tile_amount in data["tiles"].items()
+    }
+
+    trade = {
+        "amount_taken": int(data["trade"]["amount_taken"]),
+        "amount_given": int(data["trade"]["amount_given"]),
+    }
+
+    products = [
+        Product(
+            idx=entry["id"],
+            name=entry["name"],
+            icon_image=icon_sprite_sheet.get_sprite_from_name(entry["icon"]),
+            cost=check_cost(entry["cost"], resource_names, entry["name"]),
+            effect=compile_effect(entry.get("effect", []), resource_names),
+            score=entry.get("score", 0),
+            effect_desc=entry.get("effect_desc", ""),
+            category=entry.get("category", ""),
+        )
+        for entry in data["products"]
+    ]
+
+    return tiles, trade, products
+
+
+class GameDataWatcher:
+    # Notices when the game data file is saved, so it can be reloaded while playing.
+
+    def __init__(self, file_path: str, check_interval: float = 1.0):
+        self.file_path = file_path
+        self.check_interval = check_interval  # Seconds between checks of the file.
+
+        self.last_check = time.monotonic()
+        self.last_mtime = self.get_mtime()
+
+    def get_mtime(self) -> None | int:
+        try:
+            return os.stat(self.file_path).st_mtime_ns
+        except OSError:
+            return None
+
+    def check(self) -> bool:
+        # Returns whether the file has changed since it was last checked.
+        # Cheap enough to call every frame, as the file is only checked every interval.
+        now = time.monotonic()
+
+        if now - self.last_check < self.check_interval:
+            return False
+
+        self.last_check = now
+        mtime = self.get_mtime()
+
+        if mtime is None or mtime == self.last_mtime:
+            return False
+
+        self.last_mtime = mtime
+
+        return True
@@ -45,6 +45,35 @@ def get_min_conns_dist(graph, start, end):
     return -1
 
 
+def get_is_within_conns_dist(graph, start, end, max_dist):
+    """
+    Whether the shortest path of nodes between the two given nodes is at most max_dist long.
+    Only searches max_dist connections out, unlike get_min_conns_dist.
+    """
+    if start == end:
+        return True
+
+    frontier = [start]
+    visited = {start}
+
+    # BFS, one distance at a time
+    for _ in range(max_dist):
+        next_frontier = []
+
+        for curr in frontier:
+            for conn in get_conns(graph, curr):
+                if conn == end:
+                    return True
+
+                if conn not in visited:
+                    visited.add(conn)
+                    next_frontier.append(conn)
+
+        frontier = next_frontier
+
+    return False
+
+
 # Matrix-related
 
 
@@ -0,0 +1,201 @@
+from __future__ import annotations
+
+import queue
+import sqlite3
+import threading
+import time
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS matches (
+    id INTEGER PRIMARY KEY,
+    played_at REAL NOT NULL,
+    seed INTEGER NOT NULL,
+    num_players INTEGER NOT NULL,
+    turns INTEGER NOT NULL,
+    winner_num INTEGER NOT NULL,
+    winner_name TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS players (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE,
+    is_bot INTEGER NOT NULL DEFAULT 0,
+    games INTEGER NOT NULL DEFAULT 0,
+    wins INTEGER NOT NULL DEFAULT 0,
+    best_score INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS results (
+    match_id INTEGER NOT NULL REFERENCES matches (id),
+    player_id INTEGER NOT NULL REFERENCES players (id),
+    seat INTEGER NOT NULL,
+    score INTEGER NOT NULL,
+    is_winner INTEGER NOT NULL,
+    PRIMARY KEY (match_id, seat)
+);
+CREATE INDEX IF NOT EXISTS players_by_wins ON players (wins DESC, games);
+CREATE INDEX IF NOT EXISTS results_by_player ON results (player_id, match_id DESC);
+CREATE INDEX IF NOT EXISTS results_by_score ON results (score DESC);
+"""
+
+# Statements are constants, so sqlite3's statement cache prepares each one once per connection.
+INSERT_MATCH = """
+INSERT INTO matches (played_at, seed, num_players, turns, winner_num, winner_name)
+VALUES (?, ?, ?, ?, ?, ?)
+"""
+UPSERT_PLAYER = """
+INSERT INTO players (name, is_bot) VALUES (?, ?)
+ON CONFLICT (name) DO UPDATE SET is_bot = excluded.is_bot
+"""
+SELECT_PLAYER_ID = "SELECT id FROM players WHERE name = ?"
+UPDATE_PLAYER_TOTALS = """
+UPDATE players
+SET games = games + 1, wins = wins + ?, best_score = max(best_score, ?)
+WHERE id = ?
+"""
+INSERT_RESULT = """
+INSERT INTO results (match_id, player_id, seat, score, is_winner)
+VALUES (?, ?, ?, ?, ?)
+"""
+SELECT_TOP_PLAYERS = """
+SELECT name, wins, games, best_score, is_bot FROM players
+ORDER BY wins DESC, games LIMIT ?
+"""
+SELECT_TOP_SCORES = """
+SELECT players.name, results.score, matches.played_at
+FROM results
+JOIN players ON players.id = results.player_id
+JOIN matches ON matches.id = results.match_id
+ORDER BY results.score DESC LIMIT ?
+"""
+SELECT_PLAYER_HISTORY = """
+SELECT matches.played_at, matches.num_players, matches.turns, results.seat,
+    results.score, results.is_winner
+FROM players
+JOIN results ON results.player_id = players.id
+JOIN matches ON matches.id = results.match_id
+WHERE players.name = ?
+ORDER BY results.match_id DESC LIMIT ?
+"""
+
+
+class Leaderboard:
+    """
+    Keeps every finished match's results, and each player's totals, in SQLite.
+
+    Matches are written on a background thread, in batches: each write waits
+    up to flush_interval seconds for more, then commits them all at once,
+    so the pygame loop only ever puts results on a queue.
+    Queries use their own connection, and the database is in WAL mode,
+    so reads never wait for a write. Players' totals are kept up to date
+    as matches are written, so the top players are read straight from an index.
+    """
+
+    def __init__(self, db_path: str, flush_interval: float = 0.5):
+        self.db_path = db_path
+        self.flush_interval = flush_interval
+
+        self.read_conn = self.connect()
+        self.read_conn.executescript(SCHEMA)
+
+        self.requests: queue.Queue = queue.Queue()
+        # Incremented after each batch is committed, so views can tell when to query again.
+        self.version = 0
+
+        self.thread = threading.Thread(
+            target=self.run, name="Leaderboard", daemon=True
+        )
+        self.thread.start()
+
+    def connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path)
+        conn.execute("PRAGMA journal_mode = WAL")
+        # Safe with WAL: a crash can lose the last batch, but never corrupts the database.
+        conn.execute("PRAGMA synchronous = NORMAL")
+
+        return conn
+
+    def get_version(self) -> int:
+        return self.version
+
+    def record_match(
+        self,
+        seed: int,
+        turns: int,
+        winner_num: int,
+        winner_name: str,
+        players: list[tuple[str, int, bool]],
+    ) -> None:
+        # players is (name, score, is bot) of each player, by seat. Never blocks.
+        self.requests.put(
+            (time.time(), seed, turns, winner_num, winner_name, list(players))
+        )
+
+    def close(self) -> None:
+        # Writes anything still queued, then stops the thread.
+        self.requests.put(None)
+        self.thread.join()
+        self.read_conn.close()
+
+    def run(self) -> None:
+        conn = self.connect()
+
+        while True:
+            result = self.requests.get()
+            batch = []
+            closing = result is None
+            deadline = time.perf_counter() + self.flush_interval
+
+            # Gathers everything that arrives before the deadline into one transaction.
+            while result is not None:
+                batch.append(result)
+
+                try:
+                    result = self.requests.get(
+                        timeout=max(deadline - time.perf_counter(), 0)
+                    )
+                except queue.Empty:
+                    break
+
+                closing = result is None
+
+            if batch:
+                self.write_batch(conn, batch)
+                self.version += 1
+
+            if closing:
+                conn.close()
+                return
+
+    def write_batch(self, conn: sqlite3.Connection, batch: list[tuple]) -> None:
+        with conn:
+            for played_at, seed, turns, winner_num, winner_name, players in batch:
+                match_id = conn.execute(
+                    INSERT_MATCH,
+                    (played_at, seed, len(players), turns, winner_num, winner_name),
+                ).lastrowid
+
+                for seat, (name, score, is_bot) in enumerate(players):
+                    conn.execute(UPSERT_PLAYER, (name, is_bot))
+                    (player_id,) = conn.execute(SELECT_PLAYER_ID, (name,)).fetchone()
+                    is_winner = seat == winner_num
+
+                    conn.execute(UPDATE_PLAYER_TOTALS, (is_winner, score, player_id))
+                    conn.execute(
+                        INSERT_RESULT, (match_id, player_id, seat, score, is_winner)
+                    )
+
+    # ---- Queries ----
+
+    def get_top_players(self, limit: int = 10) -> list[tuple[str, int, int, int, bool]]:
+        # (name, wins, games, best score, is bot), most wins first.
+        return self.read_conn.execute(SELECT_TOP_PLAYERS, (limit,)).fetchall()
+
+    def get_top_scores(self, limit: int = 10) -> list[tuple[str, int, float]]:
+        # (name, score, time played), highest first.
+        return self.read_conn.execute(SELECT_TOP_SCORES, (limit,)).fetchall()
+
+    def get_player_history(
+        self, name: str, limit: int = 10
+    ) -> list[tuple[float, int, int, int, int, bool]]:
+        # (time played, players, turns, seat, score, won), latest first.
+        return self.read_conn.execute(SELECT_PLAYER_HISTORY, (name, limit)).fetchall()
@@ -0,0 +1,140 @@
+from __future__ import annotations
+
+# avoiding circular imports in type hints
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from .state import GameState
+
+from array import array
+from collections import deque
+from operator import ge
+
+
+class ResourceLedger:
+    """
+    Moves resources in and out of the players' rows of a GameState.
+
+    Amounts are vectors with one entry per resource, in the state's resource order.
+    Every change is an atomic transaction: either all of its entries are applied,
+    or (if any count would go negative) none are.
+    Each applied transaction is recorded in the audit log, along with the resources
+    product effects and turn income add to the state directly (see record_gains()).
+    """
+
+    def __init__(self, state: GameState, audit_log_len: int = 1000):
+        self.state = state
+
+        # Entries are (turns taken, reason, ((player number, amounts), ...)).
+        self.audit_log: deque[tuple[int, str, tuple]] = deque(
+            maxlen=audit_log_len
+        )
+
+    def get_audit_log(self) -> deque[tuple[int, str, tuple]]:
+        return self.audit_log
+
+    def compile_cost(self, cost: dict[str, int]) -> tuple[int, ...]:
+        # Converts {resource name: amount} into a vector.
+        return tuple(
+            cost.get(resource_name, 0)
+            for resource_name in self.state.get_resource_names()
+        )
+
+    def compile_costs(
+        self, costs: list[dict[str, int]]
+    ) -> tuple[tuple[int, ...], ...]:
+        # Converts many costs into a matrix, with one row per cost.
+        return tuple(self.compile_cost(cost) for cost in costs)
+
+    def get_holdings(self, num: int) -> tuple[int, ...]:
+        return tuple(self.state.get_resource_row(num))
+
+    def can_afford(self, num: int, cost: tuple[int, ...]) -> bool:
+        return all(map(ge, self.state.get_resource_row(num), cost))
+
+    def get_affordable(
+        self, cost_matrix: tuple[tuple[int, ...], ...]
+    ) -> list[list[bool]]:
+        """Returns, for every player, whether they can afford each row of cost_matrix."""
+        num_resources = self.state.get_num_resources()
+        resources = self.state.resources
+
+        return [
+            [
+                all(map(ge, resources[start : start + num_resources], cost))
+                for cost in cost_matrix
+            ]
+            for start in range(0, len(resources), num_resources)
+        ]
+
+    def transact(
+        self, entries: tuple[tuple[int, tuple[int, ...]], ...], reason: str
+    ) -> bool:
+        """
+        Adds each (player number, amounts) entry to that player's resources.
+        Amounts can be negative.
+
+        Returns whether the transaction was applied.
+        """
+        resources = self.state.resources
+        num_resources = self.state.get_num_resources()
+
+        # Applies the entries in order to scratch copies of the players' rows,
+        # so nothing changes unless every step leaves every count non-negative.
+        rows: dict[int, list[int]] = {}
+        for num, amounts in entries:
+            if num not in rows:
+                rows[num] = list(self.state.get_resource_row(num))
+            row = rows[num]
+
+            for resource_idx, resource_amount in enumerate(amounts):
+                row[resource_idx] += resource_amount
+                if row[resource_idx] < 0:
+                    return False
+
+        for num, row in rows.items():
+            resources[num * num_resources : (num + 1) * num_resources] = (
+                array("i", row)
+            )
+
+        self.audit_log.append((self.state.turns_taken, reason, tuple(entries)))
+
+        return True
+
+    def record_gains(self, resources_before: array, reason: str) -> None:
+        """
+        Records the resources added to every player since resources_before
+        (a copy of the state's resources) as one transaction, if any were.
+        Effects and income only ever add resources, so they're applied to the
+        state directly, where simulated copies of it can apply them too.
+        """
+        resources = self.state.resources
+        num_resources = self.state.get_num_resources()
+
+        entries = []
+        for start in range(0, len(resources), num_resources):
+            amounts = tuple(
+                resources[start + resource_idx] - resources_before[start + resource_idx]
+                for resource_idx in range(num_resources)
+            )
+            if any(amounts):
+                entries.append((start // num_resources, amounts))
+
+        if entries:
+            self.audit_log.append((self.state.turns_taken, reason, tuple(entries)))
+
+    def credit(self, num: int, amounts: tuple[int, ...], reason: str) -> bool:
+        return self.transact(((num, amounts),), reason)
+
+    def debit(self, num: int, amounts: tuple[int, ...], reason: str) -> bool:
+        return self.transact(
+            ((num, tuple(-resource_amount for resource_amount in amounts)),),
+            reason,
+        )
+
+    def get_unit(self, resource_name: str, amount: int = 1) -> tuple[int, ...]:
+        # A vector of amount of one resource.
+        unit = [0] * self.state.get_num_resources()
+        unit[self.state.resource_idxs[resource_name]] = amount
+
+        return tuple(unit)
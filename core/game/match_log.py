@@ -0,0 +1,438 @@
+from __future__ import annotations
+
+from typing import BinaryIO, Iterator
+
+import atexit
+import bisect
+import struct
+
+from .batch import BUY, END, MOVE, TRADE
+from .state import GameState
+
+
+LOG_MAGIC = b"EMPM"
+LOG_VERSION = 2
+INDEX_MAGIC = b"EMPX"
+
+# magic, version, board seed, board width, board height, length of the names
+LOG_HEADER = struct.Struct("<4sBIHHH")
+# Then every player's name in UTF-8, separated by NUL, then the events.
+
+# event type, player number, then the event's payload
+EVENT = struct.Struct("<BB")
+# x, y, the resource credited (-1 for none)
+MOVE_EVENT = struct.Struct("<BBb")
+# product index, then the change in each of the buyer's stats from get_buy_stats(),
+# as a little-endian short
+BUY_EVENT = struct.Struct("<B")
+# number of turns
+END_EVENT = struct.Struct("<B")
+# length of the state, then the state as from GameState.to_bytes()
+KEYFRAME_EVENT = struct.Struct("<I")
+# A trade is the change in each resource, as a little-endian short.
+
+# Keyframes aren't actions, so come after the action types from BatchSimulator.
+KEYFRAME = 4
+
+# The index is written after the last event, as an entry for each keyframe:
+# turns taken, offset of the keyframe in the file
+INDEX_ENTRY = struct.Struct("<IQ")
+# then the number of entries, the index's offset, and INDEX_MAGIC.
+INDEX_TRAILER = struct.Struct("<IQ4s")
+
+
+def get_buy_stats(state: GameState, num: int) -> tuple[int, ...]:
+    # Every stat of the player's that a purchase can change: its resources, score,
+    # actions per turn, actions left, then its income.
+    income_len = state.get_income_len()
+
+    return (
+        *state.get_resource_row(num),
+        state.scores[num],
+        state.actions_per_turn[num],
+        state.actions_left[num],
+        *state.income[num * income_len : (num + 1) * income_len],
+    )
+
+
+class MatchRecorder:
+    """
+    Records a match as a binary event log: the board's seed and size, then
+    every move, trade, purchase and end of turn, as they happen.
+
+    Events are facts rather than inputs, so each one holds its outcome
+    (the resource a move onto a trading station gave, the resources a trade gave,
+    the changes a purchase made), and a replay never needs the RNG or the
+    game data that made them, which may have been edited since.
+
+    Every keyframe_interval turns, the whole state is written too, and the
+    index of keyframes is written when the match ends, so any turn can be
+    reached from the nearest keyframe before it.
+    """
+
+    def __init__(self, keyframe_interval: int = 16):
+        self.keyframe_interval = keyframe_interval
+
+        self.file: None | BinaryIO = None
+        self.state: None | GameState = None
+        self.offset = 0
+        # (turns taken, file offset) of each keyframe.
+        self.index: list[tuple[int, int]] = []
+
+        atexit.register(self.stop)
+
+    def get_enabled(self) -> bool:
+        return self.file is not None
+
+    def start(
+        self,
+        file_path: str,
+        seed: int,
+        dims: tuple[int, int],
+        names: list[str],
+        state: GameState,
+    ) -> None:
+        # Starts recording a match from state, which the hooked methods then change.
+        # Raises FileExistsError rather than writing over an existing file.
+        self.stop()
+
+        self.file = open(file_path, "xb")
+        self.state = state
+        self.offset = 0
+        self.index = []
+
+        names_bytes = "\0".join(names).encode()
+        self.write(
+            LOG_HEADER.pack(
+                LOG_MAGIC, LOG_VERSION, seed, dims[0], dims[1], len(names_bytes)
+            )
+            + names_bytes
+        )
+        self.write_keyframe()
+
+    def stop(self) -> None:
+        # Ends the match, writing the index.
+        if self.file is None:
+            return
+
+        index_offset = self.offset
+        self.write(
+            b"".join(INDEX_ENTRY.pack(*entry) for entry in self.index)
+            + INDEX_TRAILER.pack(len(self.index), index_offset, INDEX_MAGIC)
+        )
+
+        self.file.close()
+        self.file = None
+        self.state = None
+
+    def write(self, data: bytes) -> None:
+        self.file.write(data)
+        self.offset += len(data)
+
+    def write_keyframe(self) -> None:
+        self.index.append((self.state.turns_taken, self.offset))
+
+        state_bytes = self.state.to_bytes()
+        self.write(
+            EVENT.pack(KEYFRAME, max(self.state.curr, 0))
+            + KEYFRAME_EVENT.pack(len(state_bytes))
+            + state_bytes
+        )
+
+    # ---- Hooks ----
+
+    def move(self, num: int, pos: tuple[int, int], resource_type: None | str) -> None:
+        if self.file is not None:
+            resource_idx = (
+                -1
+                if resource_type is None
+                else self.state.resource_idxs[resource_type]
+            )
+            self.write(EVENT.pack(MOVE, num) + MOVE_EVENT.pack(*pos, resource_idx))
+
+    def trade(self, num: int, changes: tuple[int, ...]) -> None:
+        # changes are all zero for a trade that couldn't be afforded, which still ends the turn.
+        if self.file is not None:
+            self.write(
+                EVENT.pack(TRADE, num) + struct.pack(f"<{len(changes)}h", *changes)
+            )
+
+    def buy(
+        self, num: int, product_idx: int, stats_before: None | tuple[int, ...]
+    ) -> None:
+        # stats_before is get_buy_stats() from before the purchase (None when not recording).
+        if self.file is not None:
+            changes = [
+                stat - stat_before
+                for stat, stat_before in zip(
+                    get_buy_stats(self.state, num), stats_before
+                )
+            ]
+            self.write(
+                EVENT.pack(BUY, num)
+                + BUY_EVENT.pack(product_idx)
+                + struct.pack(f"<{len(changes)}h", *changes)
+            )
+
+    def end(self, num_turns: int) -> None:
+        if self.file is None:
+            return
+
+        self.write(EVENT.pack(END, max(self.state.curr, 0)) + END_EVENT.pack(num_turns))
+
+        if self.state.turns_taken % self.keyframe_interval < num_turns:
+            self.write_keyframe()
+
+
+# The one recorder for the whole game, so the hooked classes can record to it.
+match_recorder = MatchRecorder()
+
+
+class MatchLog:
+    """
+    A recorded match, loaded whole, for replaying and seeking.
+
+    Seeking to a turn finds the last keyframe at or before it in the index
+    (a binary search), then applies the events from there to the turn.
+    A log without an index (from a game that didn't exit cleanly)
+    has its keyframes found by reading through it once.
+    """
+
+    def __init__(self, file_path: str):
+        with open(file_path, "rb") as f:
+            self.data = f.read()
+
+        magic, version, self.seed, width, height, names_len = (
+            LOG_HEADER.unpack_from(self.data)
+        )
+
+        if magic != LOG_MAGIC:
+            raise ValueError("File is not a match log.")
+        if version != LOG_VERSION:
+            raise ValueError(
+                f"Unsupported match log version {version} (expected {LOG_VERSION})."
+            )
+
+        self.dims = (width, height)
+        names_end = LOG_HEADER.size + names_len
+        self.names = self.data[LOG_HEADER.size : names_end].decode().split("\0")
+        self.events_start = names_end
+
+        # Every log starts with a keyframe, which gives the size of trade and purchase events.
+        self.num_resources = self.read_keyframe(self.events_start).get_num_resources()
+        self.buy_changes = struct.Struct(f"<{2 * self.num_resources + 4}h")
+
+        self.read_index()
+
+    def get_seed(self) -> int:
+        return self.seed
+
+    def get_dims(self) -> tuple[int, int]:
+        return self.dims
+
+    def get_names(self) -> list[str]:
+        return self.names
+
+    def get_num_turns(self) -> int:
+        return self.num_turns
+
+    def read_index(self) -> None:
+        # Sets the turns and offsets of each keyframe, and where the events end.
+        num_entries, index_offset, magic = INDEX_TRAILER.unpack_from(
+            self.data, len(self.data) - INDEX_TRAILER.size
+        )
+
+        if magic == INDEX_MAGIC:
+            entries = list(
+                INDEX_ENTRY.iter_unpack(
+                    self.data[
+                        index_offset : index_offset + num_entries * INDEX_ENTRY.size
+                    ]
+                )
+            )
+            self.events_end = index_offset
+        else:
+            entries = [
+                (turns_taken, offset)
+                for offset, event_type, _, turns_taken in self.scan()
+                if event_type == KEYFRAME
+            ]
+
+        self.index_turns = [turns_taken for turns_taken, _ in entries]
+        self.index_offsets = [offset for _, offset in entries]
+
+        # The last turn reached is after the last keyframe's ends of turns.
+        self.num_turns = self.index_turns[-1]
+        offset = self.index_offsets[-1]
+
+        while offset < self.events_end:
+            event_type, _ = EVENT.unpack_from(self.data, offset)
+            if event_type == END:
+                self.num_turns += END_EVENT.unpack_from(self.data, offset + EVENT.size)[0]
+
+            offset += self.get_event_size(event_type, offset)
+
+    def scan(self) -> Iterator[tuple[int, int, int, int]]:
+        # Yields each complete event's offset, type, player and (for keyframes) turns taken,
+        # stopping at the end or at a half-written event.
+        self.events_end = len(self.data)
+        offset = self.events_start
+
+        try:
+            while offset < len(self.data):
+                event_type, num = EVENT.unpack_from(self.data, offset)
+                size = self.get_event_size(event_type, offset)
+
+                if offset + size > len(self.data):
+                    break
+
+                turns_taken = (
+                    self.read_keyframe(offset).turns_taken
+                    if event_type == KEYFRAME
+                    else 0
+                )
+                yield offset, event_type, num, turns_taken
+
+                offset += size
+        except (struct.error, ValueError):
+            pass
+
+        self.events_end = offset
+
+    def get_event_size(self, event_type: int, offset: int) -> int:
+        if event_type == MOVE:
+            return EVENT.size + MOVE_EVENT.size
+        elif event_type == TRADE:
+            return EVENT.size + 2 * self.num_resources
+        elif event_type == BUY:
+            return EVENT.size + BUY_EVENT.size + self.buy_changes.size
+        elif event_type == END:
+            return EVENT.size + END_EVENT.size
+        elif event_type == KEYFRAME:
+            (state_len,) = KEYFRAME_EVENT.unpack_from(self.data, offset + EVENT.size)
+            return EVENT.size + KEYFRAME_EVENT.size + state_len
+
+        raise ValueError(f"Unknown event type {event_type}.")
+
+    def read_keyframe(self, offset: int) -> GameState:
+        (state_len,) = KEYFRAME_EVENT.unpack_from(self.data, offset + EVENT.size)
+        start = offset + EVENT.size + KEYFRAME_EVENT.size
+
+        return GameState.from_bytes(self.data[start : start + state_len])
+
+    def apply_events(
+        self, state: GameState, offset: int
+    ) -> Iterator[tuple[int, int, int]]:
+        """
+        Applies each event from the one at offset to state, yielding each event's
+        type, player and offset after applying it (its payload follows EVENT there).
+        Keyframes are skipped, as the events already give their state.
+        """
+        data = self.data
+        end = self.events_end
+        resources = state.resources
+        num_resources = self.num_resources
+        income_len = state.get_income_len()
+        trade_changes = struct.Struct(f"<{num_resources}h")
+        buy_changes = self.buy_changes
+
+        while offset < end:
+            event_offset = offset
+            event_type, num = EVENT.unpack_from(data, offset)
+            offset += EVENT.size
+
+            if event_type == MOVE:
+                x, y, resource_idx = MOVE_EVENT.unpack_from(data, offset)
+                offset += MOVE_EVENT.size
+
+                state.actions_left[num] -= 1
+                state.set_pos(num, (x, y))
+                if resource_idx >= 0:
+                    resources[num * num_resources + resource_idx] += 1
+            elif event_type == TRADE:
+                start = num * num_resources
+                for resource_idx, change in enumerate(
+                    trade_changes.unpack_from(data, offset)
+                ):
+                    resources[start + resource_idx] += change
+                offset += trade_changes.size
+
+                state.actions_left[num] = 0
+            elif event_type == BUY:
+                # In the order of get_buy_stats(). The product index is only for analysis.
+                changes = buy_changes.unpack_from(data, offset + BUY_EVENT.size)
+                offset += BUY_EVENT.size + buy_changes.size
+
+                start = num * num_resources
+                for resource_idx in range(num_resources):
+                    resources[start + resource_idx] += changes[resource_idx]
+                state.scores[num] += changes[num_resources]
+                state.actions_per_turn[num] += changes[num_resources + 1]
+                state.actions_left[num] += changes[num_resources + 2]
+
+                start = num * income_len
+                for income_idx in range(income_len):
+                    state.income[start + income_idx] += changes[
+                        num_resources + 3 + income_idx
+                    ]
+            elif event_type == END:
+                (num_turns,) = END_EVENT.unpack_from(data, offset)
+                offset += END_EVENT.size
+
+                state.cycle_curr(num_turns)
+            else:
+                offset += self.get_event_size(event_type, offset - EVENT.size) - EVENT.size
+
+            yield event_type, num, event_offset
+
+    def seek(self, state: GameState, turn: int) -> None:
+        # Sets state, in place, to how it was at the start of turn.
+        turn = max(0, min(turn, self.num_turns))
+        keyframe_idx = max(bisect.bisect_right(self.index_turns, turn) - 1, 0)
+        offset = self.index_offsets[keyframe_idx]
+
+        state.restore(self.read_keyframe(offset).snapshot())
+
+        if state.turns_taken >= turn:
+            return
+
+        for event_type, _, _ in self.apply_events(state, offset):
+            if event_type == END and state.turns_taken >= turn:
+                return
+
+    def replay(self, state: GameState) -> int:
+        """
+        Sets state to the first keyframe, then applies every event, as fast as possible.
+        Returns the number of events applied.
+        """
+        num_events = 0
+        for _ in self.iter_replay(state):
+            num_events += 1
+
+        return num_events
+
+    def iter_replay(self, state: GameState) -> Iterator[tuple[int, int, int]]:
+        # As replay(), yielding each event as from apply_events().
+        offset = self.index_offsets[0]
+        state.restore(self.read_keyframe(offset).snapshot())
+
+        yield from self.apply_events(state, offset)
+
+    def verify(self) -> list[int]:
+        # Replays the match, returning the turns of any keyframes the events don't reach.
+        state = self.read_keyframe(self.index_offsets[0])
+        mismatches = []
+        keyframe_idx = 1
+
+        for event_type, _, _ in self.apply_events(state, self.index_offsets[0]):
+            if (
+                event_type == END
+                and keyframe_idx < len(self.index_turns)
+                and state.turns_taken == self.index_turns[keyframe_idx]
+            ):
+                keyframe = self.read_keyframe(self.index_offsets[keyframe_idx])
+                if keyframe.snapshot() != state.snapshot():
+                    mismatches.append(state.turns_taken)
+                keyframe_idx += 1
+
+        return mismatches
@@ -5,16 +5,25 @@ from typing import TYPE_CHECKING
 
 if TYPE_CHECKING:
     from .board import Board
+    from .fog import FogOfWar
 
 import os
 import pygame
 import random
 
+from collections import deque
+
 from .helper import get_conns
+from .ledger import ResourceLedger
+from .match_log import match_recorder
+from .state import GameState, ResourceView
 
+from ..tracing import tracer
 from ..ui.sprite_sheet import SpriteSheet
 
 
+# A view over one player's entries in a GameState.
+# Everything that changes during a game is stored in the state, not in this object.
 class Player:
     def __init__(
         self,
@@ -23,35 +32,57 @@ class Player:
         colour: tuple[int, int, int],
         image_file_path: str,
         board: Board,
-        resources: dict,
+        state: GameState,
+        ledger: ResourceLedger,
+        is_bot: bool = False,
+        image: None | pygame.Surface = None,
     ):
+        self.board = board
+        self.state = state
+        self.ledger = ledger
+
+        self.reset(name, num, colour, image_file_path, is_bot, image)
+
+    def reset(
+        self,
+        name: str,
+        num: int,
+        colour: tuple[int, int, int],
+        image_file_path: str,
+        is_bot: bool = False,
+        image: None | pygame.Surface = None,
+    ) -> None:
+        # Makes this a new player, so PlayerList can reuse it in the next game.
+        # The image is loaded from image_file_path, unless already loaded.
         self.name = name
         self.num = num
         self.colour = colour
-        self.image = pygame.image.load(image_file_path)
-        self.board = board
-        self.resources = {
-            resource_name: 0 for resource_name in resources.keys()
-        }
+        self.image_file_path = image_file_path  # Kept so saved games show the same ship.
+        self.image = image or pygame.image.load(image_file_path)
+        self.is_bot = is_bot  # Whether the player's turns are taken by the AI.
+        self.resources = ResourceView(self.state, num)
 
-        self.board_graph = board.get_graph()
-        # Ensuring the player always starts on a planet
-        self.pos = board.get_rand_non_empty_pos()
+        # The board may have been generated again since this player was last used.
+        self.board_graph = self.board.get_graph()
         self.rect = self.image.get_rect()
-        self.rect.center = self.board.get_tile_centre_pos(self.pos)
 
-        self.score = 0
-        self.actions_per_turn = 2
-        self.actions_left = 2
+        # The ship is drawn following the state's position along the graph's edges,
+        # one edge at a time, rather than jumping to it.
+        self.ship_path: deque[tuple[int, int]] = deque()  # Tiles still to move to.
+        self.ship_progress = 0.0  # How far along the edge to ship_path[0], from 0 to 1.
+        self.snap_ship()
+
         self.status = ""
+        # Shown what's near each tile it moves onto, in fog of war games.
+        self.fog: None | FogOfWar = None
 
         self.next = None
 
     def change_actions_per_turn_by(self, actions_per_turn_change: int) -> None:
-        self.actions_per_turn += actions_per_turn_change
+        self.state.change_actions_per_turn_by(self.num, actions_per_turn_change)
 
     def get_actions_left(self) -> int:
-        return self.actions_left
+        return self.state.actions_left[self.num]
 
     def get_colour(self) -> tuple[int, int, int]:
         return self.colour
@@ -59,6 +90,12 @@ class Player:
     def get_image(self) -> pygame.Surface:
         return self.image
 
+    def get_image_file_path(self) -> str:
+        return self.image_file_path
+
+    def get_is_bot(self) -> bool:
+        return self.is_bot
+
     def get_name(self) -> str:
         return self.name
 
@@ -66,13 +103,19 @@ class Player:
         return self.num
 
     def get_pos(self) -> tuple[int, int]:
-        return self.pos
+        return self.state.get_pos(self.num)
+
+    def get_ledger(self) -> ResourceLedger:
+        return self.ledger
+
+    def get_state(self) -> GameState:
+        return self.state
 
     def get_score(self):
-        return self.score
+        return self.state.scores[self.num]
 
     def change_score_by(self, score_change: int) -> None:
-        self.score += score_change
+        self.state.change_score_by(self.num, score_change)
 
     def get_status(self) -> str:
         return self.status
@@ -80,14 +123,21 @@ class Player:
     def set_status(self, new_status) -> None:
         self.status = new_status
 
+    def set_fog(self, fog: None | FogOfWar) -> None:
+        self.fog = fog
+
     def get_resources(self) -> dict:
         return self.resources
 
     def set_resources(self, new_resources) -> None:
-        self.resources = new_resources
+        # Writes through to the state rather than replacing the view.
+        if new_resources is not self.resources:
+            self.resources.update(new_resources)
 
     def reset_actions_left(self) -> None:
-        self.actions_left = self.actions_per_turn
+        self.state.actions_left[self.num] = self.state.actions_per_turn[
+            self.num
+        ]
 
     def move(self, new_pos: tuple[int, int], last_pos: tuple[int, int]) -> int:
         """
@@ -97,16 +147,23 @@ class Player:
         Returns the number of moves left for the player that turn.
         """
         if new_pos in get_conns(self.board_graph, last_pos):
-            self.actions_left -= 1
-            self.pos = new_pos
-            self.rect.center = self.board.get_tile_centre_pos(self.pos)
+            self.state.actions_left[self.num] -= 1
+            self.state.set_pos(self.num, new_pos)
+            tracer.instant("move", "player", player=self.num, pos=new_pos)
+
+            if self.fog is not None:
+                self.fog.visit(self.num, new_pos)
 
             if new_pos_resource_type := self.board.get_resource_type_from_tile_type(
                 self.board.get_type_from_board_pos(new_pos)
             ):
-                self.resources[new_pos_resource_type] += 1
+                self.ledger.credit(
+                    self.num, self.ledger.get_unit(new_pos_resource_type), "move"
+                )
 
-        return self.actions_left
+            match_recorder.move(self.num, new_pos, new_pos_resource_type)
+
+        return self.state.actions_left[self.num]
 
     def trade(self) -> bool:
         """
@@ -115,28 +172,117 @@ class Player:
 
         Returns whether the trade was successful.
         """
-        tile = self.board.get_matrix()[self.pos[1]][self.pos[0]]
+        pos = self.get_pos()
+        tile = self.board.get_matrix()[pos[1]][pos[0]]
 
         if not tile.get_can_trade():
             return False
 
         trade = tile.get_trade()
+        cost = self.ledger.get_unit(trade["type_taken"], trade["amount_taken"])
 
-        if self.resources[trade["type_taken"]] >= trade["amount_taken"]:
-            self.resources[trade["type_taken"]] -= trade["amount_taken"]
-
+        if self.ledger.can_afford(self.num, cost):
+            # The resources given are only drawn once the trade will go through,
+            # then counted into one vector, taken and given in a single transaction.
+            amounts_given = [0] * self.state.get_num_resources()
             for _ in range(trade["amount_given"]):
-                self.resources[random.choice(list(self.resources.keys()))] += 1
+                amounts_given[random.randrange(len(amounts_given))] += 1
+
+            amounts_taken = tuple(-resource_amount for resource_amount in cost)
+            self.ledger.transact(
+                ((self.num, amounts_taken), (self.num, tuple(amounts_given))),
+                "trade",
+            )
 
             self.status = f'Trade of {trade["amount_taken"]} {trade["type_taken"]} successful.'
+            tracer.instant("trade", "player", player=self.num, **trade)
+            match_recorder.trade(
+                self.num,
+                tuple(
+                    amount_taken + amount_given
+                    for amount_taken, amount_given in zip(amounts_taken, amounts_given)
+                ),
+            )
         else:
             self.status = f'Not enough {trade["type_taken"]} for trade (needs {trade["amount_taken"]})'
+            match_recorder.trade(self.num, (0,) * len(cost))
 
-        self.actions_left = 0
+        self.state.actions_left[self.num] = 0
 
         return True
 
-    def render_to(self, window: pygame.display) -> None:
+    def get_ship_target(self) -> tuple[int, int]:
+        # The tile the ship will stop at once it's finished moving.
+        return self.ship_path[-1] if self.ship_path else self.ship_node
+
+    def snap_ship(self) -> None:
+        # Puts the ship straight on the player's tile.
+        self.ship_node = self.get_pos()
+        self.ship_path.clear()
+        self.ship_progress = 0.0
+
+        self.ship_centre = self.board.get_tile_centre_pos(self.ship_node)
+        self.last_ship_centre = self.ship_centre
+
+    def follow_pos(self) -> None:
+        """
+        Adds the player's position to the ship's path if it's moved along an edge.
+        Any other change (a restored snapshot, or seeking in a replay)
+        puts the ship straight there.
+        """
+        pos = self.get_pos()
+        target = self.get_ship_target()
+
+        if pos == target:
+            return
+
+        if pos in get_conns(self.board_graph, target):
+            self.ship_path.append(pos)
+        else:
+            self.snap_ship()
+
+    def update_ship(self, tick_time: float, move_time: float) -> None:
+        # Moves the ship one fixed tick along its path, taking move_time seconds an edge.
+        self.follow_pos()
+        self.last_ship_centre = self.ship_centre
+
+        if self.ship_path:
+            # Ships with several moves to show move faster, so they never fall far behind.
+            self.ship_progress += tick_time * len(self.ship_path) / move_time
+
+            while self.ship_path and self.ship_progress >= 1:
+                self.ship_node = self.ship_path.popleft()
+                self.ship_progress -= 1
+
+        start = self.board.get_tile_centre_pos(self.ship_node)
+
+        if not self.ship_path:
+            self.ship_progress = 0.0
+            self.ship_centre = start
+            return
+
+        end = self.board.get_tile_centre_pos(self.ship_path[0])
+        self.ship_centre = (
+            start[0] + (end[0] - start[0]) * self.ship_progress,
+            start[1] + (end[1] - start[1]) * self.ship_progress,
+        )
+
+    def render_to(self, window: pygame.display, alpha: float = 1.0) -> None:
+        # Drawn alpha of the way from the ship's position at the last tick to this tick's,
+        # so it moves smoothly however often frames are drawn.
+        self.follow_pos()
+
+        self.rect.center = (
+            round(
+                self.last_ship_centre[0]
+                + (self.ship_centre[0] - self.last_ship_centre[0]) * alpha
+            ),
+            round(
+                self.last_ship_centre[1]
+                + (self.ship_centre[1] - self.last_ship_centre[1]) * alpha
+            ),
+        )
+
         window.blit(self.image, self.rect)
 
 
@@ -154,59 +300,125 @@ class PlayerList:
         }
         # The folder from which all player images are to be randomly picked from.
         self.image_folder_path = image_folder_path
+        # Listed and loaded once, rather than every time a player is added.
+        self.image_file_names = sorted(os.listdir(image_folder_path))
+        self.images: dict[str, pygame.Surface] = {}
+
+        # Stores the current player, turns taken and every player's stats.
+        self.state = GameState(tuple(self.resources))
+        self.ledger = ResourceLedger(self.state)
 
-        self.curr = None  # The player who is currently taking their turn.
         self.first = None  # The first player of the turn order.
+        self.by_num: list[Player] = []  # Players indexed by number, for O(1) lookup.
 
         self.len_cycle = 0  # The length of one cycle (as list is infinite).
-        self.turns_taken = 0  # Number of turns taken.
+
+        # Players of past games, reused by add() instead of made again.
+        self.pool: list[Player] = []
+
+        # What each player has seen, in fog of war games. Kept for the players added after it's set.
+        self.fog: None | FogOfWar = None
+
+    def get_state(self) -> GameState:
+        return self.state
+
+    def get_ledger(self) -> ResourceLedger:
+        return self.ledger
+
+    def get_fog(self) -> None | FogOfWar:
+        return self.fog
+
+    def set_fog(self, fog: None | FogOfWar) -> None:
+        # Only given to players added after this, so set before adding a game's players.
+        self.fog = fog
 
     def get_curr(self) -> None | Player:
-        return self.curr
+        # The player who is currently taking their turn.
+        if self.state.curr == -1:
+            return None
+
+        return self.by_num[self.state.curr]
 
     def get_status(self) -> None | str:
-        return self.curr.get_status() if self.curr else None
+        curr = self.get_curr()
+
+        return curr.get_status() if curr else None
 
     def get_turns_taken(self) -> int:
-        return self.turns_taken
+        return self.state.turns_taken
 
     def cycle_curr(self, num_turns: int = 1) -> None | Player:
         # Shifts the current player to the next player in the order.
         # Done as many times as specified by num_turns.
-        if self.curr == None:
-            return None
-
-        for _ in range(num_turns):
-            self.turns_taken += 1
-
-            if self.curr.next:
-                self.curr = self.curr.next
+        # Any income paid at the start of the turns is recorded in the ledger.
+        resources_before = self.state.resources[:]
+        self.state.cycle_curr(num_turns)
+        self.ledger.record_gains(resources_before, "income")
+        match_recorder.end(num_turns)
+        tracer.instant(
+            "end turn",
+            "player",
+            turns_taken=self.state.turns_taken,
+            curr=self.state.curr,
+        )
 
-            self.curr.reset_actions_left()
-        return self.curr
+        return self.get_curr()
 
     def clear(self) -> None:
         # Removes all Player objects from inside this PlayerList object.
         # Resets all related stats.
-        self.curr = None
+        self.state.clear()
+
+        self.pool.extend(self.by_num)
+
         self.first = None
+        self.by_num = []
 
         self.len_cycle = 0
-        self.turns_taken = 0
 
-    def add(self, name: str, colour: tuple[int, int, int]) -> None:
+    def add(
+        self,
+        name: str,
+        colour: tuple[int, int, int],
+        is_bot: bool = False,
+        image_file_path: None | str = None,
+    ) -> None:
         # Creates a new Player object inside this PlayerList object,
         # and adds it to the circular linked list order.
-        new = Player(
-            name,
-            self.len_cycle,
-            colour,
-            f"{self.image_folder_path}/{random.choice(os.listdir(self.image_folder_path))}",
-            self.board,
-            self.resources,
-        )
+        # Ensuring the player always starts on a planet
+        num = self.state.add_player(self.board.get_rand_non_empty_pos())
+
+        # Its ship is picked at random, unless given (as when resuming a saved game).
+        if image_file_path is None:
+            image_file_path = (
+                f"{self.image_folder_path}/{random.choice(self.image_file_names)}"
+            )
+
+        if (image := self.images.get(image_file_path)) is None:
+            image = self.images[image_file_path] = pygame.image.load(image_file_path)
+
+        if self.pool:
+            new = self.pool.pop()
+            new.reset(name, num, colour, image_file_path, is_bot, image)
+        else:
+            new = Player(
+                name,
+                num,
+                colour,
+                image_file_path,
+                self.board,
+                self.state,
+                self.ledger,
+                is_bot,
+                image,
+            )
+        self.by_num.append(new)
         self.len_cycle += 1
 
+        new.set_fog(self.fog)
+        if self.fog is not None:
+            self.fog.add_player(num, new.get_pos())
+
         if self.first is None:
             new.next = new
             self.first = new
@@ -220,9 +432,6 @@ class PlayerList:
 
             new.next = self.first
 
-        if self.curr is None:
-            self.curr = self.first
-
     def get_list(self) -> list:
         # Returns a turn-ordered list of all the players.
         if self.first is None:
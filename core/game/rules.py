@@ -0,0 +1,207 @@
+from __future__ import annotations
+
+# avoiding circular imports in type hints
+from typing import TYPE_CHECKING, Iterable
+
+if TYPE_CHECKING:
+    from random import Random
+
+    from .board import Board
+    from .shop import Shop
+    from .state import GameState
+
+from copy import copy
+
+
+# Values of Rules.node_resources for tiles which don't give a fixed resource.
+RANDOM_RESOURCE = -1  # Trading stations give a random resource when moved onto.
+NO_RESOURCE = -2  # Asteroids give nothing.
+
+# Actions are tuples, so they can be used as dictionary keys:
+# - ("move", (x, y)): move to a connected tile.
+# - ("trade",): trade at the current trading station.
+# - ("buy", product_idx): buy a product (product_idx starts from 1, as in Shop).
+# - ("end",): end the turn.
+END_ACTION = ("end",)
+TRADE_ACTION = ("trade",)
+
+
+class Rules:
+    """
+    The game rules, applied directly to a GameState.
+
+    Does the same as Player.move(), Player.trade(), Shop.buy_product()
+    and PlayerList.cycle_curr(), but without any pygame objects,
+    so that many copies of a game can be simulated quickly.
+    """
+
+    def __init__(self, board: Board, shop: Shop, winning_score: int = 5):
+        self.winning_score = winning_score
+
+        self.resource_names = tuple(board.get_icon_sprite_sheet().get_names())
+        self.num_resources = len(self.resource_names)
+        self.resource_idxs = {
+            resource_name: resource_idx
+            for resource_idx, resource_name in enumerate(self.resource_names)
+        }
+
+        # Adjacency as tuples, so that iterating over it never copies.
+        self.graph: dict[tuple[int, int], tuple[tuple[int, int], ...]] = {}
+        self.node_resources: dict[tuple[int, int], int] = {}
+        self.trades: dict[tuple[int, int], tuple[int, int, int]] = {}
+
+        for node in board.get_graph():
+            self.set_node(board, node)
+
+        # (cost per resource index, score, effect) for every product, in shop order.
+        self.products = [
+            (
+                tuple(
+                    product.get_cost().get(resource_name, 0)
+                    for resource_name in self.resource_names
+                ),
+                product.get_score(),
+                product.get_effect(),
+            )
+            for product in shop.get_products()
+        ]
+
+    def set_node(self, board: Board, node: tuple[int, int]) -> None:
+        # Reads one node's connections and tile from the board, or removes it if gone.
+        self.trades.pop(node, None)
+
+        if node not in board.get_graph():
+            self.graph.pop(node, None)
+            self.node_resources.pop(node, None)
+            return
+
+        self.graph[node] = tuple(board.get_graph()[node])
+
+        tile = board.get_matrix()[node[1]][node[0]]
+        behaviour_type = board.get_tile_behaviour_type_from_tile_type(
+            tile.get_type()
+        )
+
+        if behaviour_type == "planet":
+            self.node_resources[node] = self.resource_idxs[
+                tile.get_type().split("_")[-1]
+            ]
+        elif behaviour_type == "trader":
+            self.node_resources[node] = RANDOM_RESOURCE
+        else:
+            self.node_resources[node] = NO_RESOURCE
+
+        if tile.get_can_trade():
+            trade = tile.get_trade()
+            self.trades[node] = (
+                self.resource_idxs[trade["type_taken"]],
+                trade["amount_taken"],
+                trade["amount_given"],
+            )
+
+    def with_nodes(self, board: Board, nodes: Iterable[tuple[int, int]]) -> Rules:
+        """
+        Returns a copy of the rules with only the given nodes read from the board again,
+        after board events changed them. The tables are copied rather than changed,
+        as the AI may still be searching with these rules.
+        """
+        rules = copy(self)
+        rules.graph = dict(self.graph)
+        rules.node_resources = dict(self.node_resources)
+        rules.trades = dict(self.trades)
+
+        for node in nodes:
+            rules.set_node(board, node)
+
+        return rules
+
+    def get_winner(self, state: GameState) -> int:
+        # Returns the number of the highest-scoring player once they have won, otherwise -1.
+        # Ties go to the later player.
+        winner = -1
+
+        for num, score in enumerate(state.scores):
+            if winner == -1 or score >= state.scores[winner]:
+                winner = num
+
+        if winner != -1 and state.scores[winner] >= self.winning_score:
+            return winner
+
+        return -1
+
+    def can_afford(self, state: GameState, num: int, product_idx: int) -> bool:
+        cost = self.products[product_idx - 1][0]
+        start = num * self.num_resources
+
+        for resource_idx, resource_amount in enumerate(cost):
+            if state.resources[start + resource_idx] < resource_amount:
+                return False
+
+        return True
+
+    def get_legal_actions(self, state: GameState) -> list[tuple]:
+        num = state.curr
+        pos = state.get_pos(num)
+        actions = []
+
+        if state.actions_left[num] > 0:
+            for conn in self.graph.get(pos, ()):
+                actions.append(("move", conn))
+
+            if trade := self.trades.get(pos):
+                if (
+                    state.resources[num * self.num_resources + trade[0]]
+                    >= trade[1]
+                ):
+                    actions.append(TRADE_ACTION)
+
+        # Products can only be bought on a trading station.
+        if pos in self.trades:
+            for product_idx in range(1, len(self.products) + 1):
+                if self.can_afford(state, num, product_idx):
+                    actions.append(("buy", product_idx))
+
+        actions.append(END_ACTION)
+
+        return actions
+
+    def apply(self, state: GameState, action: tuple, rng: Random) -> None:
+        # Assumes the action came from get_legal_actions() for this state.
+        num = state.curr
+        action_type = action[0]
+
+        if action_type == "move":
+            state.actions_left[num] -= 1
+            state.set_pos(num, action[1])
+
+            resource_idx = self.node_resources[action[1]]
+            if resource_idx == RANDOM_RESOURCE:
+                resource_idx = rng.randrange(self.num_resources)
+            if resource_idx >= 0:
+                state.resources[num * self.num_resources + resource_idx] += 1
+
+            # As in SceneManager.game_scene(), running out of moves ends the turn.
+            if state.actions_left[num] <= 0:
+                state.cycle_curr()
+        elif action_type == "trade":
+            type_taken, amount_taken, amount_given = self.trades[
+                state.get_pos(num)
+            ]
+            start = num * self.num_resources
+
+            state.resources[start + type_taken] -= amount_taken
+            for _ in range(amount_given):
+                state.resources[start + rng.randrange(self.num_resources)] += 1
+
+            state.actions_left[num] = 0
+        elif action_type == "buy":
+            cost, score, effect = self.products[action[1] - 1]
+            start = num * self.num_resources
+
+            # In the same order as Shop.buy_product().
+            for resource_idx, resource_amount in enumerate(cost):
+                state.resources[start + resource_idx] -= resource_amount
+            effect(state, num)
+            state.scores[num] += score
+        else:
+            state.cycle_curr()
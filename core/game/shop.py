@@ -2,44 +2,102 @@ from __future__ import annotations
 
 from typing import Callable
 
+from .catalog import Catalog
+from .ledger import ResourceLedger
+from .match_log import get_buy_stats, match_recorder
 from .player import Player
+from ..tracing import tracer
 
 
 class Shop:
 
     def __init__(self, products: list[Product]):
+        self.set_products(products)
+
+    def set_products(self, products: list[Product]) -> None:
+        # Also used to swap in reloaded products while playing.
         self.products = products
 
         self.idxs = [product.get_idx() for product in self.products]
-        self.idxs_ascii = [ord(idx) for idx in self.idxs]
+
+        # Lookups by id, category and cost.
+        self.catalog = Catalog(self.products)
+
+        # Product costs as vectors, compiled for the resource order they were made for.
+        self.cost_matrix: tuple[tuple[int, ...], ...] = ()
+        self.cost_matrix_resource_names: None | tuple[str, ...] = None
 
     def get_products(self) -> list[Product]:
         return self.products
 
-    def get_idxs(self) -> list[int]:
+    def get_idxs(self) -> list[str]:
         return self.idxs
 
-    def get_idxs_ascii(self) -> list[int]:
-        return self.idxs_ascii
+    def get_catalog(self) -> Catalog:
+        return self.catalog
+
+    def get_cost_matrix(
+        self, ledger: ResourceLedger
+    ) -> tuple[tuple[int, ...], ...]:
+        # Compiled once, then only again if the ledger's resources change.
+        resource_names = ledger.state.get_resource_names()
+
+        if resource_names != self.cost_matrix_resource_names:
+            self.cost_matrix = ledger.compile_costs(
+                [product.get_cost() for product in self.products]
+            )
+            self.cost_matrix_resource_names = resource_names
+
+        return self.cost_matrix
+
+    def get_affordable(self, ledger: ResourceLedger) -> list[list[bool]]:
+        # Whether each player can afford each product, in one pass.
+        return ledger.get_affordable(self.get_cost_matrix(ledger))
 
-    def buy_product(self, player: Player, product_idx: int) -> None:
+    def buy_product(self, player: Player, product_idx: int) -> bool:
+        # Returns whether the purchase was made.
         product = self.products[product_idx - 1]
+        ledger = player.get_ledger()
+
+        # Recorded as the changes it makes, so replays don't depend on the game data.
+        stats_before = (
+            get_buy_stats(player.get_state(), player.get_num())
+            if match_recorder.get_enabled()
+            else None
+        )
+
+        # Removes all specified resources for the product,
+        # or nothing if the player can't afford all of them.
+        if not ledger.debit(
+            player.get_num(),
+            self.get_cost_matrix(ledger)[product_idx - 1],
+            f"buy {product.get_name()}",
+        ):
+            return False
 
         # Runs the effect command, stored as an function attribute.
-        product.get_effect()()
+        # Effects act on the game state, so they also work on simulated copies of it.
+        resources_before = player.get_state().resources[:]
+        product.get_effect()(player.get_state(), player.get_num())
+        ledger.record_gains(resources_before, f"effect of {product.get_name()}")
 
         # Grants score points from purchase to player.
         player.change_score_by(product.get_score())
 
-        # Removes all specified resources for the product.
-        player_resources = player.get_resources()
-        for resource, resource_amount in product.get_cost().items():
-            player_resources[resource] -= resource_amount
-        player.set_resources(player_resources)
+        match_recorder.buy(player.get_num(), product_idx, stats_before)
+
+        tracer.instant(
+            "buy", "shop", player=player.get_num(), product=product.get_idx()
+        )
+
+        return True
 
     def check_product_reqs(self, player: Player, product_idx: int) -> bool:
-        # Calls function of aggregated element.
-        return self.products[product_idx - 1].check_reqs(player)
+        ledger = player.get_ledger()
+
+        return ledger.can_afford(
+            player.get_num(), self.get_cost_matrix(ledger)[product_idx - 1]
+        )
 
 
 class Product:
@@ -53,6 +111,7 @@ class Product:
         effect: Callable,
         score: int,
         effect_desc: str,
+        category: str = "",
     ):
         self.idx = idx
         self.name = name
@@ -61,6 +120,7 @@ class Product:
         self.effect = effect
         self.score = score
         self.effect_desc = effect_desc
+        self.category = category
 
     def get_idx(self):
         return self.idx
@@ -83,12 +143,5 @@ class Product:
     def get_effect_desc(self):
         return self.effect_desc
 
-    def check_reqs(self, player: Player) -> bool:
-        player_resources = player.get_resources()
-
-        # Checks that every individual player resources is higher than the individual resource needed.
-        for resource, resource_amount in self.cost.items():
-            if player_resources[resource] < resource_amount:
-                return False
-
-        return True
+    def get_category(self):
+        return self.category
@@ -0,0 +1,349 @@
+from __future__ import annotations
+
+import struct
+import sys
+
+from array import array
+from collections.abc import MutableMapping
+from typing import Iterator
+
+
+# Incremented whenever the binary layout written by GameState.to_bytes() changes.
+STATE_VERSION = 2
+STATE_MAGIC = b"EMPS"
+
+# magic, version, number of players, number of resources, current player, turns taken
+STATE_HEADER = struct.Struct("<4sBHHiI")
+
+
+class GameState:
+    """
+    The whole mutable state of a game, stored in flat integer arrays.
+
+    Players are referred to by their number (their index in the turn order).
+    Player and PlayerList objects are views over one GameState,
+    so copying or restoring it copies or restores the whole game.
+    """
+
+    __slots__ = (
+        "resource_names",
+        "resource_idxs",
+        "positions",
+        "resources",
+        "scores",
+        "actions_per_turn",
+        "actions_left",
+        "income",
+        "curr",
+        "turns_taken",
+    )
+
+    def __init__(self, resource_names: tuple[str, ...]):
+        self.resource_names = tuple(resource_names)
+        self.resource_idxs = {
+            resource_name: resource_idx
+            for resource_idx, resource_name in enumerate(self.resource_names)
+        }
+
+        # Two entries (x, y) per player.
+        self.positions = array("i")
+        # One row of len(resource_names) entries per player.
+        self.resources = array("i")
+        # One entry per player.
+        self.scores = array("i")
+        self.actions_per_turn = array("i")
+        self.actions_left = array("i")
+        # Added at the start of each of a player's turns, from product effects.
+        # One row of (score, *resources) per player.
+        self.income = array("i")
+
+        self.curr = -1  # -1 when there are no players.
+        self.turns_taken = 0
+
+    def get_resource_names(self) -> tuple[str, ...]:
+        return self.resource_names
+
+    def get_num_players(self) -> int:
+        return len(self.scores)
+
+    def get_num_resources(self) -> int:
+        return len(self.resource_names)
+
+    def get_income_len(self) -> int:
+        return 1 + len(self.resource_names)
+
+    def add_player(
+        self, pos: tuple[int, int], actions_per_turn: int = 2
+    ) -> int:
+        # Appends a new player to the end of the turn order.
+        # Returns the new player's number.
+        num = len(self.scores)
+
+        self.positions.extend(pos)
+        self.resources.extend([0] * len(self.resource_names))
+        self.scores.append(0)
+        self.actions_per_turn.append(actions_per_turn)
+        self.actions_left.append(actions_per_turn)
+        self.income.extend([0] * self.get_income_len())
+
+        if self.curr == -1:
+            self.curr = num
+
+        return num
+
+    def clear(self) -> None:
+        # Slice deletion keeps the same array objects, so views stay valid.
+        del self.positions[:]
+        del self.resources[:]
+        del self.scores[:]
+        del self.actions_per_turn[:]
+        del self.actions_left[:]
+        del self.income[:]
+
+        self.curr = -1
+        self.turns_taken = 0
+
+    # ---- Per-player accessors ----
+
+    def get_pos(self, num: int) -> tuple[int, int]:
+        return (self.positions[2 * num], self.positions[2 * num + 1])
+
+    def set_pos(self, num: int, pos: tuple[int, int]) -> None:
+        self.positions[2 * num] = pos[0]
+        self.positions[2 * num + 1] = pos[1]
+
+    def get_resource(self, num: int, resource_name: str) -> int:
+        return self.resources[
+            num * len(self.resource_names) + self.resource_idxs[resource_name]
+        ]
+
+    def change_resource_by(
+        self, num: int, resource_name: str, resource_change: int
+    ) -> None:
+        self.resources[
+            num * len(self.resource_names) + self.resource_idxs[resource_name]
+        ] += resource_change
+
+    def change_actions_per_turn_by(
+        self, num: int, actions_per_turn_change: int
+    ) -> None:
+        self.actions_per_turn[num] += actions_per_turn_change
+
+    def change_score_by(self, num: int, score_change: int) -> None:
+        self.scores[num] += score_change
+
+    def change_income_by(
+        self, num: int, income_idx: int, income_change: int
+    ) -> None:
+        self.income[num * self.get_income_len() + income_idx] += income_change
+
+    def get_resource_row(self, num: int) -> array:
+        start = num * len(self.resource_names)
+
+        return self.resources[start : start + len(self.resource_names)]
+
+    # ---- Turn order ----
+
+    def cycle_curr(self, num_turns: int = 1) -> int:
+        # Moves the turn on, refilling the new current player's actions
+        # and paying them their income.
+        if self.curr == -1:
+            return -1
+
+        income_len = self.get_income_len()
+
+        for _ in range(num_turns):
+            self.turns_taken += 1
+            self.curr = (self.curr + 1) % len(self.scores)
+            self.actions_left[self.curr] = self.actions_per_turn[self.curr]
+
+            income_start = self.curr * income_len
+            if any(self.income[income_start : income_start + income_len]):
+                self.scores[self.curr] += self.income[income_start]
+
+                resources_start = self.curr * (income_len - 1)
+                for resource_idx in range(income_len - 1):
+                    self.resources[resources_start + resource_idx] += self.income[
+                        income_start + 1 + resource_idx
+                    ]
+
+        return self.curr
+
+    # ---- Snapshots ----
+
+    def snapshot(self) -> tuple:
+        """Returns an immutable copy of the state, for restore()."""
+        # Slicing an array copies its buffer in a single memcpy.
+        return (
+            self.positions[:],
+            self.resources[:],
+            self.scores[:],
+            self.actions_per_turn[:],
+            self.actions_left[:],
+            self.income[:],
+            self.curr,
+            self.turns_taken,
+        )
+
+    def restore(self, snapshot: tuple) -> None:
+        """Resets the state, in place, to a value returned by snapshot()."""
+        (
+            self.positions[:],
+            self.resources[:],
+            self.scores[:],
+            self.actions_per_turn[:],
+            self.actions_left[:],
+            self.income[:],
+            self.curr,
+            self.turns_taken,
+        ) = snapshot
+
+    def copy(self) -> GameState:
+        """Returns an independent GameState with the same value."""
+        new = GameState.__new__(GameState)
+        new.resource_names = self.resource_names
+        new.resource_idxs = self.resource_idxs
+        (
+            new.positions,
+            new.resources,
+            new.scores,
+            new.actions_per_turn,
+            new.actions_left,
+            new.income,
+            new.curr,
+            new.turns_taken,
+        ) = self.snapshot()
+
+        return new
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, GameState):
+            return NotImplemented
+
+        return (
+            self.resource_names == other.resource_names
+            and self.snapshot() == other.snapshot()
+        )
+
+    # ---- Serialisation ----
+
+    def to_bytes(self) -> bytes:
+        """Serialises the state to a versioned little-endian binary format."""
+        names = "\0".join(self.resource_names).encode()
+
+        body = [
+            STATE_HEADER.pack(
+                STATE_MAGIC,
+                STATE_VERSION,
+                len(self.scores),
+                len(self.resource_names),
+                self.curr,
+                self.turns_taken,
+            ),
+            struct.pack("<H", len(names)),
+            names,
+        ]
+
+        for field in (
+            self.positions,
+            self.resources,
+            self.scores,
+            self.actions_per_turn,
+            self.actions_left,
+            self.income,
+        ):
+            if sys.byteorder == "big":
+                field = field[:]
+                field.byteswap()
+            body.append(field.tobytes())
+
+        return b"".join(body)
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> GameState:
+        # Raises ValueError for data that isn't exactly one serialised state,
+        # rather than loading part of one.
+        if len(data) < STATE_HEADER.size + 2:
+            raise ValueError("Game state data is too short.")
+
+        magic, version, num_players, num_resources, curr, turns_taken = (
+            STATE_HEADER.unpack_from(data)
+        )
+
+        if magic != STATE_MAGIC:
+            raise ValueError("Data is not a serialised game state.")
+        if version != STATE_VERSION:
+            raise ValueError(
+                f"Unsupported game state version {version} (expected {STATE_VERSION})."
+            )
+
+        offset = STATE_HEADER.size
+        (len_names,) = struct.unpack_from("<H", data, offset)
+        offset += 2
+        if offset + len_names > len(data):
+            raise ValueError("Game state data ends in the resource names.")
+        names = data[offset : offset + len_names].decode()
+        offset += len_names
+
+        state = cls(tuple(names.split("\0")) if names else ())
+
+        if len(state.resource_names) != num_resources:
+            raise ValueError("Resource names do not match the header.")
+
+        for field, length in (
+            (state.positions, 2 * num_players),
+            (state.resources, num_players * num_resources),
+            (state.scores, num_players),
+            (state.actions_per_turn, num_players),
+            (state.actions_left, num_players),
+            (state.income, num_players * (1 + num_resources)),
+        ):
+            size = length * field.itemsize
+            if offset + size > len(data):
+                raise ValueError("Game state data ends before all its fields.")
+            field.frombytes(data[offset : offset + size])
+            if sys.byteorder == "big":
+                field.byteswap()
+            offset += size
+
+        if offset != len(data):
+            raise ValueError(
+                f"Game state data has {len(data) - offset} bytes after its fields."
+            )
+
+        state.curr = curr
+        state.turns_taken = turns_taken
+
+        return state
+
+
+class ResourceView(MutableMapping):
+    """A dict-like view of one player's row of resources in a GameState."""
+
+    __slots__ = ("state", "num")
+
+    def __init__(self, state: GameState, num: int):
+        self.state = state
+        self.num = num
+
+    def __getitem__(self, resource_name: str) -> int:
+        return self.state.get_resource(self.num, resource_name)
+
+    def __setitem__(self, resource_name: str, resource_amount: int) -> None:
+        state = self.state
+        state.resources[
+            self.num * len(state.resource_names)
+            + state.resource_idxs[resource_name]
+        ] = resource_amount
+
+    def __delitem__(self, resource_name: str) -> None:
+        raise TypeError("Resources cannot be removed from a player.")
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.state.resource_names)
+
+    def __len__(self) -> int:
+        return len(self.state.resource_names)
+
+    def __repr__(self) -> str:
+        return repr(dict(self))
@@ -11,22 +11,31 @@ class Tile:
         base_size: tuple[int, int],
         border_size: tuple[int, int],
     ):
-        self.centre_pos = centre_pos
         self.colour = colour
-        self.tile = tile
         self.base_size = base_size
         self.border_size = border_size
 
+        self.size = self.base_size + self.border_size
+
+        self.can_trade = False
+        self.trade = None
+
+        self.set_tile(centre_pos, tile)
+
+    def set_tile(self, centre_pos: tuple[int, int], tile: dict) -> None:
+        # Turns this into a different tile, so boards can reuse tiles from the last board.
+        self.centre_pos = centre_pos
+        self.tile = tile
+
         self.image = tile["sprite"]
         self.type = tile["type"]
         self.icon_image = tile["icon_sprite"]
 
-        self.size = self.base_size + self.border_size
-
         self.rect = self.image.get_rect()
 
-        self.can_trade = False
-        self.trade = None
+    def set_centre_pos(self, centre_pos: tuple[int, int]) -> None:
+        # Moves the tile to another space on the board, as it is.
+        self.centre_pos = centre_pos
 
     def get_can_trade(self) -> bool:
         return self.can_trade
@@ -76,8 +85,16 @@ class TraderTile(Tile):
         )
 
         self.can_trade: bool = True  # Polymorphism
+
+    def set_tile(self, centre_pos: tuple[int, int], tile: dict) -> None:
+        super().set_tile(centre_pos, tile)
+
         self.trade: dict = {
             "type_taken": tile["trade_type"],
-            "amount_taken": 5,
-            "amount_given": 4,
+            "amount_taken": tile["trade_amounts"]["amount_taken"],
+            "amount_given": tile["trade_amounts"]["amount_given"],
         }  # there is no "type_given" as all traders return random resources.
+
+    def set_trade_amounts(self, trade_amounts: dict[str, int]) -> None:
+        self.trade["amount_taken"] = trade_amounts["amount_taken"]
+        self.trade["amount_given"] = trade_amounts["amount_given"]
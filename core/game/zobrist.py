@@ -0,0 +1,252 @@
+from __future__ import annotations
+
+# avoiding circular imports in type hints
+from typing import TYPE_CHECKING, Any
+
+if TYPE_CHECKING:
+    from random import Random
+
+    from .rules import Rules
+    from .state import GameState
+
+
+MASK_64 = (1 << 64) - 1
+
+# Fields of a player which are hashed, used to tell their keys apart.
+FIELD_POS = 0
+FIELD_RESOURCE = 1
+FIELD_SCORE = 2
+FIELD_ACTIONS_LEFT = 3
+FIELD_ACTIONS_PER_TURN = 4
+FIELD_CURR = 5
+FIELD_INCOME = 6
+
+
+def splitmix64(x: int) -> int:
+    """Scrambles an integer into a well-distributed 64-bit integer."""
+    x = (x + 0x9E3779B97F4A7C15) & MASK_64
+    x = ((x ^ (x >> 30)) * 0xBF58476D1CE4E5B9) & MASK_64
+    x = ((x ^ (x >> 27)) * 0x94D049BB133111EB) & MASK_64
+
+    return x ^ (x >> 31)
+
+
+class ZobristHasher:
+    """
+    Hashes game states, so that the same position reached
+    by different orders of actions gets the same hash.
+
+    The hash is the XOR of one random key per (field, player, value),
+    so an action only needs to XOR out the keys of what it changed
+    and XOR in the new ones.
+    Turns taken is not hashed, as it differs between transpositions.
+    """
+
+    def __init__(self, rules: Rules, seed: int = 0):
+        self.rules = rules
+        self.seed = seed
+
+        # Keys are made on first use, so counts and scores have no upper limit.
+        self.keys: dict[tuple[int, int, int, int], int] = {}
+
+        # (field, sub-index) of each value from read_player(), after the position.
+        self.layout = [
+            (FIELD_POS, 0),
+            (FIELD_POS, 1),
+            (FIELD_SCORE, 0),
+            (FIELD_ACTIONS_LEFT, 0),
+            (FIELD_ACTIONS_PER_TURN, 0),
+        ] + [
+            (FIELD_RESOURCE, resource_idx)
+            for resource_idx in range(rules.num_resources)
+        ] + [
+            (FIELD_INCOME, income_idx)
+            for income_idx in range(1 + rules.num_resources)
+        ]
+
+    def get_key(self, field: int, num: int, sub: int, value: int) -> int:
+        key_id = (field, num, sub, value)
+
+        if (key := self.keys.get(key_id)) is None:
+            # The hash of a tuple of ints is the same in every process,
+            # so keys match between the game and any worker.
+            key = self.keys[key_id] = splitmix64(hash(key_id) ^ self.seed)
+
+        return key
+
+    def read_player(self, state: GameState, num: int) -> tuple[int, ...]:
+        # Every hashed value of one player:
+        # (x, y, score, actions left, actions per turn, *resources, *income).
+        start = num * self.rules.num_resources
+        income_start = num * (1 + self.rules.num_resources)
+
+        return (
+            state.positions[2 * num],
+            state.positions[2 * num + 1],
+            state.scores[num],
+            state.actions_left[num],
+            state.actions_per_turn[num],
+            *state.resources[start : start + self.rules.num_resources],
+            *state.income[
+                income_start : income_start + 1 + self.rules.num_resources
+            ],
+        )
+
+    def hash_player(self, values: tuple[int, ...], num: int) -> int:
+        # XOR of the keys for a player's values from read_player().
+        value = self.get_key(FIELD_POS, num, values[0], values[1])
+
+        for value_idx in range(2, len(values)):
+            field, sub = self.layout[value_idx]
+            value ^= self.get_key(field, num, sub, values[value_idx])
+
+        return value
+
+    def rehash_player(
+        self,
+        num: int,
+        old_values: tuple[int, ...],
+        new_values: tuple[int, ...],
+        value: int,
+    ) -> int:
+        # Only XORs the keys of values that have changed.
+        get_key = self.get_key
+
+        if old_values[0] != new_values[0] or old_values[1] != new_values[1]:
+            value ^= get_key(
+                FIELD_POS, num, old_values[0], old_values[1]
+            ) ^ get_key(FIELD_POS, num, new_values[0], new_values[1])
+
+        for value_idx in range(2, len(old_values)):
+            if old_values[value_idx] != new_values[value_idx]:
+                field, sub = self.layout[value_idx]
+                value ^= get_key(
+                    field, num, sub, old_values[value_idx]
+                ) ^ get_key(field, num, sub, new_values[value_idx])
+
+        return value
+
+    def hash_state(self, state: GameState) -> int:
+        """Hashes the whole state from scratch."""
+        value = self.get_key(FIELD_CURR, 0, 0, state.curr)
+
+        for num in range(len(state.scores)):
+            value ^= self.hash_player(self.read_player(state, num), num)
+
+        return value
+
+    def apply(
+        self, state: GameState, action: tuple, rng: Random, value: int
+    ) -> int:
+        """
+        Applies an action with Rules.apply(), and returns the new hash
+        given the hash (value) of the state before it.
+
+        An action only changes the current player and,
+        when the turn ends, the next player, so only their changed values are rehashed.
+        """
+        num = state.curr
+        next_num = (num + 1) % len(state.scores)
+
+        old_values = self.read_player(state, num)
+        old_next_values = self.read_player(state, next_num)
+
+        self.rules.apply(state, action, rng)
+
+        value = self.rehash_player(
+            num, old_values, self.read_player(state, num), value
+        )
+        if next_num != num:
+            value = self.rehash_player(
+                next_num, old_next_values, self.read_player(state, next_num), value
+            )
+        if state.curr != num:
+            value ^= self.get_key(FIELD_CURR, 0, 0, num) ^ self.get_key(
+                FIELD_CURR, 0, 0, state.curr
+            )
+
+        return value
+
+
+class TranspositionTable:
+    """
+    A fixed-size hash table from state hashes to search results.
+
+    Each bucket has two slots:
+    - one kept for the entry with the greatest depth (the most expensive to recompute),
+    - one always replaced by the newest entry.
+    """
+
+    def __init__(self, size_log2: int = 16):
+        self.num_buckets = 1 << size_log2
+        self.mask = self.num_buckets - 1
+
+        # Each slot is None or (hash, depth, entry).
+        self.deep_slots: list[None | tuple[int, int, Any]] = [
+            None
+        ] * self.num_buckets
+        self.new_slots: list[None | tuple[int, int, Any]] = [
+            None
+        ] * self.num_buckets
+
+        self.probes = 0
+        self.hits = 0
+        self.stores = 0
+        self.replacements = 0  # Stores which overwrote a different position.
+
+    def get(self, value: int) -> Any:
+        # Returns the stored entry for the hash, or None.
+        self.probes += 1
+        bucket = value & self.mask
+
+        for slot in (self.deep_slots[bucket], self.new_slots[bucket]):
+            if slot is not None and slot[0] == value:
+                self.hits += 1
+                return slot[2]
+
+        return None
+
+    def put(self, value: int, entry: Any, depth: int = 0) -> None:
+        self.stores += 1
+        bucket = value & self.mask
+        deep_slot = self.deep_slots[bucket]
+
+        if deep_slot is None or deep_slot[0] == value or depth >= deep_slot[1]:
+            # The old deep entry moves to the always-replace slot.
+            if deep_slot is not None and deep_slot[0] != value:
+                self.demote(bucket, deep_slot)
+
+            self.deep_slots[bucket] = (value, depth, entry)
+        else:
+            self.demote(bucket, (value, depth, entry))
+
+    def demote(self, bucket: int, slot: tuple[int, int, Any]) -> None:
+        new_slot = self.new_slots[bucket]
+
+        if new_slot is not None and new_slot[0] != slot[0]:
+            self.replacements += 1
+
+        self.new_slots[bucket] = slot
+
+    def clear(self) -> None:
+        self.deep_slots = [None] * self.num_buckets
+        self.new_slots = [None] * self.num_buckets
+
+        self.probes = 0
+        self.hits = 0
+        self.stores = 0
+        self.replacements = 0
+
+    def get_stats(self) -> dict[str, float]:
+        filled = sum(slot is not None for slot in self.deep_slots) + sum(
+            slot is not None for slot in self.new_slots
+        )
+
+        return {
+            "probes": self.probes,
+            "hits": self.hits,
+            "hit_rate": self.hits / self.probes if self.probes else 0.0,
+            "stores": self.stores,
+            "replacements": self.replacements,
+            "fill": filled / (2 * self.num_buckets),
+        }
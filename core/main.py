@@ -1,12 +1,26 @@
+from __future__ import annotations
+
+# avoiding circular imports in type hints
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from .net.client import NetClient
+    from .net.peer import LockstepPeer
+    from .game.match_log import MatchLog
+
 import pygame
 import pygame.freetype
+import random
 import sys
 
 from random import choice, randrange
 
+from .game.autosave import Autosaver
 from .game.board import Board
 from .game.player import Player, PlayerList
-from .game.shop import Shop, Product
+from .game.game_data import load_game_data
+from .game.leaderboard import Leaderboard
+from .game.shop import Shop
 
 from .ui.asset_loader import load_assets
 from .ui.background import Background
@@ -16,7 +30,18 @@ from .scene_manager import SceneManager
 
 
 class Main:
-    def __init__(self):
+    def __init__(
+        self,
+        net_client: None | NetClient = None,
+        lockstep_peer: None | LockstepPeer = None,
+        record_dir: None | str = None,
+        match_log: None | MatchLog = None,
+        leaderboard_path: None | str = None,
+        autosave_path: None | str = None,
+        fps: int = 60,
+        board_events: bool = False,
+        fog_radius: None | int = None,
+    ):
         (
             self.background,
             self.sprite_sheet_products,
@@ -42,6 +67,28 @@ class Main:
         self.tile_border_size = (8, 8)
         self.tile_size = (80, 80)
 
+        # Tiles, trading stations and products are loaded from a data file.
+        self.game_data_file_path = "./core/game_data.json"
+        self.tiles, self.trade, self.products = load_game_data(
+            self.game_data_file_path,
+            self.sprite_sheet_products,
+            tuple(self.sprite_sheet_resources.get_names()),
+        )
+
+        # The board is generated from a seed, so a recorded match can generate it again.
+        if net_client is not None:
+            # The server's board is generated from this seed, so this one matches it.
+            self.board_seed = net_client.get_seed()
+        elif lockstep_peer is not None:
+            # Every peer generates the same board from the host's seed.
+            self.board_seed = lockstep_peer.get_seed()
+        elif match_log is not None:
+            self.board_seed = match_log.get_seed()
+            self.board_dims = match_log.get_dims()
+        else:
+            self.board_seed = random.randrange(2**32)
+        random.seed(self.board_seed)
+
         self.board = Board(
             dims=self.board_dims,
             line_colour=self.colours["white"],
@@ -51,19 +98,8 @@ class Main:
             window_size=self.window_size,
             sprite_sheet=self.sprite_sheet_tiles,
             icon_sprite_sheet=self.sprite_sheet_resources,
-            tiles={
-                "planet_carbon": 3,
-                "planet_helium": 3,
-                "planet_ice": 3,
-                "planet_ore": 3,
-                "planet_uranium": 3,
-                "asteroid": 2,
-                "asteroid_small": 2,
-                "trader_A": 1,
-                "trader_B": 1,
-                "trader_C": 1,
-                "empty": float("inf"),
-            },
+            tiles=self.tiles,
+            trade=self.trade,
         )
 
         self.window = pygame.display.set_mode(self.window_size)
@@ -75,36 +111,7 @@ class Main:
             self.sprite_sheet_resources,
             "./assets/images/tiny-spaceships",
         )
-        self.shop = Shop(
-            products=[
-                Product(
-                    idx="1",
-                    name="Engine Upgrade 1",
-                    icon_image=self.sprite_sheet_products.get_sprite_from_name(
-                        "excavator"
-                    ),
-                    cost={"helium": 2, "ore": 2, "ice": 1},
-                    effect=lambda: self.players.get_curr().change_actions_per_turn_by(
-                        1
-                    ),
-                    score=1,
-                    effect_desc="+1 score, +1 action per turn.",
-                ),
-                Product(
-                    idx="2",
-                    name="Engine Upgrade 2",
-                    icon_image=self.sprite_sheet_products.get_sprite_from_name(
-                        "bucket"
-                    ),
-                    cost={"helium": 3, "ore": 3, "uranium": 2},
-                    effect=lambda: self.players.get_curr().change_actions_per_turn_by(
-                        2
-                    ),
-                    score=1,
-                    effect_desc="+2 score, +2 actions per turn.",
-                ),
-            ]
-        )
+        self.shop = Shop(products=self.products)
 
         self.scene_manager = SceneManager(
             window=self.window,
@@ -119,7 +126,25 @@ class Main:
             font_bold=self.font_bold,
             colours=self.colours,
             text_colour=self.text_colour,
+            game_data_file_path=self.game_data_file_path,
+            sprite_sheet_products=self.sprite_sheet_products,
+            net_client=net_client,
+            lockstep_peer=lockstep_peer,
+            board_seed=self.board_seed,
+            record_dir=record_dir,
+            match_log=match_log,
+            leaderboard=(
+                None if leaderboard_path is None else Leaderboard(leaderboard_path)
+            ),
+            autosaver=None if autosave_path is None else Autosaver(autosave_path),
+            fps=fps,
+            board_events=board_events,
+            fog_radius=fog_radius,
         )
+        if lockstep_peer is not None:
+            self.scene_manager.start_lockstep_game()
+        elif match_log is not None:
+            self.scene_manager.start_replay()
 
     def start_game(self) -> None:
         pygame.init()
@@ -0,0 +1,125 @@
+from __future__ import annotations
+
+import queue
+import socket
+import threading
+
+from .protocol import (
+    MSG_DELTA,
+    MSG_ERROR,
+    MSG_ROSTER,
+    MSG_STATE,
+    MSG_WELCOME,
+    SPECTATOR,
+    STATE,
+    WELCOME,
+    ProtocolError,
+    decode_roster,
+    encode_action,
+    encode_join,
+    encode_spectate,
+    recv_message,
+)
+
+
+class NetClient:
+    """
+    The game's connection to a GameServer.
+
+    Joining blocks until the server welcomes the player, as the board's seed
+    is needed before the board is generated.
+    After that, messages are received on a background thread and queued,
+    so the pygame loop only ever polls for them, as with MCTSWorker.
+    """
+
+    def __init__(self, host: str, port: int):
+        self.sock = socket.create_connection((host, port))
+        # Actions are tiny, so are sent straight away rather than batched.
+        self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+        self.session_id = 0
+        self.num = -1  # This player's number in the session.
+        self.num_players = 0
+        self.seed = 0
+
+        self.messages: queue.Queue = queue.Queue()
+        self.connected = True
+
+        self.thread = threading.Thread(
+            target=self.run, name="NetClient", daemon=True
+        )
+
+    def get_num(self) -> int:
+        return self.num
+
+    def get_seed(self) -> int:
+        return self.seed
+
+    def get_connected(self) -> bool:
+        return self.connected
+
+    def get_is_spectator(self) -> bool:
+        return self.num == SPECTATOR
+
+    def join(self, session_id: int, num_players: int, name: str) -> None:
+        # Raises ProtocolError if the server refuses.
+        self.sock.sendall(encode_join(session_id, num_players, name))
+        self.await_welcome()
+
+    def spectate(self, session_id: int) -> None:
+        # Watches a session without playing in it.
+        self.sock.sendall(encode_spectate(session_id))
+        self.await_welcome()
+
+    def await_welcome(self) -> None:
+        message_type, payload = recv_message(self.sock)
+
+        if message_type == MSG_ERROR:
+            raise ProtocolError(payload.decode())
+        if message_type != MSG_WELCOME:
+            raise ProtocolError(f"Expected a welcome, not message type {message_type}.")
+
+        self.session_id, self.num, self.num_players, self.seed = WELCOME.unpack(
+            payload
+        )
+
+        self.thread.start()
+
+    def send_action(self, action: tuple) -> None:
+        if self.connected and not self.get_is_spectator():
+            self.sock.sendall(encode_action(action))
+
+    def run(self) -> None:
+        # Queues ("roster", names), ("state", seq, state bytes), ("delta", payload)
+        # and ("error", message).
+        try:
+            while True:
+                message_type, payload = recv_message(self.sock)
+
+                if message_type == MSG_STATE:
+                    (seq,) = STATE.unpack_from(payload)
+                    self.messages.put(("state", seq, payload[STATE.size :]))
+                elif message_type == MSG_DELTA:
+                    self.messages.put(("delta", payload))
+                elif message_type == MSG_ROSTER:
+                    self.messages.put(("roster", decode_roster(payload)))
+                elif message_type == MSG_ERROR:
+                    self.messages.put(("error", payload.decode()))
+        except OSError:
+            pass
+        finally:
+            self.connected = False
+            self.messages.put(("error", "Disconnected from the server."))
+
+    def poll(self) -> list[tuple]:
+        # Returns every message received since the last poll, without blocking.
+        messages = []
+
+        while True:
+            try:
+                messages.append(self.messages.get_nowait())
+            except queue.Empty:
+                return messages
+
+    def close(self) -> None:
+        self.sock.close()
@@ -0,0 +1,265 @@
+from __future__ import annotations
+
+# avoiding circular imports in type hints
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from .server import GameServer
+
+import asyncio
+import random
+import statistics
+import time
+import tracemalloc
+
+from ..game.state import GameState
+
+from .protocol import (
+    FRAME_HEADER,
+    MSG_DELTA,
+    MSG_ERROR,
+    MSG_STATE,
+    MSG_WELCOME,
+    STATE,
+    WELCOME,
+    encode_action,
+    encode_join,
+    encode_spectate,
+    read_message,
+)
+from .sync import StateReceiver
+
+
+def measure_session_memory(
+    server: GameServer, num_sessions: int = 1000, num_players: int = 2
+) -> float:
+    """
+    Returns the bytes allocated per session, for sessions of num_players
+    players without connections, as measured by tracemalloc.
+    Each board's Rules are made first, so they aren't counted, as they're shared.
+    """
+    for seed in range(server.num_boards):
+        server.get_rules(seed)
+
+    tracemalloc.start()
+    start_size = tracemalloc.get_traced_memory()[0]
+
+    sessions = []
+    for _ in range(num_sessions):
+        session = server.create_session(num_players)
+        for player_num in range(num_players):
+            session.add_player(f"Player {player_num + 1}", None)
+        sessions.append(session)
+
+    size = tracemalloc.get_traced_memory()[0] - start_size
+    tracemalloc.stop()
+
+    for session in sessions:
+        del server.sessions[session.session_id]
+
+    return size / num_sessions
+
+
+def receive_state(
+    receiver: StateReceiver, message_type: int, payload: bytes
+) -> bool:
+    # Returns whether the message changed the receiver's state.
+    if message_type == MSG_STATE:
+        (seq,) = STATE.unpack_from(payload)
+        return receiver.apply_keyframe(seq, payload[STATE.size :])
+    elif message_type == MSG_DELTA:
+        return receiver.apply_delta(payload)
+
+    return False
+
+
+async def play_client(
+    server: GameServer,
+    host: str,
+    port: int,
+    num_players: int,
+    num_turns: int,
+    round_trips: list[float],
+    session_ids: set[int],
+    errors: list[str],
+    started: asyncio.Event,
+) -> None:
+    # Joins an open session, then (once started) plays random legal actions on its turns
+    # until the game is won or has lasted num_turns turns,
+    # timing each action from being sent until the server's reply arrives.
+    reader, writer = await asyncio.open_connection(host, port)
+    writer.write(encode_join(0, num_players, "Bot"))
+
+    message_type, payload = await read_message(reader)
+    assert message_type == MSG_WELCOME
+    session_id, num, _, seed = WELCOME.unpack(payload)
+    session_ids.add(session_id)
+
+    # Legal actions are picked with the server's own rules for the board.
+    rules = server.get_rules(seed)
+    rng = random.Random(num)
+    sent_time = None
+
+    state = GameState(rules.resource_names)
+    receiver = StateReceiver(state)
+
+    await started.wait()
+
+    try:
+        while True:
+            message_type, payload = await read_message(reader)
+
+            if sent_time is not None and message_type in (
+                MSG_STATE,
+                MSG_DELTA,
+                MSG_ERROR,
+            ):
+                round_trips.append(time.perf_counter() - sent_time)
+                sent_time = None
+
+            if message_type == MSG_ERROR:
+                # The server refusing an action means this client's state is wrong.
+                errors.append(payload.decode())
+            if not receive_state(receiver, message_type, payload):
+                continue
+
+            if state.turns_taken >= num_turns or rules.get_winner(state) != -1:
+                break
+
+            if state.curr == num and state.get_num_players() == num_players:
+                sent_time = time.perf_counter()
+                writer.write(
+                    encode_action(rng.choice(rules.get_legal_actions(state)))
+                )
+    finally:
+        writer.close()
+
+
+async def watch_client(
+    server: GameServer,
+    host: str,
+    port: int,
+    session_id: int,
+    num_turns: int,
+    bytes_received: list[int],
+    joined: list[bool],
+) -> None:
+    # Spectates a session until it ends, as in play_client(), counting every byte received.
+    reader, writer = await asyncio.open_connection(host, port)
+    writer.write(encode_spectate(session_id))
+
+    message_type, payload = await read_message(reader)
+    joined.append(message_type == MSG_WELCOME)
+    if message_type != MSG_WELCOME:
+        writer.close()
+        return
+
+    _, _, _, seed = WELCOME.unpack(payload)
+    rules = server.get_rules(seed)
+    state = GameState(rules.resource_names)
+    receiver = StateReceiver(state)
+    num_bytes = FRAME_HEADER.size + len(payload)
+
+    try:
+        while True:
+            message_type, payload = await read_message(reader)
+            num_bytes += FRAME_HEADER.size + len(payload)
+
+            if receive_state(receiver, message_type, payload) and (
+                state.turns_taken >= num_turns or rules.get_winner(state) != -1
+            ):
+                break
+    except asyncio.IncompleteReadError:
+        # The players left, ending the session.
+        pass
+    finally:
+        bytes_received.append(num_bytes)
+        writer.close()
+
+
+async def run_load_test(
+    server: GameServer,
+    num_sessions: int = 500,
+    num_players: int = 2,
+    num_turns: int = 50,
+    spectators_per_session: int = 0,
+    host: str = "127.0.0.1",
+) -> dict[str, float | int]:
+    """
+    Starts the server on a free port on localhost, then plays num_sessions
+    sessions at once, each lasting up to num_turns turns,
+    with spectators joining every session after its players, but before its first action.
+    Returns round-trip times seen by the clients, in microseconds,
+    and bytes received per spectator, with the server's own stats.
+    """
+    await server.start(host, 0)
+    port = server.server.sockets[0].getsockname()[1]
+
+    round_trips: list[float] = []
+    session_ids: set[int] = set()
+    errors: list[str] = []
+    bytes_received: list[int] = []
+    joined: list[bool] = []
+    started = asyncio.Event()
+    start = time.perf_counter()
+
+    players = [
+        asyncio.create_task(
+            play_client(
+                server,
+                host,
+                port,
+                num_players,
+                num_turns,
+                round_trips,
+                session_ids,
+                errors,
+                started,
+            )
+        )
+        for _ in range(num_sessions * num_players)
+    ]
+
+    # Spectators join late, so start from a snapshot.
+    while len(session_ids) < num_sessions:
+        await asyncio.sleep(0.01)
+
+    spectators = [
+        asyncio.create_task(
+            watch_client(
+                server, host, port, session_id, num_turns, bytes_received, joined
+            )
+        )
+        for session_id in session_ids
+        for _ in range(spectators_per_session)
+    ]
+
+    while len(joined) < len(spectators):
+        await asyncio.sleep(0.01)
+    started.set()
+
+    await asyncio.gather(*players, *spectators)
+
+    elapsed = time.perf_counter() - start
+    server.server.close()
+    await server.server.wait_closed()
+
+    round_trips.sort()
+
+    return {
+        "clients": num_sessions * num_players,
+        "actions": len(round_trips),
+        "actions_per_sec": len(round_trips) / elapsed,
+        "round_trip_median_us": statistics.median(round_trips) * 1e6,
+        "round_trip_p99_us": round_trips[int(0.99 * (len(round_trips) - 1))] * 1e6,
+        "errors": len(errors),
+        "spectators": len(bytes_received),
+        "bytes_per_spectator": (
+            statistics.fmean(bytes_received) if bytes_received else 0.0
+        ),
+        **{
+            f"server_{name}": value
+            for name, value in server.get_stats().items()
+            if name.endswith("_us") or name == "bytes_sent"
+        },
+    }
@@ -0,0 +1,158 @@
+from __future__ import annotations
+
+# avoiding circular imports in type hints
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from random import Random
+
+    from ..game.rules import Rules
+    from ..game.state import GameState
+
+import time
+
+from collections import deque
+
+
+class LockstepSession:
+    """
+    Simulates a game in lockstep with other peers, from inputs alone.
+
+    Every frame is a tick, and each peer sends its inputs for every tick
+    (usually none). Inputs are the actions from Rules, and are only applied
+    if they're legal for the player whose turn it is, with randomness
+    from one RNG stream seeded the same on every peer, so every peer
+    computes the same game.
+
+    Local inputs are applied straight away, and remote ones are predicted to be none.
+    When a remote input arrives for a tick already simulated, the game is
+    rolled back to that tick and the ticks since are simulated again.
+    Only ticks with inputs are snapshotted, and as the game is turn-based,
+    most ticks have none, so a rollback resimulates a handful of actions
+    however many ticks it spans.
+    """
+
+    def __init__(
+        self,
+        rules: Rules,
+        state: GameState,
+        rng: Random,
+        num_peers: int,
+        local_peer: int,
+        max_rollback: int = 120,
+    ):
+        self.rules = rules
+        self.state = state
+        self.rng = rng  # Must be seeded, and used, the same on every peer.
+        self.num_peers = num_peers
+        self.local_peer = local_peer  # Each peer controls the player with its number.
+        # Ticks this peer can run ahead of the slowest peer's last inputs.
+        self.max_rollback = max_rollback
+
+        self.tick = 0  # The next tick to simulate.
+
+        # Ticks with any inputs, each with a list of actions per peer.
+        self.inputs: dict[int, list[list[tuple]]] = {}
+        # The latest tick each peer's inputs are known up to.
+        self.confirmed = [-1] * num_peers
+        # (state snapshot, RNG state) from before each tick with inputs was simulated.
+        self.snapshots: dict[int, tuple] = {}
+
+        # Seconds taken by each of the latest rollbacks, and how many ticks they resimulated.
+        self.rollback_times: deque[float] = deque(maxlen=600)
+        self.num_rollbacks = 0
+        self.num_resimulated = 0
+
+    def get_tick(self) -> int:
+        return self.tick
+
+    def get_local_peer(self) -> int:
+        return self.local_peer
+
+    def get_confirmed_tick(self) -> int:
+        # Every tick up to this one has every peer's inputs, so can't change.
+        return min(self.confirmed)
+
+    def get_can_advance(self) -> bool:
+        # Stalls once too far ahead of a peer, as older snapshots are gone.
+        return self.tick - self.get_confirmed_tick() <= self.max_rollback
+
+    def add_inputs(self, peer: int, tick: int, actions: list[tuple]) -> None:
+        if actions:
+            self.inputs.setdefault(tick, [[] for _ in range(self.num_peers)])[
+                peer
+            ] = list(actions)
+
+    def advance(self, local_actions: list[tuple]) -> None:
+        # Simulates the next tick, with this peer's inputs for it.
+        self.add_inputs(self.local_peer, self.tick, local_actions)
+        self.simulate(self.tick)
+
+        self.confirmed[self.local_peer] = self.tick
+        self.tick += 1
+
+        self.discard_confirmed()
+
+    def add_remote_inputs(self, peer: int, tick: int, actions: list[tuple]) -> None:
+        # Each peer's ticks arrive in order, so every earlier tick of theirs is known.
+        self.confirmed[peer] = tick
+        self.add_inputs(peer, tick, actions)
+
+        if actions and tick < self.tick:
+            self.rollback(tick)
+
+    def simulate(self, tick: int) -> None:
+        if (tick_inputs := self.inputs.get(tick)) is None:
+            return
+
+        state = self.state
+        self.snapshots[tick] = (state.snapshot(), self.rng.getstate())
+
+        # Peers' inputs are applied in peer order, the same on every peer.
+        for peer, actions in enumerate(tick_inputs):
+            for action in actions:
+                if state.curr == peer and action in self.rules.get_legal_actions(
+                    state
+                ):
+                    self.rules.apply(state, action, self.rng)
+
+    def rollback(self, tick: int) -> None:
+        """
+        Restores the game to how it was before tick, then simulates every tick since.
+
+        The state at the start of tick is the snapshot of the first tick at or after it
+        with inputs, as nothing changed in between. Without one, nothing has changed since.
+        """
+        start = time.perf_counter()
+
+        later_ticks = [
+            snapshot_tick for snapshot_tick in self.snapshots if snapshot_tick >= tick
+        ]
+
+        if later_ticks:
+            snapshot, rng_state = self.snapshots[min(later_ticks)]
+            self.state.restore(snapshot)
+            self.rng.setstate(rng_state)
+
+            for snapshot_tick in later_ticks:
+                del self.snapshots[snapshot_tick]
+
+        resimulated = sorted(
+            input_tick for input_tick in self.inputs if tick <= input_tick < self.tick
+        )
+        for input_tick in resimulated:
+            self.simulate(input_tick)
+
+        self.rollback_times.append(time.perf_counter() - start)
+        self.num_rollbacks += 1
+        self.num_resimulated += len(resimulated)
+
+    def discard_confirmed(self) -> None:
+        # Inputs only ever arrive after a peer's confirmed tick,
+        # so nothing up to the slowest peer's can be rolled back to.
+        confirmed_tick = self.get_confirmed_tick()
+
+        for old_tick in [tick for tick in self.snapshots if tick <= confirmed_tick]:
+            del self.snapshots[old_tick]
+        for old_tick in [tick for tick in self.inputs if tick <= confirmed_tick]:
+            del self.inputs[old_tick]
@@ -0,0 +1,159 @@
+from __future__ import annotations
+
+import queue
+import random
+import socket
+import threading
+
+from .protocol import (
+    MSG_ERROR,
+    MSG_HELLO,
+    MSG_INPUTS,
+    MSG_START,
+    ProtocolError,
+    decode_inputs,
+    decode_start,
+    encode_inputs,
+    encode_start,
+    pack_message,
+    recv_message,
+)
+
+
+class LockstepPeer:
+    """
+    The connections between lockstep peers.
+
+    One peer hosts: the others connect to it, and it forwards each one's
+    inputs to the rest, without changing them or simulating anything itself
+    beyond its own game. With two peers, that's a direct connection.
+
+    Starting blocks until every peer has joined, as the seed is needed
+    before the board is generated. After that, inputs are received on
+    background threads and queued, as in NetClient.
+    """
+
+    def __init__(self):
+        self.socks: list[socket.socket] = []
+        # Sends to a socket can come from the pygame loop or a forwarding thread.
+        self.send_locks: list[threading.Lock] = []
+
+        self.seed = 0
+        self.num = 0  # This peer's number, and its player's.
+        self.names: list[str] = []
+
+        self.inputs: queue.Queue = queue.Queue()
+        self.connected = True
+
+    def get_seed(self) -> int:
+        return self.seed
+
+    def get_num(self) -> int:
+        return self.num
+
+    def get_names(self) -> list[str]:
+        return self.names
+
+    def get_connected(self) -> bool:
+        return self.connected
+
+    def add_sock(self, sock: socket.socket) -> None:
+        # Inputs are tiny and late ones cause rollbacks, so are sent straight away.
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+        self.socks.append(sock)
+        self.send_locks.append(threading.Lock())
+
+    def host(self, port: int, num_peers: int, name: str) -> None:
+        # Waits for num_peers - 1 peers to connect, then starts everyone's game.
+        with socket.create_server(("", port)) as server_sock:
+            self.names = [name]
+
+            while len(self.names) < num_peers:
+                sock, _ = server_sock.accept()
+                message_type, payload = recv_message(sock)
+
+                if message_type != MSG_HELLO:
+                    sock.close()
+                    continue
+
+                self.add_sock(sock)
+                self.names.append(payload.decode())
+
+        self.seed = random.randrange(2**32)
+
+        for sock_idx, sock in enumerate(self.socks):
+            sock.sendall(encode_start(self.seed, sock_idx + 1, self.names))
+
+        self.start_threads()
+
+    def join(self, host: str, port: int, name: str) -> None:
+        # Raises ProtocolError if the host refuses.
+        sock = socket.create_connection((host, port))
+        self.add_sock(sock)
+        sock.sendall(pack_message(MSG_HELLO, name.encode()))
+
+        message_type, payload = recv_message(sock)
+
+        if message_type == MSG_ERROR:
+            raise ProtocolError(payload.decode())
+        if message_type != MSG_START:
+            raise ProtocolError(f"Expected to start, not message type {message_type}.")
+
+        self.seed, self.num, self.names = decode_start(payload)
+
+        self.start_threads()
+
+    def start_threads(self) -> None:
+        for sock_idx in range(len(self.socks)):
+            threading.Thread(
+                target=self.run, args=(sock_idx,), name="LockstepPeer", daemon=True
+            ).start()
+
+    def send(self, sock_idx: int, message: bytes) -> None:
+        with self.send_locks[sock_idx]:
+            self.socks[sock_idx].sendall(message)
+
+    def send_inputs(self, tick: int, actions: list[tuple]) -> None:
+        # Sent every tick, even without actions, so other peers know the tick is confirmed.
+        message = encode_inputs(self.num, tick, actions)
+
+        try:
+            for sock_idx in range(len(self.socks)):
+                self.send(sock_idx, message)
+        except OSError:
+            self.connected = False
+
+    def run(self, sock_idx: int) -> None:
+        # Queues (peer, tick, actions) for every input message received.
+        try:
+            while True:
+                message_type, payload = recv_message(self.socks[sock_idx])
+
+                if message_type != MSG_INPUTS:
+                    continue
+
+                self.inputs.put(decode_inputs(payload))
+
+                # The host forwards every joiner's inputs to the other joiners.
+                for other_idx in range(len(self.socks)):
+                    if other_idx != sock_idx:
+                        self.send(
+                            other_idx, pack_message(MSG_INPUTS, payload)
+                        )
+        except OSError:
+            self.connected = False
+
+    def poll(self) -> list[tuple[int, int, list[tuple]]]:
+        # Returns every peer's inputs received since the last poll, without blocking.
+        inputs = []
+
+        while True:
+            try:
+                inputs.append(self.inputs.get_nowait())
+            except queue.Empty:
+                return inputs
+
+    def close(self) -> None:
+        for sock in self.socks:
+            sock.close()
@@ -0,0 +1,222 @@
+from __future__ import annotations
+
+import asyncio
+import struct
+
+from ..game.batch import BUY, END, MOVE, TRADE
+
+
+# Every message is a header, then a payload of the length in the header.
+# payload length, message type
+FRAME_HEADER = struct.Struct("<HB")
+MAX_PAYLOAD_SIZE = 0xFFFF
+
+# ---- Message types ----
+
+# Client to server.
+MSG_JOIN = 1
+MSG_ACTION = 2
+MSG_SPECTATE = 3
+# Server to client.
+MSG_WELCOME = 16
+MSG_ROSTER = 17
+MSG_STATE = 18
+MSG_ERROR = 19
+MSG_DELTA = 20
+# Between lockstep peers.
+MSG_HELLO = 32
+MSG_START = 33
+MSG_INPUTS = 34
+
+# ---- Payloads ----
+
+# session id (0 for any open session), number of players wanted, then the name in UTF-8
+JOIN = struct.Struct("<IB")
+# session id to watch
+SPECTATE = struct.Struct("<I")
+# session id, the joining player's number (SPECTATOR when watching), number of players, board seed
+WELCOME = struct.Struct("<IBBI")
+SPECTATOR = 0xFF
+# action type, then two arguments: (x, y) for moves, (product index, 0) for buys
+ACTION = struct.Struct("<BBB")
+# sequence number of the state, then the state as from GameState.to_bytes()
+STATE = struct.Struct("<I")
+# seed, number of peers, the receiving peer's number, then every peer's name, separated by NUL
+START = struct.Struct("<IBB")
+# peer, tick, number of actions, then an ACTION for each
+INPUTS = struct.Struct("<BIB")
+# DELTA is the changes since the previous state (see sync.py).
+# HELLO is the joining peer's name in UTF-8.
+# ROSTER is every player's name in UTF-8, separated by NUL, and ERROR is a UTF-8 message.
+
+# Action types as in BatchSimulator, so both use the same codes.
+ACTION_TYPES = {"move": MOVE, "trade": TRADE, "buy": BUY, "end": END}
+
+
+class ProtocolError(Exception):
+    # Raised for a message that doesn't follow the protocol.
+    pass
+
+
+def pack_message(message_type: int, payload: bytes = b"") -> bytes:
+    if len(payload) > MAX_PAYLOAD_SIZE:
+        raise ProtocolError(f"Payload of {len(payload)} bytes is too long.")
+
+    return FRAME_HEADER.pack(len(payload), message_type) + payload
+
+
+async def read_message(reader: asyncio.StreamReader) -> tuple[int, bytes]:
+    # Raises asyncio.IncompleteReadError once the connection closes.
+    payload_size, message_type = FRAME_HEADER.unpack(
+        await reader.readexactly(FRAME_HEADER.size)
+    )
+
+    return message_type, await reader.readexactly(payload_size)
+
+
+def recv_exactly(sock, size: int) -> bytes:
+    # The blocking socket equivalent of StreamReader.readexactly(), for the client.
+    data = bytearray()
+
+    while len(data) < size:
+        chunk = sock.recv(size - len(data))
+        if not chunk:
+            raise ConnectionError("Connection closed by the server.")
+        data += chunk
+
+    return bytes(data)
+
+
+def recv_message(sock) -> tuple[int, bytes]:
+    payload_size, message_type = FRAME_HEADER.unpack(
+        recv_exactly(sock, FRAME_HEADER.size)
+    )
+
+    return message_type, recv_exactly(sock, payload_size)
+
+
+# ---- Actions ----
+
+
+def pack_action(action: tuple) -> bytes:
+    # Actions are the tuples used by Rules, such as ("move", (x, y)).
+    action_type = action[0]
+
+    if action_type == "move":
+        args = action[1]
+    elif action_type == "buy":
+        args = (action[1], 0)
+    else:
+        args = (0, 0)
+
+    return ACTION.pack(ACTION_TYPES[action_type], *args)
+
+
+def unpack_action(action_type: int, arg_a: int, arg_b: int) -> tuple:
+    if action_type == MOVE:
+        return ("move", (arg_a, arg_b))
+    elif action_type == TRADE:
+        return ("trade",)
+    elif action_type == BUY:
+        return ("buy", arg_a)
+    elif action_type == END:
+        return ("end",)
+
+    raise ProtocolError(f"Unknown action type {action_type}.")
+
+
+def encode_action(action: tuple) -> bytes:
+    return pack_message(MSG_ACTION, pack_action(action))
+
+
+def decode_action(payload: bytes) -> tuple:
+    try:
+        values = ACTION.unpack(payload)
+    except struct.error:
+        raise ProtocolError("Action is the wrong size.") from None
+
+    return unpack_action(*values)
+
+
+# ---- Other messages ----
+
+
+def encode_join(session_id: int, num_players: int, name: str) -> bytes:
+    return pack_message(
+        MSG_JOIN, JOIN.pack(session_id, num_players) + name.encode()
+    )
+
+
+def decode_join(payload: bytes) -> tuple[int, int, str]:
+    try:
+        session_id, num_players = JOIN.unpack_from(payload)
+        name = payload[JOIN.size :].decode()
+    except (struct.error, UnicodeDecodeError):
+        raise ProtocolError("Join is malformed.") from None
+
+    return session_id, num_players, name
+
+
+def encode_spectate(session_id: int) -> bytes:
+    return pack_message(MSG_SPECTATE, SPECTATE.pack(session_id))
+
+
+def decode_spectate(payload: bytes) -> int:
+    try:
+        (session_id,) = SPECTATE.unpack(payload)
+    except struct.error:
+        raise ProtocolError("Spectate is the wrong size.") from None
+
+    return session_id
+
+
+def encode_roster(names: list[str]) -> bytes:
+    return pack_message(MSG_ROSTER, "\0".join(names).encode())
+
+
+def decode_roster(payload: bytes) -> list[str]:
+    return payload.decode().split("\0") if payload else []
+
+
+def encode_state(seq: int, state_bytes: bytes) -> bytes:
+    return pack_message(MSG_STATE, STATE.pack(seq) + state_bytes)
+
+
+def encode_error(message: str) -> bytes:
+    return pack_message(MSG_ERROR, message.encode())
+
+
+def encode_start(seed: int, num: int, names: list[str]) -> bytes:
+    return pack_message(
+        MSG_START, START.pack(seed, len(names), num) + "\0".join(names).encode()
+    )
+
+
+def decode_start(payload: bytes) -> tuple[int, int, list[str]]:
+    # Returns the seed, the receiving peer's number and every peer's name.
+    seed, _, num = START.unpack_from(payload)
+
+    return seed, num, payload[START.size :].decode().split("\0")
+
+
+def encode_inputs(peer: int, tick: int, actions: list[tuple]) -> bytes:
+    return pack_message(
+        MSG_INPUTS,
+        INPUTS.pack(peer, tick, len(actions))
+        + b"".join(pack_action(action) for action in actions),
+    )
+
+
+def decode_inputs(payload: bytes) -> tuple[int, int, list[tuple]]:
+    peer, tick, num_actions = INPUTS.unpack_from(payload)
+
+    return (
+        peer,
+        tick,
+        [
+            unpack_action(*values)
+            for values in ACTION.iter_unpack(
+                payload[INPUTS.size : INPUTS.size + num_actions * ACTION.size]
+            )
+        ],
+    )
@@ -0,0 +1,482 @@
+from __future__ import annotations
+
+import asyncio
+import random
+import statistics
+import sys
+import time
+
+from collections import deque
+
+from ..game.board import Board
+from ..game.game_data import load_game_data
+from ..game.rules import END_ACTION, Rules
+from ..game.shop import Shop
+from ..game.state import GameState
+from ..ui.asset_loader import load_assets
+
+from .protocol import (
+    MSG_ACTION,
+    MSG_JOIN,
+    MSG_SPECTATE,
+    MSG_WELCOME,
+    SPECTATOR,
+    WELCOME,
+    ProtocolError,
+    decode_action,
+    decode_join,
+    decode_spectate,
+    encode_error,
+    encode_roster,
+    pack_message,
+    read_message,
+)
+from .sync import StateSync
+
+
+# As in Main, so boards generated from the same seed match the clients'.
+BOARD_DIMS = (6, 6)
+TILE_BASE_SIZE = (72, 72)
+TILE_BORDER_SIZE = (8, 8)
+WINDOW_SIZE = (1024, 640)
+
+MAX_PLAYERS = 5
+
+# Spectators further behind than this many unsent bytes are disconnected,
+# rather than the server buffering for them without limit.
+MAX_SPECTATOR_BUFFER_SIZE = 256 * 1024
+
+
+class BroadcastStats:
+    # Shared by every session, for GameServer.get_stats().
+
+    __slots__ = ("encode_times", "fan_out_times", "bytes_sent")
+
+    def __init__(self, capacity: int = 10000):
+        # Seconds taken to encode each state, and to send each batch of messages to every watcher.
+        self.encode_times: deque[float] = deque(maxlen=capacity)
+        self.fan_out_times: deque[float] = deque(maxlen=capacity)
+        self.bytes_sent = 0
+
+
+class Session:
+    """
+    One match, played on the server.
+
+    The state is only ever changed here, by Rules.apply(), after checking
+    the action is legal for the player who sent it.
+    Every change is sent to every connected player and spectator, as a delta
+    or keyframe from StateSync. Messages are queued, then sent together
+    once the event loop is free, with one write per watcher.
+    """
+
+    __slots__ = (
+        "session_id",
+        "num_players",
+        "seed",
+        "rules",
+        "state",
+        "rng",
+        "names",
+        "writers",
+        "spectators",
+        "sync",
+        "pending",
+        "stats",
+    )
+
+    def __init__(
+        self,
+        session_id: int,
+        num_players: int,
+        seed: int,
+        rules: Rules,
+        keyframe_interval: int = 64,
+        stats: None | BroadcastStats = None,
+    ):
+        self.session_id = session_id
+        self.num_players = num_players
+        self.seed = seed  # The board's seed.
+        self.rules = rules  # Shared by every session on the same board.
+
+        self.state = GameState(rules.resource_names)
+        self.rng = random.Random()
+
+        self.names: list[str] = []
+        # One per player, or None once they disconnect.
+        self.writers: list[None | asyncio.StreamWriter] = []
+        self.spectators: list[asyncio.StreamWriter] = []
+
+        self.sync = StateSync(keyframe_interval)
+        self.pending: list[bytes] = []  # Messages waiting to be sent.
+        self.stats = stats or BroadcastStats()
+
+    def get_is_full(self) -> bool:
+        return len(self.names) >= self.num_players
+
+    def get_is_over(self) -> bool:
+        return self.rules.get_winner(self.state) != -1
+
+    def get_num_connected(self) -> int:
+        return sum(writer is not None for writer in self.writers)
+
+    def add_player(self, name: str, writer: None | asyncio.StreamWriter) -> int:
+        # Players start on a random non-empty tile, as in PlayerList.add().
+        num = self.state.add_player(self.rng.choice(tuple(self.rules.graph)))
+
+        self.names.append(name)
+        self.writers.append(writer)
+
+        return num
+
+    def remove_writer(self, num: int) -> None:
+        # The player's ship stays in the game, but their turns are skipped,
+        # so the others can carry on.
+        self.writers[num] = None
+
+        if self.skip_disconnected():
+            self.broadcast_state()
+
+    def skip_disconnected(self) -> bool:
+        """
+        Ends the turns of players who have disconnected, once the session's full,
+        until it's a connected player's turn (or nobody's connected).
+        Returns whether any turn was ended, so the new state needs sending.
+        """
+        skipped = False
+
+        while (
+            self.get_is_full()
+            and not self.get_is_over()
+            and self.writers[self.state.curr] is None
+            and self.get_num_connected() > 0
+        ):
+            self.rules.apply(self.state, END_ACTION, self.rng)
+            skipped = True
+
+        return skipped
+
+    def add_spectator(self, writer: asyncio.StreamWriter) -> None:
+        # Late joiners get the current state, then every delta after it.
+        writer.write(encode_roster(self.names))
+        writer.write(self.sync.encode_keyframe(self.state))
+
+        self.spectators.append(writer)
+
+    def remove_spectator(self, writer: asyncio.StreamWriter) -> None:
+        if writer in self.spectators:
+            self.spectators.remove(writer)
+
+    def broadcast(self, message: bytes) -> None:
+        self.pending.append(message)
+
+        if len(self.pending) == 1:
+            asyncio.get_running_loop().call_soon(self.flush)
+
+    def broadcast_state(self) -> None:
+        start = time.perf_counter()
+        self.broadcast(self.sync.encode(self.state))
+        self.stats.encode_times.append(time.perf_counter() - start)
+
+    def flush(self) -> None:
+        # Sends every pending message, joined, to every player and spectator.
+        start = time.perf_counter()
+        data = b"".join(self.pending)
+        self.pending.clear()
+        num_sent = 0
+
+        for writer in self.writers:
+            if writer is not None:
+                writer.write(data)
+                num_sent += 1
+
+        for writer in self.spectators:
+            if writer.transport.get_write_buffer_size() > MAX_SPECTATOR_BUFFER_SIZE:
+                writer.close()
+            else:
+                writer.write(data)
+                num_sent += 1
+
+        self.stats.fan_out_times.append(time.perf_counter() - start)
+        self.stats.bytes_sent += num_sent * len(data)
+
+    def close_spectators(self) -> None:
+        for writer in self.spectators:
+            writer.close()
+        self.spectators.clear()
+
+    def apply(self, num: int, action: tuple) -> None | str:
+        # Returns why the action was refused, or None once it's been applied.
+        if not self.get_is_full():
+            return "Waiting for players."
+        if self.get_is_over():
+            return "The game is over."
+        if self.state.curr != num:
+            return "It's not your turn."
+        if action not in self.rules.get_legal_actions(self.state):
+            return "That action isn't allowed."
+
+        self.rules.apply(self.state, action, self.rng)
+        self.skip_disconnected()
+        self.broadcast_state()
+
+        return None
+
+
+class GameServer:
+    """
+    Hosts any number of sessions over TCP, on one asyncio event loop.
+
+    Boards are generated from a small set of seeds, and each seed's Rules
+    are shared by every session on it, so a session is only its GameState,
+    names and connections.
+    Clients regenerate the same board from the seed in the welcome message.
+    """
+
+    def __init__(
+        self,
+        game_data_file_path: str = "./core/game_data.json",
+        num_boards: int = 16,
+        winning_score: int = 5,
+        keyframe_interval: int = 64,
+    ):
+        # Only the sprite sheets' names are used, but boards are made of tiles with sprites.
+        (
+            _,
+            sprite_sheet_products,
+            self.sprite_sheet_resources,
+            self.sprite_sheet_tiles,
+            *_,
+        ) = load_assets()
+
+        self.tiles, self.trade, products = load_game_data(
+            game_data_file_path,
+            sprite_sheet_products,
+            tuple(self.sprite_sheet_resources.get_names()),
+        )
+        self.shop = Shop(products=products)
+
+        self.num_boards = num_boards
+        self.winning_score = winning_score
+        self.keyframe_interval = keyframe_interval
+        self.rules_by_seed: dict[int, Rules] = {}
+        # Picks boards for new sessions. Separate, as boards are generated by reseeding the random module.
+        self.rng = random.Random()
+
+        self.sessions: dict[int, Session] = {}
+        # The session waiting for more players, for each number of players.
+        self.open_sessions: dict[int, int] = {}
+        self.next_session_id = 1
+
+        # Seconds taken to handle each of the latest actions.
+        self.action_times: deque[float] = deque(maxlen=10000)
+        self.num_actions = 0
+        self.broadcast_stats = BroadcastStats()
+
+        self.server: None | asyncio.Server = None
+
+    def get_rules(self, seed: int) -> Rules:
+        if (rules := self.rules_by_seed.get(seed)) is None:
+            # Board generation uses the random module, so is seeded through it.
+            random.seed(seed)
+            board = Board(
+                dims=BOARD_DIMS,
+                line_colour=(255, 255, 255),
+                tile_colour=(116, 117, 114),
+                tile_base_size=TILE_BASE_SIZE,
+                tile_border_size=TILE_BORDER_SIZE,
+                window_size=WINDOW_SIZE,
+                sprite_sheet=self.sprite_sheet_tiles,
+                icon_sprite_sheet=self.sprite_sheet_resources,
+                tiles=self.tiles,
+                trade=self.trade,
+            )
+            rules = self.rules_by_seed[seed] = Rules(
+                board, self.shop, self.winning_score
+            )
+
+        return rules
+
+    def create_session(self, num_players: int) -> Session:
+        session_id = self.next_session_id
+        self.next_session_id += 1
+
+        seed = self.rng.randrange(self.num_boards)
+        session = self.sessions[session_id] = Session(
+            session_id,
+            num_players,
+            seed,
+            self.get_rules(seed),
+            self.keyframe_interval,
+            self.broadcast_stats,
+        )
+
+        return session
+
+    def join(self, session_id: int, num_players: int) -> Session:
+        # Session id 0 joins the open session for that many players, or starts one.
+        if session_id == 0:
+            if not 1 <= num_players <= MAX_PLAYERS:
+                raise ProtocolError(f"Games are for 1 to {MAX_PLAYERS} players.")
+
+            if (open_id := self.open_sessions.get(num_players)) is not None:
+                session = self.sessions[open_id]
+            else:
+                session = self.create_session(num_players)
+                self.open_sessions[num_players] = session.session_id
+        else:
+            session = self.sessions.get(session_id)
+
+            if session is None:
+                raise ProtocolError(f"No session {session_id}.")
+            if session.get_is_full():
+                raise ProtocolError(f"Session {session_id} is full.")
+
+        return session
+
+    def close_seat(self, session: Session, num: int) -> None:
+        session.remove_writer(num)
+
+        if session.get_num_connected() == 0:
+            session.close_spectators()
+            del self.sessions[session.session_id]
+
+            if self.open_sessions.get(session.num_players) == session.session_id:
+                del self.open_sessions[session.num_players]
+
+    async def handle_client(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        session = None
+        num = -1
+
+        try:
+            message_type, payload = await read_message(reader)
+
+            if message_type == MSG_SPECTATE:
+                session = self.sessions.get(decode_spectate(payload))
+                if session is None:
+                    raise ProtocolError("No such session.")
+
+                await self.watch(session, reader, writer)
+                return
+            elif message_type != MSG_JOIN:
+                raise ProtocolError("Expected to join a session first.")
+
+            session_id, num_players, name = decode_join(payload)
+            session = self.join(session_id, num_players)
+            num = session.add_player(name, writer)
+
+            if session.get_is_full():
+                self.open_sessions.pop(session.num_players, None)
+                # Anyone who left while it was filling has their turns skipped from the start.
+                session.skip_disconnected()
+
+            writer.write(
+                pack_message(
+                    MSG_WELCOME,
+                    WELCOME.pack(
+                        session.session_id, num, session.num_players, session.seed
+                    ),
+                )
+            )
+            session.broadcast(encode_roster(session.names))
+            session.broadcast_state()
+            await writer.drain()
+
+            while True:
+                message_type, payload = await read_message(reader)
+                if message_type != MSG_ACTION:
+                    raise ProtocolError(f"Unexpected message type {message_type}.")
+
+                start = time.perf_counter()
+
+                if error := session.apply(num, decode_action(payload)):
+                    writer.write(encode_error(error))
+
+                self.action_times.append(time.perf_counter() - start)
+                self.num_actions += 1
+
+                # Waits while the client is slow to read, so its buffer can't grow without limit.
+                await writer.drain()
+        except ProtocolError as e:
+            writer.write(encode_error(str(e)))
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            if session is not None and num != -1:
+                self.close_seat(session, num)
+
+            writer.close()
+
+    async def watch(
+        self,
+        session: Session,
+        reader: asyncio.StreamReader,
+        writer: asyncio.StreamWriter,
+    ) -> None:
+        # Spectators only receive, until they disconnect.
+        writer.write(
+            pack_message(
+                MSG_WELCOME,
+                WELCOME.pack(
+                    session.session_id, SPECTATOR, session.num_players, session.seed
+                ),
+            )
+        )
+        session.add_spectator(writer)
+
+        try:
+            message_type, _ = await read_message(reader)
+            raise ProtocolError(f"Spectators can't send message type {message_type}.")
+        finally:
+            session.remove_spectator(writer)
+
+    def get_stats(self) -> dict[str, float | int]:
+        # Action times are in seconds, stats in microseconds.
+        stats = {
+            "sessions": len(self.sessions),
+            "players": sum(
+                session.get_num_connected() for session in self.sessions.values()
+            ),
+            "spectators": sum(
+                len(session.spectators) for session in self.sessions.values()
+            ),
+            "actions": self.num_actions,
+            "bytes_sent": self.broadcast_stats.bytes_sent,
+        }
+
+        for name, times in (
+            ("action", self.action_times),
+            ("encode", self.broadcast_stats.encode_times),
+            ("fan_out", self.broadcast_stats.fan_out_times),
+        ):
+            times = sorted(times)
+            stats[f"{name}_median_us"] = statistics.median(times) * 1e6 if times else 0.0
+            stats[f"{name}_p99_us"] = (
+                times[int(0.99 * (len(times) - 1))] * 1e6 if times else 0.0
+            )
+
+        return stats
+
+    async def start(self, host: str = "127.0.0.1", port: int = 7777) -> None:
+        self.server = await asyncio.start_server(self.handle_client, host, port)
+
+    async def print_stats(self, interval: float) -> None:
+        while True:
+            await asyncio.sleep(interval)
+            print(
+                ", ".join(f"{name}: {value:.0f}" for name, value in self.get_stats().items()),
+                file=sys.stderr,
+            )
+
+    async def serve_forever(
+        self, host: str = "127.0.0.1", port: int = 7777, stats_interval: float = 0
+    ) -> None:
+        await self.start(host, port)
+
+        if stats_interval:
+            asyncio.create_task(self.print_stats(stats_interval))
+
+        async with self.server:
+            await self.server.serve_forever()
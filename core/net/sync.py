@@ -0,0 +1,145 @@
+from __future__ import annotations
+
+import struct
+
+from array import array
+
+from ..game.state import GameState
+
+from .protocol import MSG_DELTA, encode_state, pack_message
+
+
+# sequence number, current player, turns taken, number of changes
+DELTA = struct.Struct("<IhIH")
+# field (index into get_fields()), index in the field, change in value
+CHANGE = struct.Struct("<BHi")
+
+
+def get_fields(state: GameState) -> tuple[array, ...]:
+    # In the same order as the start of GameState.snapshot().
+    return (
+        state.positions,
+        state.resources,
+        state.scores,
+        state.actions_per_turn,
+        state.actions_left,
+        state.income,
+    )
+
+
+def encode_delta(seq: int, old_snapshot: tuple, state: GameState) -> None | bytes:
+    """
+    Returns every value that changed since old_snapshot, as its change,
+    or None if the number of players changed (which needs a keyframe).
+    A move is typically three changes (x or y, actions left and a resource).
+    """
+    changes = []
+
+    for field_idx, (old_field, field) in enumerate(
+        zip(old_snapshot, get_fields(state))
+    ):
+        if len(old_field) != len(field):
+            return None
+
+        # Most fields don't change, and comparing whole arrays is done in C.
+        if old_field == field:
+            continue
+
+        for idx, (old_value, value) in enumerate(zip(old_field, field)):
+            if old_value != value:
+                changes.append(CHANGE.pack(field_idx, idx, value - old_value))
+
+    return DELTA.pack(seq, state.curr, state.turns_taken, len(changes)) + b"".join(
+        changes
+    )
+
+
+class StateSync:
+    """
+    Turns each new state of a session into one message for every watcher:
+    a keyframe (the whole state) every keyframe_interval states,
+    or when the players change, and otherwise a delta from the last state.
+
+    Each message is encoded once, however many players and spectators it's sent to.
+    """
+
+    __slots__ = ("keyframe_interval", "seq", "keyframe_seq", "snapshot")
+
+    def __init__(self, keyframe_interval: int = 64):
+        self.keyframe_interval = keyframe_interval
+
+        self.seq = 0  # Sequence number of the last state encoded.
+        self.keyframe_seq = 0
+        self.snapshot: None | tuple = None
+
+    def encode(self, state: GameState) -> bytes:
+        self.seq += 1
+        message = None
+
+        if (
+            self.snapshot is not None
+            and self.seq - self.keyframe_seq < self.keyframe_interval
+        ):
+            if (delta := encode_delta(self.seq, self.snapshot, state)) is not None:
+                message = pack_message(MSG_DELTA, delta)
+
+        if message is None:
+            message = encode_state(self.seq, state.to_bytes())
+            self.keyframe_seq = self.seq
+
+        self.snapshot = state.snapshot()
+
+        return message
+
+    def encode_keyframe(self, state: GameState) -> bytes:
+        # The current state, for a late joiner to apply the following deltas to.
+        return encode_state(self.seq, state.to_bytes())
+
+
+class StateReceiver:
+    """
+    Keeps a GameState in step with a server's keyframes and deltas, in place,
+    so any views over the state stay valid.
+
+    Deltas are ignored until the first keyframe, and any already included
+    in a keyframe (sent before a late joiner's snapshot) are skipped.
+    """
+
+    def __init__(self, state: GameState):
+        self.state = state
+        self.seq = -1  # -1 until the first keyframe.
+
+    def get_seq(self) -> int:
+        return self.seq
+
+    def apply_keyframe(self, seq: int, state_bytes: bytes) -> bool:
+        # Returns whether the keyframe was applied.
+        if seq < self.seq:
+            return False
+
+        self.state.restore(GameState.from_bytes(state_bytes).snapshot())
+        self.seq = seq
+
+        return True
+
+    def apply_delta(self, payload: bytes) -> bool:
+        # Returns whether the delta was applied.
+        seq, curr, turns_taken, num_changes = DELTA.unpack_from(payload)
+
+        if self.seq == -1 or seq <= self.seq:
+            return False
+        if seq != self.seq + 1:
+            raise ValueError(f"Delta {seq} doesn't follow state {self.seq}.")
+
+        fields = get_fields(self.state)
+
+        for field_idx, idx, change in CHANGE.iter_unpack(
+            payload[DELTA.size : DELTA.size + num_changes * CHANGE.size]
+        ):
+            fields[field_idx][idx] += change
+
+        self.state.curr = curr
+        self.state.turns_taken = turns_taken
+        self.seq = seq
+
+        return True
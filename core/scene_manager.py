@@ -4,7 +4,10 @@ from __future__ import annotations
 from typing import TYPE_CHECKING
 
 if TYPE_CHECKING:
-    from .player import PlayerList
+    from .game.player import Player, PlayerList
+    from .game.state import GameState
+
+    from array import array
 
     from ..game.board import Board
     from ..game.background import Background
@@ -12,15 +15,39 @@ if TYPE_CHECKING:
 
     from ..ui.actions import UIActions
     from ..ui.background import Background
+    from ..ui.sprite_sheet import SpriteSheet
     from ..ui.text import UIText
 
+    from .net.client import NetClient
+    from .net.peer import LockstepPeer
+    from .game.autosave import Autosaver
+    from .game.leaderboard import Leaderboard
+    from .game.match_log import MatchLog
+
 import pygame
 import random
+import struct
 import sys
+import time
+
+from .game.ai import MCTSBot, MCTSWorker
+from .game.autosave import load_save
+from .game.board_events import BoardEvents
+from .game.fog import FogOfWar
+from .game.game_data import GameDataWatcher, load_game_data
+from .game.helper import gen_colour
+from .game.match_log import match_recorder
+from .game.rules import END_ACTION, TRADE_ACTION, Rules
 
-from .game.helper import gen_colour, merge_sort
+from .net.lockstep import LockstepSession
+from .net.sync import StateReceiver
 
 from .ui.actions import UIActions
+from .ui.input_router import GLOBAL_SCENE, NUMBER_KEYS, InputRouter
+from .ui.profiler import FrameProfiler
+
+from .tracing import tracer
+from .ui.shop import UIShop
 from .ui.text import UIText
 
 
@@ -39,6 +66,18 @@ class SceneManager:
         font_bold: pygame.freetype.Font,
         colours: dict[str, tuple[int, int, int]],
         text_colour: tuple[int, int, int],
+        game_data_file_path: str,
+        sprite_sheet_products: SpriteSheet,
+        net_client: None | NetClient = None,
+        lockstep_peer: None | LockstepPeer = None,
+        board_seed: int = 0,
+        record_dir: None | str = None,
+        match_log: None | MatchLog = None,
+        leaderboard: None | Leaderboard = None,
+        autosaver: None | Autosaver = None,
+        fps: int = 60,
+        board_events: bool = False,
+        fog_radius: None | int = None,
     ):
         self.window = window
         self.window_size = window_size
@@ -53,19 +92,61 @@ class SceneManager:
         self.font_bold = font_bold
         self.colours = colours
         self.text_colour = text_colour
+        self.sprite_sheet_products = sprite_sheet_products
+        # When connected to a server, actions are sent to it, and the game shows its state.
+        self.net_client = net_client
+        if net_client is not None:
+            self.state_receiver = StateReceiver(self.players.get_state())
+        # When playing peer-to-peer, only inputs are exchanged, and every peer simulates the game.
+        self.lockstep_peer = lockstep_peer
+        self.lockstep: None | LockstepSession = None
+        self.lockstep_inputs: list[tuple] = []  # This peer's inputs for the next tick.
+
+        # Each local match is recorded to a new file in record_dir, if given.
+        self.board_seed = board_seed
+        # Every game after the first is played on a new board, generated when it starts.
+        self.board_played = False
+        self.record_dir = record_dir
+        self.num_recorded = 0
+        # When replaying, the turn shown and how many turns a second are played.
+        self.match_log = match_log
+        self.replay_turn = 0
+        self.replay_speed = 0
+        self.replay_progress = 0.0
+        # Finished matches are saved to it, and shown from the title and end scenes (L).
+        self.leaderboard = leaderboard
+        self.leaderboard_return_scene = "title"
+        # Local games are saved every few seconds while they change, and resumed from the title (R).
+        self.autosaver = autosaver
+        self.autosave_time = 0.0
+        self.autosaved_state: None | GameState = None
+        # Boards of local games can change as they're played (planets run out,
+        # asteroids drift and trading stations move), if enabled.
+        # Online, peer-to-peer and recorded games only share actions, so never change.
+        self.board_events_enabled = board_events
+        self.board_events: None | BoardEvents = None
+        # In local games, each player can only see within fog_radius moves
+        # of where they've been, if it's given. The view shown is of the player
+        # whose turn it is, if it's taken on this computer, or else the last one's.
+        self.fog_radius = fog_radius
+        self.fog: None | FogOfWar = None
+        self.fog_num = -1
+
+        # Reloads the game data whenever its file is saved.
+        self.game_data_watcher = GameDataWatcher(game_data_file_path)
 
         self.actions = [
             [
                 {
                     "name": "Help",
-                    "func": lambda: self.set_scene("help"),
+                    "func": lambda: self.push_scene("help"),
                 },
                 {
                     "name": "Trade",
-                    "func": lambda: self.players.get_curr().trade(),
+                    "func": lambda: self.take_action(TRADE_ACTION),
                 },
-                {"name": "Shop", "func": lambda: self.set_scene("shop")},
-                {"name": "End", "func": lambda: self.players.cycle_curr()},
+                {"name": "Shop", "func": lambda: self.push_scene("shop")},
+                {"name": "End", "func": lambda: self.take_action(END_ACTION)},
             ],
         ]
 
@@ -83,6 +164,40 @@ class SceneManager:
             text_colour=self.colours["dark_purple"],
             background_colour=self.colours["white"],
         )
+        self.ui_shop = UIShop(
+            shop=self.shop,
+            players=self.players,
+            font=self.font,
+            font_size=self.font_size,
+            pos=(60, 120),
+            row_spacing=2.5 * self.font_size,
+            page_size=9,
+            text_colour=self.text_colour,
+            dim_text_colour=self.colours["grey"],
+        )
+        # Number keys buy the product on that visible row.
+        self.shop_row_keys = {
+            pygame.K_1 + row: row for row in range(self.ui_shop.page_size)
+        }
+        self.shop_scroll_keys = {
+            pygame.K_UP: -1,
+            pygame.K_DOWN: 1,
+            pygame.K_PAGEUP: -self.ui_shop.page_size,
+            pygame.K_PAGEDOWN: self.ui_shop.page_size,
+        }
+        self.replay_seek_keys = {
+            pygame.K_LEFT: -1,
+            pygame.K_RIGHT: 1,
+            pygame.K_PAGEUP: -10,
+            pygame.K_PAGEDOWN: 10,
+        }
+        # Times each stage of the frame, while its HUD is shown (F3).
+        self.profiler = FrameProfiler(
+            font=self.font,
+            font_size=self.font_size,
+            text_colour=self.text_colour,
+            background_colour=self.colours["dark_purple"],
+        )
         self.ui_text = UIText(
             board=self.board,
             players=self.players,
@@ -91,13 +206,27 @@ class SceneManager:
             font_size=self.font_size,
             font_bold_size=self.font_size * 2,
             text_colour=self.text_colour,
+            profiler=self.profiler,
         )
 
         self.running = True
-        self.scene_name = "title"
+
+        # Overlays (help, shop and pause) are pushed over the scene they were opened from,
+        # which is frozen into self.backdrop while they're open.
+        self.scene_stack = ["title"]
+        self.scene_name = "title"  # Always the top of the stack.
+        self.overlay_scenes = ("help", "pause", "shop")
+        self.backdrop: None | pygame.Surface = None
+
+        # Frames of scenes that only change when something happens, rendered once.
+        # Keyed by scene name and everything that scene's frame depends on.
+        self.frame_cache: dict[tuple, pygame.Surface] = {}
+        self.frame_key: None | tuple = None  # Key of the frame on the window.
         self.status = ""
         self.status_desc = ""
         self.winner = ""
+        self.winner_num = -1
+        self.winner_name = ""
 
         with open("./core/tutorial.txt") as f:
             self.help_text = f.read().splitlines()
@@ -130,32 +259,419 @@ class SceneManager:
             "Zephyr",
         ]
 
+        # Computer-controlled players search on a background thread.
+        self.rules = Rules(self.board, self.shop)
+        self.ai_time_budget = 0.5  # Seconds of search per action, at normal speed.
+        self.ai_worker = MCTSWorker(
+            MCTSBot(self.rules), time_budget=self.ai_time_budget
+        )
+        self.num_bots = 0  # Number of computer players added to the next game.
+        self.max_bots = 4
+
+        self.input_router = InputRouter(lambda: self.scene_name)
+        self.bind_inputs()
+
+        # Frames drawn a second, at most (0 for no limit, as fast as the display allows).
+        self.fps = fps
+        # Game logic runs in fixed ticks, however often frames are drawn,
+        # and frames show ships between where they were at the last two ticks.
+        self.tick_rate = 60
+        self.tick_time = 1 / self.tick_rate
+        # Frames slower than this only catch up this much, rather than spiralling.
+        self.max_frame_time = 0.25
+        self.tick_accumulator = 0.0
+        self.tick_alpha = 0.0  # How far the frame is between the last tick and the next.
+        self.last_frame_time = time.perf_counter()
+        self.base_ship_move_time = 0.2  # Seconds for a ship to move along one edge.
+        self.ship_move_time = self.base_ship_move_time
+
+        # Games between computer players can be watched sped up (T),
+        # playing many actions a tick and only drawing some of the states.
+        self.spectate_speeds = (1, 10, 100)
+        self.speed = 1
+        self.turbo_logic_time = 0.04
+        self.turbo_fps = 20
+        self.turbo_scores: None | array = None
+        self.turbo_render_time = 0.0
+        self.speed_texts: dict[int, tuple[pygame.Surface, pygame.Rect]] = {}
+
         self.clock = pygame.time.Clock()
 
-    def set_scene(self, new_scene) -> None:
+    def set_scene(self, new_scene: str) -> None:
+        # Replaces every scene on the stack, closing any overlays.
+        tracer.instant("set_scene", "scene", old=self.scene_name, new=new_scene)
+        self.scene_stack = [new_scene]
         self.scene_name = new_scene
+        self.backdrop = None
+
+    def push_scene(self, new_scene: str) -> None:
+        # Opens an overlay over the current scene, which is frozen as it is.
+        if new_scene == "shop":
+            # Prices and resources may have changed since the shop was last open.
+            self.ui_shop.refresh()
+
+        self.freeze_backdrop()
+
+        tracer.instant("push_scene", "scene", old=self.scene_name, new=new_scene)
+        self.scene_stack.append(new_scene)
+        self.scene_name = new_scene
+
+    def pop_scene(self) -> None:
+        # Closes the top overlay, returning to the scene underneath.
+        old_scene = self.scene_stack.pop()
+        self.scene_name = self.scene_stack[-1]
+        tracer.instant("pop_scene", "scene", old=old_scene, new=self.scene_name)
+
+        if self.scene_name not in self.overlay_scenes:
+            self.backdrop = None
+
+    def freeze_backdrop(self) -> None:
+        # Renders the game once, dimmed, for overlays to be drawn over.
+        # Called again when something shown in it changes, like a purchase.
+        backdrop_start = tracer.get_ts()
+        self.backdrop = self.new_frame()
+
+        curr_player = self.players.get_curr()
+        self.render_game_to(
+            self.backdrop, (-1, -1), (None, None), curr_player
+        )
+
+        dimmer = pygame.Surface(self.backdrop.get_size(), pygame.SRCALPHA)
+        dimmer.fill((*self.colours["dark_purple"], 215))
+        self.backdrop.blit(dimmer, (0, 0))
+        tracer.complete("freeze_backdrop", "scene", backdrop_start)
+
+        # Composited overlays drawn over the old backdrop are out of date.
+        for key in [key for key in self.frame_cache if key[0] in self.overlay_scenes]:
+            del self.frame_cache[key]
+        self.frame_key = None
+
+    def new_frame(self, backdrop: None | pygame.Surface = None) -> pygame.Surface:
+        # A window-sized surface in the window's format, starting as the background
+        # (the background image itself is paletted, so can't be drawn onto).
+        frame = pygame.Surface(self.window_size).convert(self.window)
+
+        if backdrop is None:
+            frame.blit(self.background.image, self.background.rect)
+        else:
+            frame.blit(backdrop, (0, 0))
+
+        return frame
+
+    def blit_cached_frame(self, key: tuple, render_frame_to) -> None:
+        """
+        Blits the frame for key, rendering it with render_frame_to(surface)
+        the first time it's needed. Skipped if that frame is already on the window.
+        """
+        if key == self.frame_key:
+            return
+
+        if (frame := self.frame_cache.get(key)) is None:
+            frame = self.frame_cache[key] = self.new_frame(
+                self.backdrop if key[0] in self.overlay_scenes else None
+            )
+            render_frame_to(frame)
+
+        self.window.blit(frame, (0, 0))
+        self.frame_key = key
+
+    def bind_inputs(self) -> None:
+        # Every scene's key and mouse bindings, in one place.
+        router = self.input_router
+        stop = lambda event: self.stop()
+        pop = lambda event: self.pop_scene()
+
+        router.bind(GLOBAL_SCENE, pygame.QUIT, None, stop)
+        router.bind(GLOBAL_SCENE, pygame.KEYDOWN, pygame.K_ESCAPE, stop)
+        router.bind(
+            GLOBAL_SCENE,
+            pygame.KEYDOWN,
+            pygame.K_F3,
+            lambda event: self.profiler.toggle(),
+        )
+        router.bind(
+            GLOBAL_SCENE,
+            pygame.KEYDOWN,
+            pygame.K_F4,
+            lambda event: self.export_profile(),
+        )
+
+        for scene_name in ("title", "end"):
+            router.bind(
+                scene_name,
+                pygame.KEYDOWN,
+                pygame.K_a,
+                lambda event: self.cycle_num_bots(),
+            )
+            router.bind(
+                scene_name,
+                pygame.KEYDOWN,
+                pygame.K_l,
+                lambda event: self.open_leaderboard(),
+            )
+
+            # Number keys from one to five start a new game with that many players.
+            for key, number in NUMBER_KEYS.items():
+                if 1 <= number <= 5:
+                    router.bind(
+                        scene_name,
+                        pygame.KEYDOWN,
+                        key,
+                        lambda event, number=number: self.new_game(number),
+                    )
+
+            # Zero starts a game between computer players only, to watch.
+            router.bind(
+                scene_name,
+                pygame.KEYDOWN,
+                pygame.K_0,
+                lambda event: self.spectate_game(),
+            )
+
+        router.bind(
+            "title",
+            pygame.KEYDOWN,
+            pygame.K_r,
+            lambda event: self.resume_game(),
+        )
+
+        router.bind(
+            "game",
+            pygame.KEYDOWN,
+            pygame.K_t,
+            lambda event: self.cycle_speed(),
+        )
+
+        router.bind(
+            "game",
+            pygame.KEYDOWN,
+            pygame.K_p,
+            lambda event: self.push_scene("pause"),
+        )
+        router.bind("game", pygame.MOUSEBUTTONDOWN, None, self.click_game)
+
+        router.bind_keys(
+            "replay",
+            {
+                key: lambda event, turns=turns: self.seek_replay(
+                    self.replay_turn + turns
+                )
+                for key, turns in self.replay_seek_keys.items()
+            },
+        )
+        router.bind_keys(
+            "replay",
+            {
+                pygame.K_HOME: lambda event: self.seek_replay(0),
+                pygame.K_END: lambda event: self.seek_replay(
+                    self.match_log.get_num_turns()
+                ),
+                pygame.K_SPACE: lambda event: self.set_replay_speed(2),
+                pygame.K_f: lambda event: self.set_replay_speed(1000),
+            },
+        )
+
+        # Return to game when scene clicked.
+        router.bind("help", pygame.MOUSEBUTTONDOWN, None, pop)
+
+        # Return to the title or end scene when any other key is pressed or the scene clicked.
+        close_leaderboard = lambda event: self.set_scene(self.leaderboard_return_scene)
+        router.bind("leaderboard", pygame.KEYDOWN, None, close_leaderboard)
+        router.bind("leaderboard", pygame.MOUSEBUTTONDOWN, None, close_leaderboard)
+
+        # Return to game when any other key is pressed or the scene clicked.
+        router.bind("pause", pygame.KEYDOWN, None, pop)
+        router.bind("pause", pygame.MOUSEBUTTONDOWN, None, pop)
+
+        router.bind_keys(
+            "shop",
+            {
+                pygame.K_c: lambda event: self.ui_shop.cycle_category(),
+                pygame.K_f: lambda event: self.ui_shop.toggle_affordable_only(),
+                pygame.K_s: lambda event: self.ui_shop.cycle_sort(),
+            },
+        )
+        router.bind_keys(
+            "shop",
+            {
+                key: lambda event, rows=rows: self.ui_shop.scroll_by(rows)
+                for key, rows in self.shop_scroll_keys.items()
+            },
+        )
+        router.bind_keys(
+            "shop",
+            {
+                key: lambda event, row=row: self.buy_from_row(row)
+                for key, row in self.shop_row_keys.items()
+            },
+        )
+        router.bind(
+            "shop",
+            pygame.MOUSEWHEEL,
+            None,
+            lambda event: self.ui_shop.scroll_by(-event.y),
+        )
+        # Return to game when scene clicked.
+        # (Buttons 4 and 5 are the scroll wheel.)
+        for button in (1, 2, 3):
+            router.bind("shop", pygame.MOUSEBUTTONDOWN, button, pop)
+
+    def export_profile(self) -> None:
+        # Saves the profiler's buffered frames, named by the time they were saved.
+        file_path = f"./profile_{time.strftime('%Y%m%d_%H%M%S')}.csv"
+        self.profiler.export_csv(file_path)
+        print(f"Frame profile saved to {file_path}")
+
+    def stop(self) -> None:
+        # Stop game flow when designated key pressed or the window closed.
+        self.running = False
 
     def handle_actions(self) -> None:
+        self.input_router.install()
+
         while self.running:
-            self.window.blit(self.background.image, self.background.rect)
+            self.run_frame(self.fps)
+
+        if self.autosaver is not None:
+            # Saves the game as it was left, then waits for it to be written.
+            self.autosave(force=True)
+            self.autosaver.close()
+
+        if self.leaderboard is not None:
+            # Waits for any matches still being written.
+            self.leaderboard.close()
+
+        # Quit game once game flow stopped.
+        pygame.display.quit()
+        pygame.quit()
+        sys.exit()
+
+    def run_frame(self, fps: int = 60) -> None:
+        """
+        Handles input, runs however many fixed ticks of game logic are due,
+        then renders and shows one frame of the current scene.
+        An fps of 0 doesn't limit the frame rate (used by the benchmarks).
+        """
+        self.profiler.start_frame()
+        frame_start = tracer.get_ts()
+
+        # Every event since the last frame is handled before it's drawn,
+        # so input never waits more than a frame.
+        self.input_router.poll()
+        self.profiler.mark("input")
 
+        if not self.running:
+            return
+
+        # Slow frames are caught up on with more ticks, up to max_frame_time's worth,
+        # so game speed doesn't depend on the frame rate.
+        now = time.perf_counter()
+        self.tick_accumulator += min(now - self.last_frame_time, self.max_frame_time)
+        self.last_frame_time = now
+
+        while self.tick_accumulator >= self.tick_time and self.running:
+            self.update()
+            self.tick_accumulator -= self.tick_time
+        self.tick_alpha = self.tick_accumulator / self.tick_time
+
+        if self.speed > 1 and self.scene_name == "game":
+            self.play_bot_turns()
+        self.profiler.mark("update")
+
+        # Only some frames are drawn at turbo speeds.
+        rendering = self.get_should_render()
+
+        if rendering:
             # Calls the correct scene function for the value in self.scene_name.
-            # Functions like a five-branch if statement.
+            # Functions like an eight-branch if statement.
             {
                 "end": lambda: self.end_scene(),
                 "game": lambda: self.game_scene(),
                 "help": lambda: self.help_scene(),
+                "leaderboard": lambda: self.leaderboard_scene(),
+                "pause": lambda: self.pause_scene(),
+                "replay": lambda: self.replay_scene(),
                 "shop": lambda: self.shop_scene(),
                 "title": lambda: self.title_scene(),
             }[self.scene_name]()
+            self.profiler.mark("scene")
+
+        self.autosave()
+        self.profiler.mark("autosave")
+
+        if self.game_data_watcher.check():
+            self.reload_game_data()
+        self.profiler.mark("game data")
+
+        if rendering:
+            if self.profiler.get_enabled():
+                self.profiler.render_to(self.window)
+                # The HUD is drawn over cached frames, so they must be blitted again.
+                self.frame_key = None
+                self.profiler.mark("hud")
 
             # Updates the contents of the whole display.
             pygame.display.flip()
+            self.profiler.mark("flip")
+
+        # Limits the frame rate to fps (game logic runs at tick_rate regardless).
+        self.clock.tick(fps)
+        self.profiler.mark("tick (idle)")
 
-            # Sets the game FPS to 60.
-            self.clock.tick(60)
+        self.profiler.end_frame()
+        tracer.complete("frame", "frame", frame_start, scene=self.scene_name)
+
+    def update(self) -> None:
+        # One fixed tick of game logic, for the current scene.
+        if self.net_client is not None:
+            self.sync_with_server()
+        elif self.lockstep is not None:
+            self.step_lockstep()
+
+        if self.scene_name == "game":
+            self.update_game()
+        elif self.scene_name == "replay":
+            self.update_replay()
+
+        if self.scene_name in ("game", "replay"):
+            for player in self.players.get_list():
+                player.update_ship(self.tick_time, self.ship_move_time)
+
+    def reload_game_data(self) -> None:
+        # Swaps in the saved products and trade amounts without restarting the game.
+        # Tile amounts take effect from the next generated board.
+        # If the file has a mistake, it's reported and the old data is kept.
+        tracer.instant("reload_game_data", "data")
+        try:
+            tiles, trade, products = load_game_data(
+                self.game_data_watcher.file_path,
+                self.sprite_sheet_products,
+                self.players.get_state().get_resource_names(),
+            )
+            self.shop.set_products(products)
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            print(f"Game data not reloaded: {e!r}", file=sys.stderr)
+            return
+
+        self.board.set_tiles(tiles)
+        self.board.set_trade(trade)
+
+        self.rules = Rules(self.board, self.shop)
+        self.ai_worker.set_rules(self.rules)
+
+        self.ui_shop.reload()
+        if self.scene_name == "shop":
+            self.ui_shop.refresh()
+            self.freeze_backdrop()
 
     def end_scene(self) -> None:
+        # Only rendered again when the winner or number of computer players changes.
+        self.blit_cached_frame(
+            ("end", self.winner_num, self.winner_name, self.num_bots),
+            self.render_end_to,
+        )
+
+    def render_end_to(self, window: pygame.Surface) -> None:
         # Renders text showing who won.
         title_text = self.font_bold.render(
             f"P{self.winner_num + 1} ({self.winner_name}) WINS",
@@ -166,7 +682,7 @@ class SceneManager:
             self.window_size[0] / 2,
             self.window_size[1] / 2,
         )
-        self.window.blit(title_text[0], title_text[1])
+        window.blit(title_text[0], title_text[1])
 
         # Renders text showing how to start a new game.
         instruction_text = self.font.render(
@@ -177,90 +693,746 @@ class SceneManager:
             self.window_size[0] / 2,
             self.window_size[1] * 0.75,
         )
-        self.window.blit(instruction_text[0], instruction_text[1])
-
-        for event in pygame.event.get():
-            if not self.running:
-                # Quit game if game flow stopped.
-                pygame.display.quit()
-                pygame.quit()
-                sys.exit()
-            elif event.type == pygame.KEYDOWN:
-                if event.key == pygame.K_ESCAPE:
-                    # Stop game flow when designated key pressed.
-                    self.running = False
-                elif pygame.K_1 <= event.key <= pygame.K_5:
-                    # If a number key from one to five is pressed,
-                    # remove all players from the list and add new ones in.
-                    self.players.clear()
-
-                    self.selected_names = random.sample(
-                        self.names, event.key - 48
-                    )
+        window.blit(instruction_text[0], instruction_text[1])
 
-                    for selected_name in self.selected_names:
-                        self.players.add(selected_name, gen_colour())
+        self.render_bots_text_to(window)
 
-                    self.scene_name = "game"
+    def new_game(self, num_humans: int) -> None:
+        # Removes any players from the last game and adds the new ones in,
+        # with computer players after the humans.
+        if self.net_client is not None:
+            # Online games are started by the server, once everyone has joined.
+            return
+        if self.lockstep_peer is not None:
+            # Peer-to-peer games are started once, when every peer has joined.
+            return
 
-    def game_scene(self) -> None:
-        # When a player has won, show this on the end game screen.
+        self.ai_worker.cancel()
+        self.set_speed(1)
+        if self.board_played:
+            self.new_board()
+        self.board_played = True
+
+        self.players.clear()
+        self.start_board_events()
+        self.start_fog()
+
+        self.selected_names = random.sample(
+            self.names, num_humans + self.num_bots
+        )
+
+        for selected_name_idx, selected_name in enumerate(self.selected_names):
+            self.players.add(
+                selected_name,
+                gen_colour(),
+                is_bot=selected_name_idx >= num_humans,
+            )
+
+        self.start_recording()
+        self.set_scene("game")
+
+    def new_board(self) -> None:
+        # Generates a new board from a new seed, in place, reusing the last board's tiles.
+        self.board_seed = random.randrange(2**32)
+        random.seed(self.board_seed)
+
+        self.board.generate()
+
+        self.rules = Rules(self.board, self.shop)
+        self.ai_worker.set_rules(self.rules)
+
+    def start_board_events(self) -> None:
+        # Each game's board events are random, but the same for the same board.
+        if self.board_events_enabled:
+            self.board_events = BoardEvents(self.board, random.Random(self.board_seed))
+
+    def start_fog(self) -> None:
+        # Made before the game's players are added, so each is shown where it starts.
+        if self.fog_radius is not None:
+            # Mostly opaque, so the board can just be made out through it.
+            self.fog = FogOfWar(
+                self.board, self.fog_radius, (*self.colours["dark_purple"], 235)
+            )
+            self.fog_num = -1
+        self.players.set_fog(self.fog)
+
+    def start_recording(self) -> None:
+        """
+        Records the match from its current state, if recording.
+        Several matches can start in the same second, so each file is also named
+        by its board and a count of the matches recorded, and never replaces a file.
+        """
+        if self.record_dir is None:
+            return
+
+        file_name = f"match_{time.strftime('%Y%m%d_%H%M%S')}_{self.board_seed}"
+
+        while True:
+            self.num_recorded += 1
+
+            try:
+                match_recorder.start(
+                    f"{self.record_dir}/{file_name}_{self.num_recorded}.emp",
+                    self.board_seed,
+                    self.board.get_dims(),
+                    self.selected_names,
+                    self.players.get_state(),
+                )
+            except FileExistsError:
+                continue
+            except OSError as e:
+                print(f"Match not recorded: {e!r}", file=sys.stderr)
+
+            return
+
+    def autosave(self, force: bool = False) -> None:
+        """
+        Hands the game to the autosaver, at most once an interval (unless forced),
+        and only if it's changed since it was last saved.
+        Only copies the state here; it's encoded and written on the autosaver's thread.
+        Online and peer-to-peer games aren't saved, as they can't be resumed alone.
+        """
+        if (
+            self.autosaver is None
+            or self.net_client is not None
+            or self.lockstep is not None
+            or self.scene_stack[0] != "game"
+        ):
+            return
+
+        now = time.perf_counter()
+        if not force and now - self.autosave_time < self.autosaver.get_interval():
+            return
+        self.autosave_time = now
+
+        state = self.players.get_state()
+        if state == self.autosaved_state:
+            return
+
+        self.autosaved_state = state.copy()
+        self.autosaver.save(self.get_save_metadata(), self.autosaved_state)
+
+    def get_save_metadata(self) -> dict:
+        # Everything saved besides the state, as JSON-compatible values.
+        # The board's layout is only made again when it changes, so isn't copied.
+        return {
+            "board_seed": self.board_seed,
+            "layout": self.board.get_layout(),
+            # In turn order, which is also the order of their numbers.
+            "players": [
+                [
+                    player.get_name(),
+                    list(player.get_colour()),
+                    player.get_is_bot(),
+                    player.get_image_file_path(),
+                    player.get_status(),
+                ]
+                for player in self.players.get_list()
+            ],
+            "scenes": list(self.scene_stack),
+            "num_bots": self.num_bots,
+            "board_events": (
+                None
+                if self.board_events is None
+                else self.board_events.get_progress()
+            ),
+            "fog": None if self.fog is None else self.fog.get_visible(),
+        }
+
+    def resume_game(self) -> None:
+        # Carries on the autosaved game on its saved board, without generating a new one.
+        if (
+            self.autosaver is None
+            or not self.autosaver.get_exists()
+            or self.net_client is not None
+            or self.lockstep_peer is not None
+        ):
+            return
+
+        try:
+            metadata, state = load_save(self.autosaver.get_file_path())
+
+            if state.get_resource_names() != self.players.get_state().get_resource_names():
+                raise ValueError("The saved game has different resources.")
+
+            self.board.set_layout(metadata["layout"])
+        except (OSError, ValueError, KeyError, TypeError, struct.error) as e:
+            print(f"Saved game not resumed: {e!r}", file=sys.stderr)
+            return
+
+        self.ai_worker.cancel()
+        self.board_seed = metadata["board_seed"]
+        self.board_played = True
+        self.rules = Rules(self.board, self.shop)
+        self.ai_worker.set_rules(self.rules)
+
+        self.players.clear()
+        self.selected_names = []
+
+        # The board's changes so far are in its layout, and carry on from where they were.
+        self.start_board_events()
+        if self.board_events is not None and metadata.get("board_events"):
+            self.board_events.set_progress(metadata["board_events"])
+        self.start_fog()
+
+        for name, colour, is_bot, image_file_path, status in metadata["players"]:
+            self.players.add(name, tuple(colour), is_bot, image_file_path)
+            self.players.get_list()[-1].set_status(status)
+            self.selected_names.append(name)
+
+        # Positions, resources, scores and whose turn it is all come from the save.
+        self.players.get_state().restore(state.snapshot())
+        self.autosaved_state = state
+        self.num_bots = metadata["num_bots"]
+
+        if self.fog is not None:
+            if metadata.get("fog"):
+                self.fog.set_visible(metadata["fog"])
+            else:
+                # Saved without fog of war, so only what's around the players now has been seen.
+                self.fog.set_visible(["0"] * len(self.players.get_list()))
+                for player in self.players.get_list():
+                    self.fog.visit(player.get_num(), player.get_pos())
+
+        self.start_recording()
+
+        # Reopens any overlays (help, pause or shop) over the game, as they were.
+        self.set_scene(metadata["scenes"][0])
+        for scene_name in metadata["scenes"][1:]:
+            self.push_scene(scene_name)
+
+    def spectate_game(self) -> None:
+        # Needs at least two computer players to watch.
+        if self.num_bots >= 2:
+            self.new_game(0)
+
+    def cycle_num_bots(self) -> None:
+        self.num_bots = (self.num_bots + 1) % (self.max_bots + 1)
+
+    def render_bots_text_to(self, window: pygame.Surface) -> None:
+        # Renders text showing how many computer players will join the next game.
+        bots_text = self.font.render(
+            f"Computer players: {self.num_bots} (press A to change"
+            f"{', or 0 to watch them play' if self.num_bots >= 2 else ''}).",
+            self.text_colour,
+        )
+        bots_text[1].center = (
+            self.window_size[0] / 2,
+            self.window_size[1] * 0.75 + 2 * self.font_size,
+        )
+        window.blit(bots_text[0], bots_text[1])
+
+        if self.leaderboard is not None:
+            leaderboard_text = self.font.render(
+                "Press L for the leaderboard.", self.text_colour
+            )
+            leaderboard_text[1].center = (
+                self.window_size[0] / 2,
+                self.window_size[1] * 0.75 + 4 * self.font_size,
+            )
+            window.blit(leaderboard_text[0], leaderboard_text[1])
+
+    def play_bot_turn(self, curr_player: Player, timeout: float = 0.0) -> bool:
+        """
+        Starts a search for the current computer player's next action,
+        or carries it out once the search has finished.
+        Waits up to timeout seconds for it, so by default never blocks,
+        and the frame rate is unaffected.
+
+        Returns whether an action was carried out.
+        """
+        if not self.ai_worker.get_is_searching():
+            self.ai_worker.start_search(self.players.get_state().copy())
+
+        action = self.ai_worker.get_result(timeout)
+
+        if action is None:
+            return False
+
+        self.apply_action(curr_player, action)
+
+        stats = self.ai_worker.get_stats()
+        if action[0] != "trade" and stats:
+            curr_player.set_status(
+                f"AI: {stats['playouts_per_sec']:.0f} playouts/s, "
+                f"{stats['nodes']} nodes, depth {stats['max_depth']}, "
+                f"{stats['best_share']:.0%} confidence."
+            )
+
+        return True
+
+    def play_bot_turns(self) -> None:
+        """
+        At turbo speeds, carries out computer players' actions one after another,
+        waiting for each search, for turbo_logic_time seconds a frame.
+        Budgeted by frame rather than by tick, so however long searches take,
+        the ticks due never pile up.
+        """
+        deadline = time.perf_counter() + self.turbo_logic_time
+
+        while (
+            self.scene_name == "game"
+            and (timeout := deadline - time.perf_counter()) > 0
+            and self.players.get_curr().get_is_bot()
+            and self.play_bot_turn(self.players.get_curr(), timeout)
+        ):
+            self.check_winner()
+
+    def get_is_spectating(self) -> bool:
+        # Whether every player in the game is a computer player on this computer.
+        return (
+            self.net_client is None
+            and self.lockstep is None
+            and all(player.get_is_bot() for player in self.players.get_list())
+        )
+
+    def set_speed(self, speed: int) -> None:
+        # Searches and ship movement take speed times less time.
+        self.speed = speed
+        self.ai_worker.set_time_budget(self.ai_time_budget / speed)
+        self.ship_move_time = self.base_ship_move_time / speed
+
+    def cycle_speed(self) -> None:
+        # Only games between computer players can be sped up.
+        if self.get_is_spectating():
+            speeds = self.spectate_speeds
+            self.set_speed(speeds[(speeds.index(self.speed) + 1) % len(speeds)])
+
+    def get_should_render(self) -> bool:
+        """
+        Whether to draw this frame. Always, except at turbo speeds,
+        where frames are drawn turbo_fps times a second, or as soon as a score changes,
+        so time goes to playing rather than drawing states no one could follow.
+        """
+        if self.speed == 1 or self.scene_name != "game":
+            return True
+
+        now = time.perf_counter()
+        scores = self.players.get_state().scores
+
+        if (
+            scores != self.turbo_scores
+            or now - self.turbo_render_time >= 1 / self.turbo_fps
+        ):
+            self.turbo_scores = scores[:]
+            self.turbo_render_time = now
+            return True
+
+        return False
+
+    def apply_action(self, player: Player, action: tuple) -> None:
+        # Carries out one of the actions from Rules, for a player on this computer.
+        turns_taken = self.players.get_turns_taken()
+
+        if action[0] == "move":
+            if player.move(action[1], player.get_pos()) <= 0:
+                self.players.cycle_curr()
+        elif action[0] == "trade":
+            player.trade()
+        elif action[0] == "buy":
+            self.shop.buy_product(player, action[1])
+        else:
+            self.players.cycle_curr()
+
+        if self.board_events is not None:
+            self.update_board_events(player, action, turns_taken)
+
+    def update_board_events(
+        self, player: Player, action: tuple, turns_taken: int
+    ) -> None:
+        """
+        Harvests the planet the player moved onto, and moves tiles once every player
+        has had a turn since turns_taken. Only the rules of the nodes changed
+        are read again, and the computer players are given them.
+        """
+        changed = set()
+
+        if action[0] == "move" and player.get_pos() == action[1]:
+            changed |= self.board_events.harvest(action[1])
+
+        num_players = len(self.players.get_list())
+        if self.players.get_turns_taken() // num_players > turns_taken // num_players:
+            changed |= self.board_events.end_round(
+                {other_player.get_pos() for other_player in self.players.get_list()}
+            )
+
+        if changed:
+            tracer.instant("board events", "board", nodes=len(changed))
+            self.rules = self.rules.with_nodes(self.board, changed)
+            self.ai_worker.set_rules(self.rules)
+            if self.fog is not None:
+                self.fog.update_nodes(changed)
+
+    def take_action(self, action: tuple) -> None:
+        # Human players' actions, which go to the server when playing online.
+        if self.net_client is not None:
+            self.net_client.send_action(action)
+        elif self.lockstep is not None:
+            self.lockstep_inputs.append(action)
+        else:
+            self.apply_action(self.players.get_curr(), action)
+
+    def get_can_control(self, player: Player) -> bool:
+        # Whether input on this computer can take the player's turn.
+        if self.net_client is not None:
+            return player.get_num() == self.net_client.get_num()
+        if self.lockstep is not None:
+            return player.get_num() == self.lockstep.get_local_peer()
+
+        return not player.get_is_bot()
+
+    def sync_with_server(self) -> None:
+        # Applies every message from the server since the last frame.
+        # Its keyframes and deltas change the game's state in place, so players' views stay valid.
+        changed = False
+
+        for message in self.net_client.poll():
+            if message[0] == "state":
+                changed |= self.state_receiver.apply_keyframe(message[1], message[2])
+            elif message[0] == "delta":
+                changed |= self.state_receiver.apply_delta(message[1])
+            elif message[0] == "roster":
+                # Players only ever join, so only the new names are added.
+                for name in message[1][len(self.players.get_list()) :]:
+                    self.players.add(name, gen_colour())
+                changed = True
+
+                if self.scene_name == "title":
+                    self.set_scene("game")
+            elif len(self.players.get_list()) > self.net_client.get_num():
+                self.players.get_list()[self.net_client.get_num()].set_status(
+                    message[1]
+                )
+            else:
+                print(message[1], file=sys.stderr)
+
+        if changed and self.scene_name in self.overlay_scenes:
+            self.ui_shop.refresh()
+            self.freeze_backdrop()
 
-        # Sort the players by score ascending, then take the last (highest-scoring) player.
-        highest_scoring_player = merge_sort(
-            self.players.get_list(), lambda a, b: a.get_score() < b.get_score()
-        )[-1]
+    def start_lockstep_game(self) -> None:
+        # Adds every peer's player, the same way on every peer, from the shared seed.
+        # Main has already generated the board from the same seed.
+        seed = self.lockstep_peer.get_seed()
+        names = self.lockstep_peer.get_names()
 
-        if highest_scoring_player.get_score() >= 5:
-            # If the winning score threshold has been surpassed,
+        self.players.clear()
+        # Start positions (and colours and ships) come from the global RNG,
+        # so it's seeded again in case anything since the board used it.
+        random.seed(seed)
+        for name in names:
+            self.players.add(name, gen_colour())
+
+        self.lockstep = LockstepSession(
+            self.rules,
+            self.players.get_state(),
+            random.Random(seed),
+            len(names),
+            self.lockstep_peer.get_num(),
+        )
+
+        self.set_scene("game")
+
+    def step_lockstep(self) -> None:
+        # Applies the other peers' inputs since the last frame, rolling back if they're late,
+        # then simulates this frame's tick with this peer's inputs, unless too far ahead.
+        changed = bool(self.lockstep_inputs)
+
+        for peer, tick, actions in self.lockstep_peer.poll():
+            self.lockstep.add_remote_inputs(peer, tick, actions)
+            changed |= bool(actions)
+
+        if not self.lockstep_peer.get_connected():
+            self.players.get_list()[self.lockstep.get_local_peer()].set_status(
+                "Disconnected from a peer."
+            )
+        elif self.lockstep.get_can_advance():
+            self.lockstep_peer.send_inputs(
+                self.lockstep.get_tick(), self.lockstep_inputs
+            )
+            self.lockstep.advance(self.lockstep_inputs)
+            self.lockstep_inputs = []
+
+        if changed and self.scene_name in self.overlay_scenes:
+            self.ui_shop.refresh()
+            self.freeze_backdrop()
+
+    def update_game(self) -> None:
+        # One tick of the game: checks for a winner, then lets a computer player act.
+        if self.check_winner():
+            return
+
+        # At turbo speeds, computer players act between frames instead (see run_frame).
+        if self.speed == 1 and (curr_player := self.players.get_curr()).get_is_bot():
+            self.play_bot_turn(curr_player)
+
+    def check_winner(self) -> bool:
+        # When a player has won, show this on the end game screen.
+        # Returns whether someone has won.
+        # Decided by the rules, as on the server and in the computer players' simulations.
+        winner_num = self.rules.get_winner(self.players.get_state())
+
+        if winner_num != -1:
             # Setup the attributes to show the winning player on the end scene.
-            self.scene_name = "end"
-            self.winner_num = highest_scoring_player.get_num()
-            self.winner_name = highest_scoring_player.get_name()
+            winner = self.players.get_list()[winner_num]
+            self.set_scene("end")
+            match_recorder.stop()
+            if self.autosaver is not None:
+                # A finished game can't be resumed.
+                self.autosaver.remove()
+                self.autosaved_state = None
+            self.winner_num = winner_num
+            self.winner_name = winner.get_name()
+
+            if self.leaderboard is not None:
+                self.leaderboard.record_match(
+                    self.board_seed,
+                    self.players.get_turns_taken(),
+                    self.winner_num,
+                    self.winner_name,
+                    [
+                        (player.get_name(), player.get_score(), player.get_is_bot())
+                        for player in self.players.get_list()
+                    ],
+                )
+
+            return True
+
+        return False
 
-        mouse_pos = pygame.mouse.get_pos()
+    def game_scene(self) -> None:
+        mouse_pos = self.input_router.get_mouse_pos()
         mouse_board_coord = self.board.board_pos_from_coord(mouse_pos)
 
         curr_player = self.players.get_curr()
-        curr_player_pos = curr_player.get_pos()
-
-        for event in pygame.event.get():
-            if not self.running:
-                # Quit game if game flow stopped.
-                pygame.display.quit()
-                pygame.quit()
-                sys.exit()
-            elif event.type == pygame.KEYDOWN and event.key == pygame.K_ESCAPE:
-                # Stop game flow when designated key pressed.
-                self.running = False
-            elif event.type == pygame.MOUSEBUTTONDOWN:
-                if (
-                    mouse_board_coord[0] is not None
-                    and mouse_board_coord[1] is not None
-                ):
-                    actions_left = curr_player.move(
-                        mouse_board_coord, curr_player_pos
-                    )
 
-                    if actions_left <= 0:
-                        self.players.cycle_curr()
-                elif action_idx := self.ui_actions.check_for_action(mouse_pos):
-                    self.actions[action_idx[1]][action_idx[0]]["func"]()
+        # The game changes every frame (the mouse hovers, ships move), so it's always redrawn.
+        self.window.blit(self.background.image, self.background.rect)
+        self.profiler.mark("background")
+        self.render_game_to(
+            self.window, mouse_pos, mouse_board_coord, curr_player, self.tick_alpha
+        )
+        if self.get_is_spectating():
+            self.render_speed_to(self.window)
+        self.frame_key = None
+
+    def render_speed_to(self, window: pygame.Surface) -> None:
+        # Each speed's text is only rendered once.
+        if (speed_text := self.speed_texts.get(self.speed)) is None:
+            speed_text = self.speed_texts[self.speed] = self.font.render(
+                f"Watching at {self.speed}x (T to change).", self.text_colour
+            )
+            # Clear of the board, the players' scores and the action buttons.
+            speed_text[1].bottomright = (
+                self.window_size[0] - 20,
+                self.window_size[1] - 70,
+            )
+
+        window.blit(speed_text[0], speed_text[1])
+
+    def click_game(self, event: pygame.event.Event) -> None:
+        curr_player = self.players.get_curr()
+        mouse_board_coord = self.board.board_pos_from_coord(event.pos)
+
+        if not self.get_can_control(curr_player):
+            # Clicks can't take a computer's (or another online player's) turn for it.
+            return
+        elif mouse_board_coord[0] is not None and mouse_board_coord[1] is not None:
+            self.take_action(("move", mouse_board_coord))
+        elif action_idx := self.ui_actions.check_for_action(event.pos):
+            self.actions[action_idx[1]][action_idx[0]]["func"]()
+
+    def render_game_to(
+        self,
+        window: pygame.Surface,
+        mouse_pos: tuple[int, int],
+        mouse_board_coord: tuple[None | int, None | int],
+        curr_player: Player,
+        alpha: float = 1.0,
+    ) -> None:
+        # alpha is how far between the last two ticks the frame is, for moving ships.
+        mark = self.profiler.mark
+
+        self.ui_actions.render_to(window)
+        mark("actions")
+
+        self.ui_text.render_to(window, mouse_pos, curr_player)
+
+        self.board.render_to(window, mouse_board_coord, curr_player)
+        mark("board")
+
+        fog_num = -1 if self.fog is None else self.get_fog_num()
+        if fog_num != -1:
+            self.fog.render_to(window, fog_num)
+            mark("fog")
+
+        for player in self.players.get_list():
+            # Other players' ships are hidden in the fog too.
+            if (
+                fog_num == -1
+                or player.get_num() == fog_num
+                or self.fog.get_is_visible(fog_num, player.get_pos())
+            ):
+                player.render_to(window, alpha)
+        mark("players")
 
-        self.ui_actions.render_to(self.window)
+    def get_fog_num(self) -> int:
+        # The number of the player whose view is shown, or -1 if only computer players are playing.
+        curr_player = self.players.get_curr()
+
+        if curr_player is not None and self.get_can_control(curr_player):
+            self.fog_num = curr_player.get_num()
+        elif self.fog_num == -1:
+            # As when resuming on a computer player's turn.
+            self.fog_num = next(
+                (
+                    player.get_num()
+                    for player in self.players.get_list()
+                    if self.get_can_control(player)
+                ),
+                -1,
+            )
+
+        return self.fog_num
+
+    def start_replay(self) -> None:
+        # Adds the recorded match's players, then shows its first turn.
+        self.players.clear()
+        for name in self.match_log.get_names():
+            self.players.add(name, gen_colour())
+
+        self.seek_replay(0)
+        self.set_scene("replay")
+
+    def seek_replay(self, turn: int) -> None:
+        self.replay_turn = max(0, min(turn, self.match_log.get_num_turns()))
+        self.match_log.seek(self.players.get_state(), self.replay_turn)
+
+    def set_replay_speed(self, turns_per_sec: int) -> None:
+        # Toggles playing at that speed.
+        self.replay_speed = 0 if self.replay_speed == turns_per_sec else turns_per_sec
+        self.replay_progress = 0.0
 
+    def update_replay(self) -> None:
+        if self.replay_speed:
+            # Turns are played by game time, so fast-forwarding plays many a tick.
+            self.replay_progress += self.replay_speed * self.tick_time
+            if (turns := int(self.replay_progress)) > 0:
+                self.replay_progress -= turns
+                self.seek_replay(self.replay_turn + turns)
+
+            if self.replay_turn >= self.match_log.get_num_turns():
+                self.replay_speed = 0
+
+    def replay_scene(self) -> None:
+        curr_player = self.players.get_curr()
+        curr_player.set_status(
+            f"Replay: turn {self.replay_turn} of {self.match_log.get_num_turns()}. "
+            "Left/Right, PgUp/PgDn, Home/End to seek, Space to play, F to fast-forward."
+        )
+        self.profiler.mark("scene logic")
+
+        self.window.blit(self.background.image, self.background.rect)
+        self.profiler.mark("background")
+
+        mouse_pos = self.input_router.get_mouse_pos()
         self.ui_text.render_to(self.window, mouse_pos, curr_player)
+        self.board.render_to(
+            self.window, self.board.board_pos_from_coord(mouse_pos), curr_player
+        )
+        for player in self.players.get_list():
+            player.render_to(self.window, self.tick_alpha)
+        self.frame_key = None
+
+    def open_leaderboard(self) -> None:
+        if self.leaderboard is not None:
+            self.leaderboard_return_scene = self.scene_name
+            self.set_scene("leaderboard")
+
+    def leaderboard_scene(self) -> None:
+        # Only queried and rendered again once more matches have been saved.
+        key = ("leaderboard", self.leaderboard.get_version())
 
-        self.board.render_to(self.window, mouse_board_coord, curr_player)
+        if key not in self.frame_cache:
+            for old_key in [
+                old_key for old_key in self.frame_cache if old_key[0] == "leaderboard"
+            ]:
+                del self.frame_cache[old_key]
 
-        for player_num, player in enumerate(self.players.get_list()):
-            player.render_to(self.window)
+        self.blit_cached_frame(key, self.render_leaderboard_to)
+
+    def render_leaderboard_to(self, window: pygame.Surface) -> None:
+        pos = (60, 60)
+        line_height = 1.45 * self.font_size
+
+        self.font_bold.render_to(window, pos, "LEADERBOARD:", self.text_colour)
+
+        # Most wins on the left, highest scores on the right.
+        columns = [
+            (
+                pos[0],
+                "Most wins",
+                [
+                    f"{rank + 1}. {name}{' (AI)' if is_bot else ''}: "
+                    f"{wins} of {games} won, best score {best_score}"
+                    for rank, (name, wins, games, best_score, is_bot) in enumerate(
+                        self.leaderboard.get_top_players()
+                    )
+                ],
+            ),
+            (
+                self.window_size[0] * 0.6,
+                "Highest scores",
+                [
+                    f"{rank + 1}. {name}: {score} "
+                    f"({time.strftime('%d %b %Y', time.localtime(played_at))})"
+                    for rank, (name, score, played_at) in enumerate(
+                        self.leaderboard.get_top_scores()
+                    )
+                ],
+            ),
+        ]
+
+        for column_x, heading, lines in columns:
+            self.font_bold.render_to(
+                window, (column_x, pos[1] + 2 * line_height), heading, self.text_colour
+            )
+            for line_idx, line in enumerate(lines or ["No matches yet."]):
+                self.font.render_to(
+                    window,
+                    (column_x, pos[1] + (line_idx + 3.5) * line_height),
+                    line,
+                    self.text_colour,
+                )
+
+        # The latest winner's recent matches, below.
+        if winner_name := self.winner_name:
+            history_y = pos[1] + 15 * line_height
+            self.font_bold.render_to(
+                window, (pos[0], history_y), f"{winner_name}'s matches", self.text_colour
+            )
+
+            for line_idx, (played_at, num_players, turns, seat, score, won) in enumerate(
+                self.leaderboard.get_player_history(winner_name, 5)
+            ):
+                self.font.render_to(
+                    window,
+                    (pos[0], history_y + (line_idx + 1.5) * line_height),
+                    f"{time.strftime('%d %b %H:%M', time.localtime(played_at))}: "
+                    f"{'won' if won else 'lost'} as P{seat + 1} of {num_players}, "
+                    f"score {score}, {turns} turns",
+                    self.text_colour,
+                )
 
     def help_scene(self) -> None:
+        # The help text is composited over the frozen game once, when opened.
+        self.blit_cached_frame(("help",), self.render_help_to)
+
+    def render_help_to(self, window: pygame.Surface) -> None:
         help_text_pos = (60, 60)
 
         self.font_bold.render_to(
-            self.window,
+            window,
             help_text_pos,
             f"HELP:",
             self.text_colour,
@@ -269,7 +1441,7 @@ class SceneManager:
         for help_text_line_idx, help_text_line in enumerate(self.help_text):
             # Render each of the guide's individual line of text.
             self.font.render_to(
-                self.window,
+                window,
                 (
                     help_text_pos[0],
                     help_text_pos[1]
@@ -279,22 +1451,24 @@ class SceneManager:
                 self.text_colour,
             )
 
-        for event in pygame.event.get():
-            if not self.running:
-                # Quit game if game flow stopped.
-                pygame.display.quit()
-                pygame.quit()
-                sys.exit()
-            elif event.type == pygame.KEYDOWN and event.key == pygame.K_ESCAPE:
-                # Stop game flow when designated key pressed.
-                self.running = False
-            elif event.type == pygame.MOUSEBUTTONDOWN:
-                # Return to game when scene clicked.
-                self.scene_name = "game"
+    def pause_scene(self) -> None:
+        self.blit_cached_frame(("pause",), self.render_pause_to)
+
+    def render_pause_to(self, window: pygame.Surface) -> None:
+        pause_text = self.font_bold.render("PAUSED", self.text_colour, size=50)
+        pause_text[1].center = (
+            self.window_size[0] / 2,
+            self.window_size[1] / 2,
+        )
+        window.blit(pause_text[0], pause_text[1])
 
     def shop_scene(self) -> None:
         shop_text_pos = (60, 60)
 
+        # The frozen game, then the shop's text over it.
+        self.window.blit(self.backdrop, (0, 0))
+        self.frame_key = None
+
         self.font_bold.render_to(
             self.window,
             shop_text_pos,
@@ -302,65 +1476,8 @@ class SceneManager:
             self.text_colour,
         )
 
-        shop_products_text_pos = (60, 120)
-        shop_products_text_spacing = 2.5 * self.font_size
-
-        for product_idx, product in enumerate(self.shop.get_products()):
-            # Render each individual product's line of text.
-
-            # Render index and name.
-            self.font.render_to(
-                self.window,
-                (
-                    shop_products_text_pos[0],
-                    shop_products_text_pos[1]
-                    + product_idx * shop_products_text_spacing,
-                ),
-                f"{product_idx + 1}     {product.get_name()}",
-                self.text_colour,
-            )
-
-            # Render image.
-            self.window.blit(
-                pygame.transform.scale(
-                    product.get_icon_image(), (self.font_size, self.font_size)
-                ),
-                (
-                    shop_products_text_pos[0] + 10 * self.font_size,
-                    shop_products_text_pos[1]
-                    + product_idx * shop_products_text_spacing,
-                ),
-            )
-
-            # Render cost.
-            self.font.render_to(
-                self.window,
-                (
-                    shop_products_text_pos[0] + 11 * self.font_size,
-                    shop_products_text_pos[1]
-                    + product_idx * shop_products_text_spacing,
-                ),
-                "    "
-                + ", ".join(
-                    [
-                        f"{value} {key}"
-                        for key, value in product.get_cost().items()
-                    ]
-                ),
-                self.text_colour,
-            )
-
-            # Render effect description.
-            self.font.render_to(
-                self.window,
-                (
-                    shop_products_text_pos[0] + 30 * self.font_size,
-                    shop_products_text_pos[1]
-                    + product_idx * shop_products_text_spacing,
-                ),
-                product.get_effect_desc(),
-                self.text_colour,
-            )
+        # Renders only the visible page of products.
+        self.ui_shop.render_to(self.window)
 
         # Render status of the last purchase (success / reason of failure).
         self.font.render_to(
@@ -370,51 +1487,48 @@ class SceneManager:
             self.text_colour,
         )
 
+    def buy_from_row(self, row: int) -> None:
+        # Buys the product on a visible row of the shop, for the current player.
+        product_idx = self.ui_shop.get_product_idx_from_row(row)
+
+        if product_idx is None:
+            return
+
         curr_player = self.players.get_curr()
+        if not self.get_can_control(curr_player):
+            return
+
+        product_name = self.shop.get_products()[product_idx - 1].get_name()
 
-        for event in pygame.event.get():
-            if not self.running:
-                # Quit game if game flow stopped.
-                pygame.display.quit()
-                pygame.quit()
-                sys.exit()
-            elif event.type == pygame.KEYDOWN:
-                if event.key == pygame.K_ESCAPE:
-                    # Stop game flow when designated key pressed.
-                    self.running = False
-                # Conditions for handling the player buying a product.
-                # Checks for the key press of a product's index.
-                elif event.key in self.shop.get_idxs_ascii():
-                    # Checks for the plaer being on a trading station.
-                    if self.board.get_type_from_board_pos(
-                        curr_player.get_pos()
-                    ).startswith("trader"):
-                        # Checks for the player having sufficient resources.
-                        if self.shop.check_product_reqs(
-                            curr_player,
-                            product_idx := event.key
-                            - 48,  # Subtracts 48 for ASCII conversion.
-                        ):
-                            self.shop.buy_product(curr_player, product_idx)
-                            self.status = "purchase_success"
-                            self.status_desc = (
-                                f"Product {product_idx} purchased successfully."
-                            )
-                        else:
-                            self.status = (
-                                "purchase_failure_insufficient_resources"
-                            )
-                            self.status_desc = f"Insufficient resources for product {product_idx}."
-                    else:
-                        self.status = "purchase_failure_incorrect_location"
-                        self.status_desc = (
-                            f"Insufficient location, must be on a trader tile."
-                        )
-            elif event.type == pygame.MOUSEBUTTONDOWN:
-                # Return to game when scene clicked.
-                self.scene_name = "game"
+        # Checks for the plaer being on a trading station.
+        if self.board.get_type_from_board_pos(curr_player.get_pos()).startswith(
+            "trader"
+        ):
+            # Checks for the player having sufficient resources.
+            if self.shop.check_product_reqs(curr_player, product_idx):
+                self.take_action(("buy", product_idx))
+                self.ui_shop.refresh()
+                # The player's score and resources behind the shop changed.
+                self.freeze_backdrop()
+                self.status = "purchase_success"
+                self.status_desc = f"{product_name} purchased successfully."
+            else:
+                self.status = "purchase_failure_insufficient_resources"
+                self.status_desc = f"Insufficient resources for {product_name}."
+        else:
+            self.status = "purchase_failure_incorrect_location"
+            self.status_desc = f"Insufficient location, must be on a trader tile."
 
     def title_scene(self) -> None:
+        # Only rendered again when the number of computer players changes.
+        self.blit_cached_frame(
+            ("title", self.num_bots, self.get_can_resume()), self.render_title_to
+        )
+
+    def get_can_resume(self) -> bool:
+        return self.autosaver is not None and self.autosaver.get_exists()
+
+    def render_title_to(self, window: pygame.Surface) -> None:
         title_text = self.font_bold.render(
             "EMPYREUS",
             self.text_colour,
@@ -425,7 +1539,7 @@ class SceneManager:
             self.window_size[1] / 2,
         )
 
-        self.window.blit(title_text[0], title_text[1])
+        window.blit(title_text[0], title_text[1])
 
         instruction_text = self.font.render(
             "Enter the number of players (1 to 5) to start a new game.",
@@ -435,25 +1549,16 @@ class SceneManager:
             self.window_size[0] / 2,
             self.window_size[1] * 0.75,
         )
+        window.blit(instruction_text[0], instruction_text[1])
 
-        self.window.blit(instruction_text[0], instruction_text[1])
-
-        for event in pygame.event.get():
-            if not self.running:
-                # Quit game if game flow stopped.
-                pygame.display.quit()
-                pygame.quit()
-                sys.exit()
-            elif event.type == pygame.KEYDOWN:
-                if event.key == pygame.K_ESCAPE:
-                    # Stop game flow when designated key pressed.
-                    self.running = False
-                elif pygame.K_1 <= event.key <= pygame.K_5:
-                    self.selected_names = random.sample(
-                        self.names, event.key - 48
-                    )
-
-                    for selected_name in self.selected_names:
-                        self.players.add(selected_name, gen_colour())
+        if self.get_can_resume():
+            resume_text = self.font.render(
+                "Press R to resume the saved game.", self.text_colour
+            )
+            resume_text[1].center = (
+                self.window_size[0] / 2,
+                self.window_size[1] * 0.75 - 2 * self.font_size,
+            )
+            window.blit(resume_text[0], resume_text[1])
 
-                    self.scene_name = "game"
+        self.render_bots_text_to(window)
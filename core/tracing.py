@@ -0,0 +1,160 @@
+import atexit
+import json
+import os
+import threading
+import time
+
+from contextlib import contextmanager, nullcontext
+from typing import Iterator
+
+
+class Tracer:
+    """
+    Records spans and instant events in the Chrome trace-event format,
+    for opening a whole session in a trace viewer (chrome://tracing or Perfetto).
+
+    Events are appended to an in-memory list as tuples, and only converted
+    and written to the file when the game exits.
+    While not recording, span() returns a shared context that does nothing.
+    """
+
+    def __init__(self):
+        self.file_path: None | str = None
+        self.enabled = False
+
+        # (phase, name, category, start µs, duration µs, thread id, args)
+        self.events: list[tuple] = []
+        self.thread_names: dict[int, str] = {}
+        self.start_ns = time.perf_counter_ns()
+
+        self.null_span = nullcontext()
+
+    def get_enabled(self) -> bool:
+        return self.enabled
+
+    def start(self, file_path: None | str = None) -> None:
+        # Starts recording, to be written to file_path on exit.
+        # Without a file path, events are only kept in memory (used by the benchmarks).
+        self.file_path = file_path
+        self.enabled = True
+        self.start_ns = time.perf_counter_ns()
+
+        if file_path is not None:
+            atexit.register(self.flush)
+
+    def stop(self) -> None:
+        self.enabled = False
+
+    def get_events(self) -> list[tuple]:
+        return self.events
+
+    def clear(self) -> None:
+        self.events.clear()
+
+    def get_ts(self) -> float:
+        # Microseconds since recording started, as trace viewers expect.
+        return (time.perf_counter_ns() - self.start_ns) / 1000
+
+    def get_tid(self) -> int:
+        thread = threading.current_thread()
+
+        if thread.ident not in self.thread_names:
+            self.thread_names[thread.ident] = thread.name
+
+        return thread.ident
+
+    def span(self, name: str, category: str, **args):
+        """Returns a context manager which records the time spent inside it."""
+        if not self.enabled:
+            return self.null_span
+
+        return self.record_span(name, category, args)
+
+    @contextmanager
+    def record_span(self, name: str, category: str, args: dict) -> Iterator[None]:
+        start = self.get_ts()
+
+        try:
+            yield
+        finally:
+            self.events.append(
+                (
+                    "X",
+                    name,
+                    category,
+                    start,
+                    self.get_ts() - start,
+                    self.get_tid(),
+                    args,
+                )
+            )
+
+    def complete(
+        self, name: str, category: str, start: float, **args
+    ) -> None:
+        # Records a span from start (from get_ts()) until now, for code that can't use span().
+        if self.enabled:
+            self.events.append(
+                (
+                    "X",
+                    name,
+                    category,
+                    start,
+                    self.get_ts() - start,
+                    self.get_tid(),
+                    args,
+                )
+            )
+
+    def instant(self, name: str, category: str, **args) -> None:
+        if self.enabled:
+            self.events.append(
+                ("i", name, category, self.get_ts(), 0, self.get_tid(), args)
+            )
+
+    def flush(self) -> None:
+        # Writes every recorded event, replacing the file, via a temporary file
+        # so a crash while writing never leaves a half-written trace.
+        if self.file_path is None:
+            return
+
+        pid = os.getpid()
+        trace_events = [
+            {
+                "ph": "M",
+                "name": "thread_name",
+                "pid": pid,
+                "tid": tid,
+                "args": {"name": thread_name},
+            }
+            for tid, thread_name in self.thread_names.items()
+        ]
+
+        for phase, name, category, start, duration, tid, args in self.events:
+            trace_event = {
+                "ph": phase,
+                "name": name,
+                "cat": category,
+                "ts": start,
+                "pid": pid,
+                "tid": tid,
+                "args": args,
+            }
+
+            if phase == "X":
+                trace_event["dur"] = duration
+            else:
+                trace_event["s"] = "t"  # Instant events are scoped to their thread.
+
+            trace_events.append(trace_event)
+
+        temp_file_path = f"{self.file_path}.tmp"
+        with open(temp_file_path, "w") as f:
+            json.dump(
+                {"traceEvents": trace_events, "displayTimeUnit": "ms"}, f
+            )
+        os.replace(temp_file_path, self.file_path)
+
+
+# The one tracer for the whole game, so any module can record to it.
+tracer = Tracer()
@@ -0,0 +1,111 @@
+import pygame
+
+from typing import Callable
+
+
+# The only event types ever put on the queue; SDL drops the rest before they're queued.
+ALLOWED_EVENT_TYPES = (
+    pygame.QUIT,
+    pygame.KEYDOWN,
+    pygame.MOUSEBUTTONDOWN,
+    pygame.MOUSEWHEEL,
+    pygame.MOUSEMOTION,
+)
+
+# The number each number key stands for, instead of converting key codes by hand.
+NUMBER_KEYS = {pygame.K_0 + number: number for number in range(10)}
+
+# The code an event is bound by: its key, its mouse button, or nothing.
+EVENT_CODES = {
+    pygame.KEYDOWN: lambda event: event.key,
+    pygame.MOUSEBUTTONDOWN: lambda event: event.button,
+}
+
+# Bindings in this scene apply in every scene, after the current scene's own.
+GLOBAL_SCENE = "*"
+
+
+class InputRouter:
+    """
+    Drains the event queue once per frame and dispatches each event
+    through the current scene's binding table.
+
+    Bindings are keyed by (event type, code), where the code is the key
+    or mouse button, or None to match every event of that type.
+    Mouse motion is coalesced: only the latest position is kept,
+    and motion events are never dispatched.
+    """
+
+    def __init__(self, get_scene_name: Callable[[], str]):
+        # Called for every event, so events after a scene change go to the new scene.
+        self.get_scene_name = get_scene_name
+
+        self.bindings: dict[str, dict[tuple[int, None | int], Callable]] = {
+            GLOBAL_SCENE: {}
+        }
+
+        self.mouse_pos = (-1, -1)
+
+        # Events handled by the last poll(), not counting mouse motion.
+        self.num_events = 0
+
+    def get_mouse_pos(self) -> tuple[int, int]:
+        return self.mouse_pos
+
+    def install(self) -> None:
+        # Must be called once pygame has been initialised.
+        pygame.event.set_blocked(None)
+        pygame.event.set_allowed(ALLOWED_EVENT_TYPES)
+
+        self.mouse_pos = pygame.mouse.get_pos()
+
+    def bind(
+        self,
+        scene_name: str,
+        event_type: int,
+        code: None | int,
+        func: Callable[[pygame.event.Event], None],
+    ) -> None:
+        self.bindings.setdefault(scene_name, {})[(event_type, code)] = func
+
+    def bind_keys(
+        self,
+        scene_name: str,
+        keys: dict[int, Callable[[pygame.event.Event], None]],
+    ) -> None:
+        for key, func in keys.items():
+            self.bind(scene_name, pygame.KEYDOWN, key, func)
+
+    def get_binding(
+        self, scene_name: str, event: pygame.event.Event
+    ) -> None | Callable:
+        # Exact bindings beat catch-all ones, and the scene's beat the global ones.
+        scene_bindings = self.bindings.get(scene_name, {})
+        global_bindings = self.bindings[GLOBAL_SCENE]
+
+        code = EVENT_CODES[event.type](event) if event.type in EVENT_CODES else None
+
+        for bindings, binding_code in (
+            (scene_bindings, code),
+            (global_bindings, code),
+            (scene_bindings, None),
+            (global_bindings, None),
+        ):
+            if (func := bindings.get((event.type, binding_code))) is not None:
+                return func
+
+        return None
+
+    def poll(self) -> None:
+        # Handles every event that arrived since the last frame, within this frame.
+        # Motion events are dropped from the queue without being converted to
+        # Python objects, as SDL already tracks where the mouse ended up.
+        pygame.event.clear(pygame.MOUSEMOTION)
+        self.mouse_pos = pygame.mouse.get_pos()
+
+        events = pygame.event.get()
+        self.num_events = len(events)
+
+        for event in events:
+            if (func := self.get_binding(self.get_scene_name(), event)) is not None:
+                func(event)
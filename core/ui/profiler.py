@@ -0,0 +1,173 @@
+import pygame
+import pygame.freetype
+
+import csv
+import time
+
+from collections import deque
+
+
+class FrameProfiler:
+    """
+    Times the stages of each frame.
+
+    Stages are timed as laps: mark(stage) records the time since the previous mark
+    (or the start of the frame) under that stage's name.
+    The last capacity frames are kept in a ring buffer, for the HUD's rolling
+    percentiles and for exporting to CSV.
+
+    While disabled, mark() is a function that does nothing,
+    so instrumented code costs one call per stage.
+    """
+
+    def __init__(
+        self,
+        font: pygame.freetype.Font,
+        font_size: int,
+        text_colour: tuple[int, int, int],
+        background_colour: tuple[int, int, int],
+        capacity: int = 600,
+        hud_interval: int = 30,
+    ):
+        self.font = font
+        self.font_size = int(0.7 * font_size)  # Small, to cover as little as possible.
+        self.text_colour = text_colour
+        self.background_colour = background_colour
+        self.hud_interval = hud_interval  # Frames between updates of the HUD's text.
+
+        self.enabled = False
+        self.mark = self.mark_disabled
+
+        # Rows of (frame number, total milliseconds, {stage: milliseconds}).
+        self.frames: deque[tuple[int, float, dict[str, float]]] = deque(
+            maxlen=capacity
+        )
+        self.stages: dict[str, None] = {}  # Every stage seen, in first-seen order.
+
+        self.frame_num = 0
+        self.frame_start = 0.0
+        self.lap_start = 0.0
+        self.curr_frame: dict[str, float] = {}
+
+        self.hud: None | pygame.Surface = None
+
+    def get_enabled(self) -> bool:
+        return self.enabled
+
+    def toggle(self) -> None:
+        self.enabled = not self.enabled
+        self.mark = self.mark_enabled if self.enabled else self.mark_disabled
+        self.hud = None
+
+    def mark_disabled(self, stage: str) -> None:
+        pass
+
+    def mark_enabled(self, stage: str) -> None:
+        now = time.perf_counter()
+
+        # A stage can be marked more than once a frame, so its laps are added up.
+        self.curr_frame[stage] = (
+            self.curr_frame.get(stage, 0.0) + (now - self.lap_start) * 1000
+        )
+        self.lap_start = now
+
+    def start_frame(self) -> None:
+        if self.enabled:
+            self.frame_start = self.lap_start = time.perf_counter()
+            self.curr_frame = {}
+
+    def end_frame(self) -> None:
+        self.frame_num += 1
+
+        if not self.enabled:
+            return
+
+        self.frames.append(
+            (
+                self.frame_num,
+                (time.perf_counter() - self.frame_start) * 1000,
+                self.curr_frame,
+            )
+        )
+        self.stages.update(dict.fromkeys(self.curr_frame))
+
+        if self.frame_num % self.hud_interval == 0:
+            self.hud = None
+
+    def get_percentiles(
+        self, percentiles: tuple[float, ...] = (50, 95, 99)
+    ) -> dict[str, tuple[float, ...]]:
+        """
+        Returns each stage's (and the total's) millisecond percentiles over the buffered frames.
+        Frames where a stage didn't run count as 0 ms for it.
+        """
+        columns = {"total": sorted(total for _, total, _ in self.frames)}
+
+        for stage in self.stages:
+            columns[stage] = sorted(
+                frame.get(stage, 0.0) for _, _, frame in self.frames
+            )
+
+        return {
+            stage: tuple(
+                column[min(int(len(column) * percentile / 100), len(column) - 1)]
+                for percentile in percentiles
+            )
+            for stage, column in columns.items()
+            if column
+        }
+
+    def export_csv(self, file_path: str) -> None:
+        # One row per buffered frame, with a column per stage.
+        stages = list(self.stages)
+
+        with open(file_path, "w", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(["frame", "total_ms", *stages])
+
+            for frame_num, total, frame in self.frames:
+                writer.writerow(
+                    [
+                        frame_num,
+                        f"{total:.3f}",
+                        *(f"{frame.get(stage, 0.0):.3f}" for stage in stages),
+                    ]
+                )
+
+    def render_hud(self) -> pygame.Surface:
+        rows = [("stage (ms)", "p50", "p95", "p99")] + [
+            (stage, *(f"{value:.2f}" for value in values))
+            for stage, values in self.get_percentiles().items()
+        ]
+
+        # The font isn't monospaced, so each column is drawn at its own x.
+        column_xs = (0.5, 15, 19, 23)
+        line_height = int(1.3 * self.font_size)
+
+        hud = pygame.Surface(
+            (int(27 * self.font_size), (len(rows) + 1) * line_height),
+            pygame.SRCALPHA,
+        )
+        hud.fill((*self.background_colour, 220))
+
+        for row_idx, row in enumerate(rows):
+            for column_x, text in zip(column_xs, row):
+                self.font.render_to(
+                    hud,
+                    (column_x * self.font_size, (row_idx + 0.5) * line_height),
+                    text,
+                    self.text_colour,
+                    size=self.font_size,
+                )
+
+        return hud
+
+    def render_to(self, window: pygame.Surface) -> None:
+        # The HUD's text is only rendered every hud_interval frames, then reused.
+        if not self.enabled or not self.frames:
+            return
+
+        if self.hud is None:
+            self.hud = self.render_hud()
+
+        window.blit(self.hud, (window.get_width() - self.hud.get_width(), 0))
@@ -0,0 +1,179 @@
+import pygame
+import pygame.freetype
+
+from ..game.catalog import SORT_ORDERS
+from ..game.player import PlayerList
+from ..game.shop import Shop
+
+
+class UIShop:
+    """
+    Renders one page of the shop's products at a time.
+
+    Each product's row is rendered to a surface once and reused while it's
+    on one of the last few pages shown, and the filtered list is only recomputed when it can have changed,
+    so frames cost the same however many products there are.
+    """
+
+    def __init__(
+        self,
+        shop: Shop,
+        players: PlayerList,
+        font: pygame.freetype.Font,
+        font_size: int,
+        pos: tuple[int, int],
+        row_spacing: float,
+        page_size: int,
+        text_colour: tuple[int, int, int],
+        dim_text_colour: tuple[int, int, int],
+        cached_pages: int = 4,
+    ):
+        self.shop = shop
+        self.players = players
+        self.font = font
+        self.font_size = font_size
+        self.pos = pos
+        self.row_spacing = row_spacing
+        self.page_size = page_size
+        # The most rows kept rendered, so scrolling a big catalog doesn't keep every row.
+        self.max_cached_rows = cached_pages * page_size
+        self.text_colour = text_colour
+        self.dim_text_colour = dim_text_colour
+
+        # Filters and sort order, changed by the player.
+        self.sort_idx = SORT_ORDERS.index("affordable")
+        self.affordable_only = False
+
+        self.results: list[int] = []  # Product positions matching the filters.
+        self.affordable: list[bool] = []
+
+        self.reload()
+
+    def reload(self) -> None:
+        # Called when the shop's products have been replaced.
+        self.catalog = self.shop.get_catalog()
+
+        self.categories: list[None | str] = [None] + self.catalog.get_categories()
+        self.category_idx = 0
+
+        self.first_row = 0  # The index in self.results of the top visible row.
+
+        # Rendered rows, keyed by (product position, whether it's affordable),
+        # from least to most recently shown.
+        self.row_cache: dict[tuple[int, bool], pygame.Surface] = {}
+
+    def get_page(self) -> list[int]:
+        return self.catalog.get_page(self.results, self.first_row, self.page_size)
+
+    def get_product_idx_from_row(self, row: int) -> None | int:
+        # Returns the shop index (from 1) of the product on a visible row (from 0).
+        page = self.get_page()
+
+        if 0 <= row < len(page):
+            return page[row] + 1
+
+        return None
+
+    def refresh(self) -> None:
+        # Recomputes what the current player can afford and which products match.
+        # Called whenever the shop is opened, a purchase is made or a filter changes.
+        curr_player = self.players.get_curr()
+
+        self.affordable = self.shop.get_affordable(self.players.get_ledger())[
+            curr_player.get_num()
+        ]
+        self.results = self.catalog.query(
+            category=self.categories[self.category_idx],
+            affordable=self.affordable,
+            affordable_only=self.affordable_only,
+            sort=SORT_ORDERS[self.sort_idx],
+        )
+        self.scroll_by(0)
+
+    def scroll_by(self, rows: int) -> None:
+        self.first_row = max(
+            0,
+            min(self.first_row + rows, len(self.results) - self.page_size),
+        )
+
+    def cycle_category(self) -> None:
+        self.category_idx = (self.category_idx + 1) % len(self.categories)
+        self.first_row = 0
+        self.refresh()
+
+    def cycle_sort(self) -> None:
+        self.sort_idx = (self.sort_idx + 1) % len(SORT_ORDERS)
+        self.first_row = 0
+        self.refresh()
+
+    def toggle_affordable_only(self) -> None:
+        self.affordable_only = not self.affordable_only
+        self.first_row = 0
+        self.refresh()
+
+    def render_row(self, product_pos: int, affordable: bool) -> pygame.Surface:
+        # Renders a product's icon, name, cost and effect onto a new surface.
+        product = self.shop.get_products()[product_pos]
+        colour = self.text_colour if affordable else self.dim_text_colour
+
+        row = pygame.Surface(
+            (int(50 * self.font_size), int(1.5 * self.font_size)), pygame.SRCALPHA
+        )
+
+        self.font.render_to(row, (2 * self.font_size, 0), product.get_name(), colour)
+
+        row.blit(
+            pygame.transform.scale(
+                product.get_icon_image(), (self.font_size, self.font_size)
+            ),
+            (12 * self.font_size, 0),
+        )
+
+        self.font.render_to(
+            row,
+            (14 * self.font_size, 0),
+            ", ".join(
+                f"{value} {key}" for key, value in product.get_cost().items()
+            ),
+            colour,
+        )
+
+        self.font.render_to(
+            row, (30 * self.font_size, 0), product.get_effect_desc(), colour
+        )
+
+        return row
+
+    def render_to(self, window: pygame.Surface) -> None:
+        # Renders the filters and scroll position.
+        category = self.categories[self.category_idx]
+        self.font.render_to(
+            window,
+            (self.pos[0], self.pos[1] - 1.5 * self.font_size),
+            f"Sort (S): {SORT_ORDERS[self.sort_idx]}   "
+            f"Category (C): {category or 'all'}   "
+            f"Affordable only (F): {'on' if self.affordable_only else 'off'}   "
+            f"{min(self.first_row + 1, len(self.results))}-"
+            f"{min(self.first_row + self.page_size, len(self.results))}"
+            f" of {len(self.results)}",
+            self.dim_text_colour,
+        )
+
+        for row_idx, product_pos in enumerate(self.get_page()):
+            row_pos = (self.pos[0], self.pos[1] + row_idx * self.row_spacing)
+            affordable = self.affordable[product_pos]
+
+            # Moved to the end when shown, so the rows dropped are those shown longest ago.
+            if (row := self.row_cache.pop((product_pos, affordable), None)) is None:
+                row = self.render_row(product_pos, affordable)
+
+                if len(self.row_cache) >= self.max_cached_rows:
+                    del self.row_cache[next(iter(self.row_cache))]
+
+            self.row_cache[(product_pos, affordable)] = row
+
+            # The row's number key is drawn separately, as it depends on the scroll position.
+            self.font.render_to(
+                window, row_pos, str(row_idx + 1), self.text_colour
+            )
+            window.blit(row, row_pos)
@@ -3,6 +3,8 @@ import pygame.freetype
 from ..game.board import Board
 from ..game.player import Player, PlayerList
 
+from .profiler import FrameProfiler
+
 
 class UIText:
 
@@ -15,6 +17,7 @@ class UIText:
         font_size: int,
         font_bold_size: int,
         text_colour: tuple[int, int, int],
+        profiler: None | FrameProfiler = None,
     ):
         self.board = board
         self.players = players
@@ -23,6 +26,7 @@ class UIText:
         self.font_size = font_size
         self.font_bold_size = font_bold_size
         self.text_colour = text_colour
+        self.profiler = profiler
 
         self.board_pos = self.board.get_pos()
         self.board_pos_end = self.board.get_pos_end()
@@ -37,12 +41,18 @@ class UIText:
         curr_player: Player,
     ) -> None:
         self.curr_player = self.players.get_curr()
+        mark = self.profiler.mark if self.profiler else lambda stage: None
 
         self.render_player_list_text_to(window)
+        mark("text: player list")
         self.render_player_resource_text_to(window, mouse_pos)
+        mark("text: player resources")
         self.render_player_turn_text_to(window)
+        mark("text: player turn")
         self.render_status_text_to(window)
+        mark("text: status")
         self.render_title_text_to(window)
+        mark("text: title")
 
     def render_player_list_text_to(self, window: pygame.display) -> None:
         for player_num, player in enumerate(self.players.get_list()):
@@ -72,7 +82,7 @@ class UIText:
                     player_list_text_pos[0] + 2 * self.font_size,
                     player_list_text_pos[1],
                 ),
-                f"P{player_num + 1} ({player.get_name()}): {player.get_score()}",
+                f"P{player_num + 1} ({player.get_name()}{' [AI]' if player.get_is_bot() else ''}): {player.get_score()}",
                 player.get_colour(),
             )
 
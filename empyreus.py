@@ -1,8 +1,172 @@
+import argparse
+import os
 import pygame
 import sys
 
 from core.main import Main
+from core.game.match_log import MatchLog
+from core.net.client import NetClient
+from core.net.peer import LockstepPeer
+from core.net.protocol import ProtocolError
+from core.tracing import tracer
 
 if __name__ == "__main__":
-    main = Main()
+    parser = argparse.ArgumentParser(description="Play Empyreus.")
+    parser.add_argument(
+        "--trace",
+        metavar="FILE",
+        help="record the session as a Chrome trace (JSON), written on exit",
+    )
+    parser.add_argument(
+        "--connect",
+        metavar="HOST:PORT",
+        help="play online, on a server started with serve.py",
+    )
+    parser.add_argument(
+        "--session",
+        type=int,
+        default=0,
+        help="session to join online (default: any open one)",
+    )
+    parser.add_argument(
+        "--players",
+        type=int,
+        default=2,
+        help="players in the online game, if starting one (default 2)",
+    )
+    parser.add_argument("--name", default="Player", help="your name online")
+    parser.add_argument(
+        "--spectate",
+        type=int,
+        metavar="SESSION",
+        help="watch an online session instead of playing in it",
+    )
+    parser.add_argument(
+        "--lockstep-host",
+        type=int,
+        metavar="PORT",
+        help="host a peer-to-peer game for --players peers, on this port",
+    )
+    parser.add_argument(
+        "--lockstep-join",
+        metavar="HOST:PORT",
+        help="join a peer-to-peer game hosted with --lockstep-host",
+    )
+    parser.add_argument(
+        "--record",
+        metavar="DIR",
+        help="record each match to a new file in this folder",
+    )
+    parser.add_argument(
+        "--replay",
+        metavar="FILE",
+        help="watch a match recorded with --record",
+    )
+    parser.add_argument(
+        "--leaderboard",
+        metavar="FILE",
+        default="./leaderboard.db",
+        help="SQLite database of finished matches (default ./leaderboard.db)",
+    )
+    parser.add_argument(
+        "--autosave",
+        metavar="FILE",
+        default="./autosave.sav",
+        help="where local games are saved as they're played, to resume later (default ./autosave.sav)",
+    )
+    parser.add_argument(
+        "--fps",
+        type=int,
+        default=60,
+        help="frames drawn a second at most, e.g. 144 for high-refresh displays, 0 for no limit (default 60)",
+    )
+    parser.add_argument(
+        "--board-events",
+        action="store_true",
+        help="let local boards change as they're played: planets run out, asteroids drift and trading stations move",
+    )
+    parser.add_argument(
+        "--fog",
+        type=int,
+        nargs="?",
+        const=2,
+        metavar="MOVES",
+        help="play local games in fog of war: only tiles within MOVES moves of where you've been are shown (default 2)",
+    )
+    args = parser.parse_args()
+
+    # Online, peer-to-peer and recorded games only share and record actions, not board changes.
+    if args.board_events and (
+        args.connect
+        or args.lockstep_host is not None
+        or args.lockstep_join
+        or args.record
+        or args.replay
+    ):
+        parser.error("--board-events is only for local games that aren't recorded")
+
+    # Other players' moves online and in replays aren't made on this computer, so can't reveal tiles.
+    if args.fog is not None and (
+        args.connect or args.lockstep_host is not None or args.lockstep_join or args.replay
+    ):
+        parser.error("--fog is only for local games")
+    if args.fog is not None and args.fog < 0:
+        parser.error("--fog can't be a negative number of moves")
+
+    if args.record:
+        # Made now, so a bad folder is reported before the window opens.
+        try:
+            os.makedirs(args.record, exist_ok=True)
+        except OSError as e:
+            parser.error(f"--record can't use the folder {args.record}: {e}")
+
+    if args.trace:
+        # Started before anything loads, to record asset loading and board generation.
+        tracer.start(args.trace)
+
+    net_client = None
+    if args.connect:
+        host, _, port = args.connect.rpartition(":")
+
+        try:
+            net_client = NetClient(host or "127.0.0.1", int(port))
+            if args.spectate is not None:
+                net_client.spectate(args.spectate)
+            else:
+                net_client.join(args.session, args.players, args.name)
+        except (OSError, ProtocolError) as e:
+            sys.exit(f"Couldn't join a game on {args.connect}: {e}")
+
+    lockstep_peer = None
+    if args.lockstep_host is not None or args.lockstep_join:
+        lockstep_peer = LockstepPeer()
+
+        try:
+            if args.lockstep_host is not None:
+                print(f"Waiting for {args.players - 1} peers on port {args.lockstep_host}.")
+                lockstep_peer.host(args.lockstep_host, args.players, args.name)
+            else:
+                host, _, port = args.lockstep_join.rpartition(":")
+                lockstep_peer.join(host or "127.0.0.1", int(port), args.name)
+        except (OSError, ProtocolError) as e:
+            sys.exit(f"Couldn't start a peer-to-peer game: {e}")
+
+    match_log = None
+    if args.replay:
+        try:
+            match_log = MatchLog(args.replay)
+        except (OSError, ValueError) as e:
+            sys.exit(f"Couldn't load the match {args.replay}: {e}")
+
+    main = Main(
+        net_client,
+        lockstep_peer,
+        args.record,
+        match_log,
+        args.leaderboard,
+        args.autosave,
+        args.fps,
+        args.board_events,
+        args.fog,
+    )
     main.start_game()
@@ -0,0 +1,62 @@
+import argparse
+import asyncio
+import os
+import resource
+
+# The server never opens a window, but loads the same sprite sheets as the game.
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+
+from core.net.loadtest import measure_session_memory, run_load_test
+from core.net.server import GameServer
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Measure the game server's memory per session and latency per action, on localhost."
+    )
+    parser.add_argument(
+        "--sessions",
+        type=int,
+        default=500,
+        help="sessions played at once (default 500)",
+    )
+    parser.add_argument(
+        "--players", type=int, default=2, help="players per session (default 2)"
+    )
+    parser.add_argument(
+        "--turns", type=int, default=50, help="turns each session lasts (default 50)"
+    )
+    parser.add_argument(
+        "--spectators",
+        type=int,
+        default=0,
+        help="spectators watching each session (default 0)",
+    )
+    parser.add_argument(
+        "--keyframe-interval",
+        type=int,
+        default=64,
+        help="states between keyframes, or 1 to send every state whole (default 64)",
+    )
+    args = parser.parse_args()
+
+    # Both ends of every connection are in this process.
+    soft_limit, hard_limit = resource.getrlimit(resource.RLIMIT_NOFILE)
+    needed = 2 * args.sessions * (args.players + args.spectators) + 64
+    if soft_limit < needed:
+        resource.setrlimit(
+            resource.RLIMIT_NOFILE, (min(needed, hard_limit), hard_limit)
+        )
+
+    server = GameServer(keyframe_interval=args.keyframe_interval)
+
+    print(
+        f"memory per session: {measure_session_memory(server, num_players=args.players):.0f} bytes"
+    )
+
+    stats = asyncio.run(
+        run_load_test(
+            server, args.sessions, args.players, args.turns, args.spectators
+        )
+    )
+    for name, value in stats.items():
+        print(f"{name}: {value:.0f}")
@@ -0,0 +1,127 @@
+import argparse
+import itertools
+import multiprocessing
+import os
+import sys
+
+from functools import partial
+
+# Boards are rendered offscreen, so the dummy video driver must be set before pygame starts
+# (worker processes inherit it).
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+
+from core.gallery import init_worker, render_job
+
+
+def parse_seeds(text: str) -> list[int]:
+    # Either single seeds or inclusive ranges, separated by commas: "0-99,200".
+    seeds = []
+
+    for part in text.split(","):
+        start, _, end = part.partition("-")
+        seeds.extend(range(int(start), int(end or start) + 1))
+
+    return seeds
+
+
+def parse_dims(text: str) -> list[tuple[int, int]]:
+    # Board sizes separated by commas: "6x6,12x8".
+    return [tuple(int(n) for n in part.split("x")) for part in text.split(",")]
+
+
+def parse_ints(text: str) -> list[int]:
+    return [int(part) for part in text.split(",")]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Render generated boards to PNG files, headless, across processes."
+    )
+    parser.add_argument(
+        "--seeds", type=parse_seeds, default=[0], help='seeds to render, e.g. "0-99,200"'
+    )
+    parser.add_argument(
+        "--dims",
+        type=parse_dims,
+        default=[(6, 6)],
+        help='board sizes to render, e.g. "6x6,12x12" (default 6x6)',
+    )
+    parser.add_argument(
+        "--players",
+        type=parse_ints,
+        default=[2],
+        help='player counts to render, e.g. "2,5" (default 2)',
+    )
+    parser.add_argument("--out", metavar="DIR", help="write each image (and diffs) here")
+    parser.add_argument(
+        "--golden",
+        metavar="DIR",
+        help="compare each image with the one of the same name here, exiting with 1 on any difference",
+    )
+    parser.add_argument(
+        "--update-golden",
+        action="store_true",
+        help="write the images to the golden directory instead of comparing",
+    )
+    parser.add_argument("--width", type=int, help="scale images down to this width")
+    parser.add_argument(
+        "--tolerance",
+        type=int,
+        default=0,
+        help="how far a channel can differ before a pixel counts as different (default 0)",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=os.cpu_count(),
+        help="processes to render in (default one per CPU)",
+    )
+    args = parser.parse_args()
+
+    if not args.out and not args.golden:
+        parser.error("nothing to do: give --out, --golden or both")
+
+    for dir_path in (args.out, args.golden):
+        if dir_path:
+            os.makedirs(dir_path, exist_ok=True)
+
+    jobs = list(itertools.product(args.seeds, args.dims, args.players))
+
+    # Spawned rather than forked, so each worker starts its own pygame.
+    with multiprocessing.get_context("spawn").Pool(
+        min(args.workers, len(jobs)), initializer=init_worker
+    ) as pool:
+        results = pool.imap_unordered(
+            partial(
+                render_job,
+                output_dir=args.out,
+                golden_dir=args.golden,
+                update_golden=args.update_golden,
+                width=args.width,
+                tolerance=args.tolerance,
+            ),
+            jobs,
+        )
+
+        num_failed = 0
+        for result in results:
+            if result["status"] in ("differs", "missing"):
+                num_failed += 1
+                print(
+                    f"{result['file_name']}: {result['status']}"
+                    + (
+                        f" ({result['num_diffs']} pixels)"
+                        if "num_diffs" in result
+                        else ""
+                    )
+                )
+
+        # Workers are left to exit once the jobs run out, as SDL catches the
+        # SIGTERM that leaving the block would otherwise stop them with.
+        pool.close()
+        pool.join()
+
+    print(f"Rendered {len(jobs)} boards, {num_failed} failed.")
+
+    if num_failed:
+        sys.exit(1)
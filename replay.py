@@ -0,0 +1,71 @@
+import argparse
+import os
+import sys
+import time
+
+# Replays run headless, so the dummy video driver must be set before pygame starts.
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+
+from core.main import Main
+from core.game.match_log import MatchLog
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Fast-forward through recorded matches, headless."
+    )
+    parser.add_argument("files", nargs="+", metavar="FILE", help="recorded matches")
+    parser.add_argument(
+        "--turn",
+        type=int,
+        help="print the state at the start of this turn, found from the nearest keyframe",
+    )
+    parser.add_argument(
+        "--verify",
+        action="store_true",
+        help="check the events reach every keyframe, exiting with 1 if not",
+    )
+    args = parser.parse_args()
+
+    failed = False
+
+    for file_path in args.files:
+        try:
+            match_log = MatchLog(file_path)
+        except (OSError, ValueError) as e:
+            print(f"{file_path}: couldn't load: {e}", file=sys.stderr)
+            failed = True
+            continue
+
+        # Only for the resources in the game data, as purchases are recorded as the changes they made.
+        main = Main(match_log=match_log)
+        state = main.players.get_state()
+
+        start = time.perf_counter()
+        num_events = match_log.replay(state)
+        replay_time = time.perf_counter() - start
+
+        print(
+            f"{file_path}: {match_log.get_num_turns()} turns, {num_events} events, "
+            f"{', '.join(match_log.get_names())}; scores {list(state.scores)}; "
+            f"replayed at {match_log.get_num_turns() / max(replay_time, 1e-9):,.0f} turns/s"
+        )
+
+        if args.turn is not None:
+            start = time.perf_counter()
+            match_log.seek(state, args.turn)
+            seek_time = time.perf_counter() - start
+
+            print(
+                f"  turn {state.turns_taken} (sought in {seek_time * 1000:.2f} ms): "
+                f"current player {state.curr}, positions {list(state.positions)}, "
+                f"resources {list(state.resources)}, scores {list(state.scores)}"
+            )
+
+        if args.verify:
+            if mismatches := match_log.verify():
+                print(f"  keyframes not reached at turns {mismatches}")
+                failed = True
+            else:
+                print("  every keyframe reached")
+
+    sys.exit(1 if failed else 0)
@@ -0,0 +1,36 @@
+import argparse
+import asyncio
+import os
+
+# The server never opens a window, but loads the same sprite sheets as the game.
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+
+from core.net.server import GameServer
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Host online games of Empyreus.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=7777)
+    parser.add_argument(
+        "--boards",
+        type=int,
+        default=16,
+        help="number of different boards (seeds) sessions are played on (default 16)",
+    )
+    parser.add_argument(
+        "--stats-interval",
+        type=float,
+        default=10,
+        help="seconds between printing session and latency stats, or 0 for never (default 10)",
+    )
+    args = parser.parse_args()
+
+    server = GameServer(num_boards=args.boards)
+
+    print(f"Serving on {args.host}:{args.port}")
+    try:
+        asyncio.run(
+            server.serve_forever(args.host, args.port, args.stats_interval)
+        )
+    except KeyboardInterrupt:
+        pass